@@ -0,0 +1,121 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from src.base.local_sql import LocalClient, make_raw_tables
+from src.base.sql import StatementGraph
+from src.base.utilities import generate_query, read_yaml
+
+QUERIES_FOLDER = (
+    Path(__file__).parents[1] / "src" / "pipelines" / "training" / "queries"
+)
+PARAMS_PATH = (
+    Path(__file__).parents[1] / "src" / "pipelines" / "configuration" / "params.yaml"
+)
+TABLES = ("transactions", "users", "cards", "holidays")
+
+
+def preprocessing_query(incremental_refresh: bool = False) -> str:
+    """Preprocessing query reading and writing the local tables `local.data.*`.
+
+    Args:
+        incremental_refresh (bool): Whether to refresh the preprocessed table
+            incrementally. Defaults to False.
+
+    Returns:
+        str: The rendered preprocessing query.
+    """
+    return generate_query(
+        QUERIES_FOLDER / "q_preprocessing.sql",
+        transactions_table="local.data.transactions",
+        users_table="local.data.users",
+        cards_table="local.data.cards",
+        holidays_table="local.data.holidays",
+        preprocessed_table="local.data.preprocessed",
+        fraud_delay_seconds=7 * 86400,
+        features="`" + "`,\n`".join(read_yaml(PARAMS_PATH)["features"]) + "`",
+        incremental_refresh=incremental_refresh,
+        create_replace_table=True,
+    )
+
+
+def timed(description: str, client: LocalClient, query: str) -> None:
+    start = time.perf_counter()
+    client.query(query).result()
+    logger.info(f"{description}: {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n-rows",
+        type=int,
+        default=1_000_000,
+        help="number of transactions, the full dataset has about 24M",
+    )
+    parser.add_argument(
+        "--n-users", type=int, default=2000, help="number of users of the cards"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=4,
+        help="maximum number of concurrent statements of the preprocessing",
+    )
+    parser.add_argument(
+        "--refresh-fraction",
+        type=float,
+        default=0.1,
+        help="fraction of the newest transactions added by the incremental refresh",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        folder = Path(tmp_dir)
+        tables = make_raw_tables(args.n_rows, n_users=args.n_users)
+        for name, table in tables.items():
+            table.to_parquet(folder / f"{name}.parquet")
+        n_old = int(args.n_rows * (1 - args.refresh_fraction))
+        tables["transactions"].iloc[:n_old].to_parquet(folder / "old.parquet")
+        logger.info(f"Generated {args.n_rows} transactions.")
+
+        def client() -> LocalClient:
+            return LocalClient(
+                {f"local.data.{t}": folder / f"{t}.parquet" for t in TABLES}
+            )
+
+        timed("Preprocessing as a single script", client(), preprocessing_query())
+
+        start = time.perf_counter()
+        StatementGraph(preprocessing_query()).run(
+            client(), "local.data._staging_", max_workers=args.max_workers
+        )
+        logger.info(
+            f"Preprocessing as concurrent statements: "
+            f"{time.perf_counter() - start:.2f}s."
+        )
+
+        local = client()
+        local.register_parquet("local.data.transactions", folder / "old.parquet")
+        local.query(preprocessing_query()).result()
+        local.register_parquet(
+            "local.data.transactions", folder / "transactions.parquet"
+        )
+        timed(
+            f"Incremental refresh of {args.n_rows - n_old} transactions",
+            local,
+            preprocessing_query(incremental_refresh=True),
+        )
+
+        split_query = generate_query(
+            QUERIES_FOLDER / "q_train_valid_test_split.sql",
+            source_table="local.data.preprocessed",
+            valid_size=0.15,
+            test_size=0.15,
+            split_table="local.data.split",
+            create_replace_table=True,
+        )
+        timed("Train / validation / test split", local, split_query)
@@ -0,0 +1,136 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.base.preprocessing import (
+    FRAUD_INDICATORS,
+    ROLLING_WINDOWS,
+    decayed_feature_engineering,
+    rolling_feature_engineering,
+)
+from src.base.utilities import read_yaml
+
+PARAMS_PATH = (
+    Path(__file__).parents[1] / "src" / "pipelines" / "configuration" / "params.yaml"
+)
+
+
+def make_transactions(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Generate random transactions with the columns used by the rolling features.
+
+    Args:
+        n_rows (int): Number of transactions.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        pd.DataFrame: Unsorted transactions of 2000 users spanning 30 years.
+    """
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 30 * 365 * 86400, n_rows)
+    is_fraud = (rng.random(n_rows) < 0.0012).astype(np.int8)
+    kind = rng.integers(0, 3, n_rows, dtype=np.int8)
+    data = pd.DataFrame(
+        {
+            "datetime_offset": pd.Timestamp("1991-01-01")
+            + pd.to_timedelta(seconds, unit="s"),
+            "is_fraud": is_fraud,
+            "fraud_swipe": is_fraud * (kind == 0),
+            "fraud_chip": is_fraud * (kind == 1),
+            "fraud_online": is_fraud * (kind == 2),
+            "fraud_card_present": is_fraud * (kind != 2),
+            "user": rng.integers(0, 2000, n_rows),
+            "datetime_unix_seconds": 662_688_000 + seconds,
+            "amount": rng.gamma(2, 40, n_rows).round(2),
+        }
+    )
+    for days in ("1_days", "2_days", "7_days", "30_days", "year"):
+        data[f"mean_amount_last_{days}"] = rng.random(n_rows, dtype=np.float32)
+        data[f"transaction_frequency_last_{days}"] = rng.random(
+            n_rows, dtype=np.float32
+        )
+    return data
+
+
+def pandas_rolling_means(data: pd.DataFrame) -> pd.DataFrame:
+    """Rolling means computed with one pandas rolling window per feature.
+
+    Args:
+        data (pd.DataFrame): Transactions.
+
+    Returns:
+        pd.DataFrame: Rolling means of the fraud indicators, sorted by time.
+    """
+    data = data.sort_values("datetime_offset").set_index("datetime_offset")
+    means = {}
+    for prefix, column in FRAUD_INDICATORS.items():
+        for window, days in ROLLING_WINDOWS.items():
+            means[f"{prefix}_rolling_mean_{window}"] = (
+                data[column].rolling(pd.Timedelta(days=days), closed="left").mean()
+            )
+    return pd.DataFrame(means).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--n-rows",
+        type=int,
+        default=24_000_000,
+        help="number of transactions, the full dataset has about 24M",
+    )
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        default="float64",
+        choices=["float32", "float64"],
+        help="data type of the computed features",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="also time the pandas rolling windows and check the results match",
+    )
+    parser.add_argument(
+        "--decayed",
+        action="store_true",
+        help="also time the decayed features, with the half-lives in params.yaml",
+    )
+    args = parser.parse_args()
+
+    data = make_transactions(args.n_rows)
+    logger.info(f"Generated {args.n_rows} transactions.")
+
+    start = time.perf_counter()
+    features = rolling_feature_engineering(data, dtype=np.dtype(args.dtype))
+    logger.info(
+        f"Single-pass engine: {time.perf_counter() - start:.2f}s, "
+        f"{features.memory_usage(deep=True).sum() / 1024**2:.0f} MB."
+    )
+
+    if args.compare is True:
+        start = time.perf_counter()
+        expected = pandas_rolling_means(data)
+        logger.info(f"Pandas rolling means: {time.perf_counter() - start:.2f}s.")
+        pd.testing.assert_frame_equal(
+            features[expected.columns],
+            expected,
+            check_dtype=args.dtype == "float64",
+            check_exact=args.dtype == "float64",
+        )
+        logger.info("The rolling means match.")
+
+    if args.decayed is True:
+        half_lives_days = read_yaml(PARAMS_PATH)["decayed_features_half_lives_days"]
+        start = time.perf_counter()
+        features = decayed_feature_engineering(
+            data, half_lives_days, dtype=np.dtype(args.dtype)
+        )
+        logger.info(
+            f"Decayed features with half-lives {half_lives_days} days: "
+            f"{time.perf_counter() - start:.2f}s, "
+            f"{features.memory_usage(deep=True).sum() / 1024**2:.0f} MB."
+        )
@@ -7,10 +7,13 @@ from pathlib import Path
 import holidays
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 from google.cloud import bigquery
 from google.cloud.exceptions import Conflict
 from loguru import logger
 
+from src.base.schemas import SchemaRegistry
+
 # Get files to upload
 _DATA_FOLDER = Path(__file__).parent.parent / "data"
 _TRANSACTIONS_FILE = _DATA_FOLDER / "credit_card_transactions-ibm_v2.csv"
@@ -53,7 +56,8 @@ if __name__ == "__main__":
     project_name = os.environ.get("VERTEX_PROJECT_ID")
     project_location = os.environ.get("VERTEX_LOCATION")
 
-    # Upload the data to BQ
+    # Upload the data to BQ, with the explicit schemas of the tables
+    registry = SchemaRegistry.from_params()
 
     # Create the BQ client
     bq_client = bigquery.Client(project=project_name, location=project_location)
@@ -71,10 +75,7 @@ if __name__ == "__main__":
         # Create a table to store US holidays
         job_config_holidays = bigquery.LoadJobConfig(
             write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
-            schema=[
-                bigquery.SchemaField("date", bigquery.enums.SqlTypeNames.DATE),
-                bigquery.SchemaField("name", bigquery.enums.SqlTypeNames.STRING),
-            ],
+            schema=registry.bigquery_schema("holidays"),
         )
 
         holidays_us = holidays.US(years=np.arange(1980, 2036))
@@ -94,19 +95,26 @@ if __name__ == "__main__":
         )
 
         # Load the data into the dataset
-        job_config_data = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.CSV,
-            skip_leading_rows=1,
-            autodetect=True,
-        )
+        def job_config_csv(table: str) -> bigquery.LoadJobConfig:
+            return bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.CSV,
+                skip_leading_rows=1,
+                schema=registry.bigquery_schema(table),
+            )
+
         job_config_pandas = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.CSV, autodetect=True
+            source_format=bigquery.SourceFormat.CSV,
+            schema=registry.bigquery_schema("users"),
         )
 
+        # Check the files before loading them, rather than failing the loads
+        registry.validate(_TRANSACTIONS_FILE, "transactions", file_format="csv")
+        registry.validate(_CARDS_FILE, "cards", file_format="csv")
+
         with open(_TRANSACTIONS_FILE, "rb") as f:
             table_id = f"{dataset_name}.transactions"
             job = bq_client.load_table_from_file(
-                f, destination=table_id, job_config=job_config_data
+                f, destination=table_id, job_config=job_config_csv("transactions")
             )
             job.result()
             table = bq_client.get_table(table_id)
@@ -118,6 +126,7 @@ if __name__ == "__main__":
         with open(_USERS_FILE, "rb") as f:
             df = pd.read_csv(f)
             df["User"] = df.index
+            registry.validate(pa.Table.from_pandas(df, preserve_index=False), "users")
             table_id = f"{dataset_name}.users"
             job = bq_client.load_table_from_dataframe(
                 df, destination=table_id, job_config=job_config_pandas
@@ -132,7 +141,7 @@ if __name__ == "__main__":
         with open(_CARDS_FILE, "rb") as f:
             table_id = f"{dataset_name}.cards"
             job = bq_client.load_table_from_file(
-                f, destination=table_id, job_config=job_config_data
+                f, destination=table_id, job_config=job_config_csv("cards")
             )
             job.result()
             table = bq_client.get_table(table_id)
@@ -0,0 +1,534 @@
+import json
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from lightgbm import LGBMClassifier
+from loguru import logger
+from sklearn.base import ClassifierMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from xgboost import XGBClassifier
+
+from src.base.boosting import CachedBoosterClassifier
+from src.base.model import SamplingCorrectedClassifier
+
+ARTIFACT_FORMAT = "credit-card-frauds-model"
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# Prefixes of the .npy files of the arrays of parameters
+ARRAY_PREFIXES = ("scaler", "linear", "trees")
+
+# Node tables of the tree ensembles, concatenated over all the trees
+TREE_ARRAYS = (
+    "feature",
+    "threshold",
+    "left",
+    "right",
+    "default_left",
+    "missing_type",
+    "value",
+    "roots",
+)
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+LIGHTGBM_MISSING_TYPES = {
+    "None": MISSING_NONE,
+    "Zero": MISSING_ZERO,
+    "NaN": MISSING_NAN,
+}
+# Rows scored at once when traversing the trees, to bound the memory usage
+TREE_BATCH_SIZE = 10000
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def _sklearn_forest_tables(classifier: RandomForestClassifier) -> dict:
+    tables = {k: [] for k in TREE_ARRAYS}
+    offset = 0
+    for estimator in classifier.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        value = tree.value[:, 0, :]
+        tables["feature"].append(np.where(is_leaf, -1, tree.feature))
+        tables["threshold"].append(tree.threshold)
+        tables["left"].append(np.where(is_leaf, -1, tree.children_left + offset))
+        tables["right"].append(np.where(is_leaf, -1, tree.children_right + offset))
+        tables["value"].append(value[:, 1] / value.sum(axis=1))
+        tables["roots"].append([offset])
+        offset += tree.node_count
+
+    tables = {k: np.concatenate(v) for k, v in tables.items() if v}
+    tables["default_left"] = np.zeros(offset, dtype=bool)
+    tables["missing_type"] = np.full(offset, MISSING_NONE)
+    return tables
+
+
+def _lightgbm_tables(booster: lgb.Booster) -> tuple[dict, float]:
+    dump = booster.dump_model()
+    if dump.get("num_class", 1) != 1:
+        msg = "Only binary LightGBM models can be exported."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    tables = {k: [] for k in TREE_ARRAYS}
+
+    def add_node(node: dict) -> int:
+        idx = len(tables["feature"])
+        for k in TREE_ARRAYS[:-1]:
+            tables[k].append(0)
+        if "leaf_value" in node:
+            tables["feature"][idx] = -1
+            tables["left"][idx] = tables["right"][idx] = -1
+            tables["value"][idx] = node["leaf_value"]
+            return idx
+        if node["decision_type"] != "<=":
+            msg = "Categorical splits of LightGBM models cannot be exported."
+            logger.error(msg)
+            raise ValueError(msg)
+        tables["feature"][idx] = node["split_feature"]
+        tables["threshold"][idx] = node["threshold"]
+        tables["default_left"][idx] = node["default_left"]
+        tables["missing_type"][idx] = LIGHTGBM_MISSING_TYPES[node["missing_type"]]
+        tables["left"][idx] = add_node(node["left_child"])
+        tables["right"][idx] = add_node(node["right_child"])
+        return idx
+
+    for tree in dump["tree_info"]:
+        tables["roots"].append(add_node(tree["tree_structure"]))
+
+    sigmoid_scale = 1.0
+    for token in dump.get("objective", "").split():
+        if token.startswith("sigmoid:"):
+            sigmoid_scale = float(token.split(":")[1])
+    return {k: np.asarray(v) for k, v in tables.items()}, sigmoid_scale
+
+
+def _xgboost_tables(booster: xgb.Booster) -> tuple[dict, float]:
+    try:
+        # Only the trees up to the best round with early stopping, as predicted
+        booster = booster[: booster.best_iteration + 1]
+    except AttributeError:
+        pass
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "model.json"
+        booster.save_model(str(path))
+        with open(path) as f:
+            model = json.load(f)
+
+    learner = model["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        msg = f"XGBoost models with objective {objective} cannot be exported."
+        logger.error(msg)
+        raise ValueError(msg)
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+
+    tables = {k: [] for k in TREE_ARRAYS}
+    offset = 0
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        right = np.asarray(tree["right_children"])
+        is_leaf = left == -1
+        tables["feature"].append(np.where(is_leaf, -1, tree["split_indices"]))
+        tables["threshold"].append(tree["split_conditions"])
+        tables["left"].append(np.where(is_leaf, -1, left + offset))
+        tables["right"].append(np.where(is_leaf, -1, right + offset))
+        tables["default_left"].append(np.asarray(tree["default_left"], dtype=bool))
+        tables["value"].append(np.where(is_leaf, tree["split_conditions"], 0))
+        tables["roots"].append([offset])
+        offset += left.size
+
+    tables = {k: np.concatenate(v) for k, v in tables.items() if v}
+    tables["missing_type"] = np.full(offset, MISSING_NAN)
+    base_margin = float(np.log(base_score / (1 - base_score)))
+    return tables, base_margin
+
+
+def _scaler_casts_statistics(scaler: Union[StandardScaler, MinMaxScaler]) -> bool:
+    # Depending on the version, sklearn scalers either cast their statistics to the
+    # dtype of the input before scaling it, or compute in float64 and cast back.
+    # The two differ in the last bit for float32 data, which can change the branch
+    # taken in a tree, so check which one the fitted scaler does
+    rng = np.random.default_rng(0)
+    probe = rng.normal(size=(1000, scaler.n_features_in_)).astype(np.float32)
+    expected = scaler.transform(probe)
+    if isinstance(scaler, StandardScaler):
+        offset = scaler.mean_ if scaler.with_mean else 0
+        scale = scaler.scale_ if scaler.with_std else 1
+        cast = (probe - np.float32(offset)) / np.float32(scale)
+    else:
+        cast = probe * np.float32(scaler.scale_) + np.float32(scaler.min_)
+    return bool(np.array_equal(cast, expected))
+
+
+def _add_arrays(contents: dict, prefix: str, arrays: dict) -> dict:
+    # The arrays are only saved once the whole model has been exported
+    files = {}
+    for k, v in arrays.items():
+        files[k] = f"{prefix}_{k}.npy"
+        contents[files[k]] = np.ascontiguousarray(v)
+    return files
+
+
+def _remove_artifact(folder: Path) -> None:
+    # The manifest goes first, so that a partially removed artifact is never loaded
+    (folder / MANIFEST_FILE).unlink(missing_ok=True)
+    for prefix in ARRAY_PREFIXES:
+        for path in folder.glob(f"{prefix}_*.npy"):
+            path.unlink()
+
+
+def save_model_artifact(
+    model: ClassifierMixin,
+    folder: Union[str, Path],
+    feature_names: list[str],
+) -> Path:
+    """Save a trained model in a pickle-free, memory-mappable format.
+
+    The artifact is made of a JSON manifest, describing the preprocessing and the
+    type of model, and of a .npy file for each array of parameters (scaler
+    statistics, linear coefficients, node tables of the trees). It supports the
+    models trained by `train_model`: logistic regression, SGD classifier (with log
+    or modified Huber loss), random forest, LightGBM and XGBoost, optionally in a
+    pipeline with a standard or min-max scaler.
+
+    Any artifact previously saved in the folder is removed, even if the model
+    cannot be exported, so that it is never loaded instead of the new model.
+
+    Args:
+        model (ClassifierMixin): Trained model.
+        folder (Union[str, Path]): Folder where the artifact is saved.
+        feature_names (list[str]): Names of the input features, in order.
+
+    Returns:
+        Path: Path of the manifest file.
+
+    Raises:
+        ValueError: If the model cannot be exported.
+    """
+    folder = Path(folder)
+    try:
+        manifest, contents = _export_model(model, feature_names)
+    except ValueError as e:
+        if folder.exists():
+            _remove_artifact(folder)
+        raise e
+
+    folder.mkdir(parents=True, exist_ok=True)
+    _remove_artifact(folder)
+    for file_name, array in contents.items():
+        np.save(folder / file_name, array)
+    path = folder / MANIFEST_FILE
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Saved model artifact to {path}.")
+    return path
+
+
+def _export_model(model: ClassifierMixin, feature_names: list[str]) -> tuple:
+    # Manifest of the artifact and its arrays keyed by file name
+    contents = {}
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "feature_names": list(feature_names),
+        "preprocessing": None,
+        "postprocessing": None,
+    }
+
+    classifier = model
+    if isinstance(model, Pipeline):
+        if len(model.steps) > 2:
+            msg = "Only pipelines made of a scaler and a classifier can be exported."
+            logger.error(msg)
+            raise ValueError(msg)
+        scaler = model[0] if len(model.steps) == 2 else None
+        classifier = model[-1]
+        if isinstance(scaler, StandardScaler):
+            manifest["preprocessing"] = {
+                "type": "standard_scaler",
+                "cast_statistics": _scaler_casts_statistics(scaler),
+                "arrays": _add_arrays(
+                    contents,
+                    "scaler",
+                    {
+                        "offset": (
+                            scaler.mean_
+                            if scaler.with_mean
+                            else np.zeros(scaler.n_features_in_)
+                        ),
+                        "scale": (
+                            scaler.scale_
+                            if scaler.with_std
+                            else np.ones(scaler.n_features_in_)
+                        ),
+                    },
+                ),
+            }
+        elif isinstance(scaler, MinMaxScaler):
+            manifest["preprocessing"] = {
+                "type": "min_max_scaler",
+                "cast_statistics": _scaler_casts_statistics(scaler),
+                "arrays": _add_arrays(
+                    contents, "scaler", {"scale": scaler.scale_, "offset": scaler.min_}
+                ),
+            }
+        elif scaler is not None:
+            msg = f"Scaler of type {type(scaler).__name__} cannot be exported."
+            logger.error(msg)
+            raise ValueError(msg)
+
+    if isinstance(classifier, SamplingCorrectedClassifier):
+        manifest["postprocessing"] = {
+            "type": "sampling_correction",
+            "majority_fraction": classifier.majority_fraction,
+        }
+        classifier = classifier.estimator
+
+    booster = classifier
+    if isinstance(classifier, CachedBoosterClassifier):
+        booster = classifier.booster_
+    elif isinstance(classifier, LGBMClassifier):
+        booster = classifier.booster_
+    elif isinstance(classifier, XGBClassifier):
+        booster = classifier.get_booster()
+
+    if isinstance(classifier, (LogisticRegression, SGDClassifier)):
+        if isinstance(classifier, LogisticRegression):
+            link = "logistic"
+        elif classifier.loss in ("log", "log_loss"):
+            link = "logistic"
+        elif classifier.loss == "modified_huber":
+            link = "modified_huber"
+        else:
+            msg = f"SGD classifier with loss {classifier.loss} has no probabilities."
+            logger.error(msg)
+            raise ValueError(msg)
+        manifest["model"] = {
+            "type": "linear",
+            "link": link,
+            "intercept": float(classifier.intercept_[0]),
+            "arrays": _add_arrays(contents, "linear", {"coef": classifier.coef_[0]}),
+        }
+    elif isinstance(classifier, RandomForestClassifier):
+        manifest["model"] = {
+            "type": "tree_ensemble",
+            "library": "sklearn",
+            "aggregation": "mean",
+            "comparison": "le",
+            "input_dtype": "float32",
+            "arrays": _add_arrays(
+                contents, "trees", _sklearn_forest_tables(classifier)
+            ),
+        }
+    elif isinstance(booster, lgb.Booster):
+        tables, sigmoid_scale = _lightgbm_tables(booster)
+        manifest["model"] = {
+            "type": "tree_ensemble",
+            "library": "lightgbm",
+            "aggregation": "sum",
+            "base_margin": 0.0,
+            "sigmoid_scale": sigmoid_scale,
+            "comparison": "le",
+            "input_dtype": "float64",
+            "arrays": _add_arrays(contents, "trees", tables),
+        }
+    elif isinstance(booster, xgb.Booster):
+        tables, base_margin = _xgboost_tables(booster)
+        manifest["model"] = {
+            "type": "tree_ensemble",
+            "library": "xgboost",
+            "aggregation": "sum",
+            "base_margin": base_margin,
+            "sigmoid_scale": 1.0,
+            "comparison": "lt",
+            "input_dtype": "float32",
+            "arrays": _add_arrays(contents, "trees", tables),
+        }
+    else:
+        msg = f"Classifier of type {type(classifier).__name__} cannot be exported."
+        logger.error(msg)
+        raise ValueError(msg)
+    return manifest, contents
+
+
+class ArtifactModel:
+    """Model loaded from an artifact saved with `save_model_artifact`.
+
+    The predictions are computed with NumPy only, from the (memory-mapped) arrays
+    of the artifact.
+    """
+
+    def __init__(self, manifest: dict, arrays: dict) -> None:
+        """Create the model from its manifest and arrays.
+
+        Args:
+            manifest (dict): Content of the manifest file.
+            arrays (dict): Arrays of the preprocessing ("preprocessing" key) and of
+                the model ("model" key), keyed by name.
+        """
+        self.manifest = manifest
+        self.arrays = arrays
+        self.feature_names = manifest["feature_names"]
+        self.classes_ = np.array([0, 1])
+
+    def _transform(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names]
+        X = np.asarray(X)
+        if not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(np.float64)
+
+        # Cast after each operation, as sklearn scalers work in place
+        preprocessing = self.manifest["preprocessing"]
+        if preprocessing is None:
+            return X
+        offset = self.arrays["preprocessing"]["offset"]
+        scale = self.arrays["preprocessing"]["scale"]
+        if preprocessing["cast_statistics"]:
+            offset, scale = offset.astype(X.dtype), scale.astype(X.dtype)
+        if preprocessing["type"] == "standard_scaler":
+            X = (X - offset).astype(X.dtype, copy=False)
+            return (X / scale).astype(X.dtype, copy=False)
+        X = (X * scale).astype(X.dtype, copy=False)
+        return (X + offset).astype(X.dtype, copy=False)
+
+    def _predict_trees(self, X: np.ndarray) -> np.ndarray:
+        spec = self.manifest["model"]
+        t = self.arrays["model"]
+        X = X.astype(spec["input_dtype"], copy=False)
+        n_trees = t["roots"].size
+
+        values = np.empty((X.shape[0], n_trees))
+        for start in range(0, X.shape[0], TREE_BATCH_SIZE):
+            X_batch = X[start : start + TREE_BATCH_SIZE]
+            rows = np.arange(X_batch.shape[0])[:, None]
+            node = np.broadcast_to(t["roots"], (X_batch.shape[0], n_trees)).copy()
+            while True:
+                feature = t["feature"][node]
+                internal = feature >= 0
+                if not internal.any():
+                    break
+                x = X_batch[rows, np.where(internal, feature, 0)]
+                threshold = t["threshold"][node]
+                missing_type = t["missing_type"][node]
+                is_nan = np.isnan(x)
+                # LightGBM treats NaN as zero, unless NaN is the missing type
+                x = np.where(is_nan & (missing_type != MISSING_NAN), 0, x)
+                is_missing = np.where(
+                    missing_type == MISSING_NAN,
+                    is_nan,
+                    (missing_type == MISSING_ZERO) & (np.abs(x) <= 1e-35),
+                )
+                if spec["comparison"] == "lt":
+                    go_left = x < threshold.astype(X_batch.dtype)
+                else:
+                    go_left = x <= threshold
+                go_left = np.where(is_missing, t["default_left"][node], go_left)
+                child = np.where(go_left, t["left"][node], t["right"][node])
+                node = np.where(internal, child, node)
+            values[start : start + TREE_BATCH_SIZE] = t["value"][node]
+
+        if spec["aggregation"] == "mean":
+            return values.mean(axis=1)
+        margin = values.sum(axis=1) + spec["base_margin"]
+        return _sigmoid(spec["sigmoid_scale"] * margin)
+
+    def predict_proba(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """Predict class probabilities.
+
+        Args:
+            X (Union[np.ndarray, pd.DataFrame]): Input features to the model. If a
+                DataFrame, the columns are selected by name.
+
+        Returns:
+            np.ndarray: Probabilities of class 0 and class 1 for each sample.
+        """
+        X = self._transform(X)
+        spec = self.manifest["model"]
+        if spec["type"] == "linear":
+            decision = X @ self.arrays["model"]["coef"] + spec["intercept"]
+            if spec["link"] == "logistic":
+                proba = _sigmoid(decision)
+            else:
+                proba = (np.clip(decision, -1, 1) + 1) / 2
+        else:
+            proba = self._predict_trees(X)
+
+        postprocessing = self.manifest["postprocessing"]
+        if postprocessing is not None:
+            rate = postprocessing["majority_fraction"]
+            proba = rate * proba / (rate * proba + 1 - proba)
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """Predict classes.
+
+        Args:
+            X (Union[np.ndarray, pd.DataFrame]): Input features to the model.
+
+        Returns:
+            np.ndarray: Predicted class for each sample.
+        """
+        proba = self.predict_proba(X)[:, 1]
+        # Ties go to the negative class, except for the sampling-corrected models
+        if self.manifest["postprocessing"] is not None:
+            return self.classes_[(proba >= 0.5).astype(int)]
+        return self.classes_[(proba > 0.5).astype(int)]
+
+
+def load_model_artifact(
+    folder: Union[str, Path], mmap_mode: Optional[str] = "r"
+) -> ArtifactModel:
+    """Load a model saved with `save_model_artifact`.
+
+    Args:
+        folder (Union[str, Path]): Folder containing the artifact.
+        mmap_mode (Optional[str], optional): Memory-map mode of the arrays, see
+            `np.load`. Defaults to "r".
+
+    Returns:
+        ArtifactModel: The loaded model.
+    """
+    folder = Path(folder)
+    with open(folder / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT or (
+        manifest.get("format_version", 0) > ARTIFACT_FORMAT_VERSION
+    ):
+        msg = f"Unsupported model artifact format in {folder}."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    arrays = {}
+    for part in ("preprocessing", "model"):
+        files = (manifest[part] or {}).get("arrays", {})
+        arrays[part] = {
+            k: np.load(folder / v, mmap_mode=mmap_mode) for k, v in files.items()
+        }
+    return ArtifactModel(manifest, arrays)
+
+
+def artifact_files(folder: Union[str, Path]) -> list[str]:
+    """List the files of a model artifact, including the manifest.
+
+    Args:
+        folder (Union[str, Path]): Folder containing the artifact.
+
+    Returns:
+        list[str]: Names of the files.
+    """
+    with open(Path(folder) / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    files = [MANIFEST_FILE]
+    for part in ("preprocessing", "model"):
+        files += list((manifest[part] or {}).get("arrays", {}).values())
+    return files
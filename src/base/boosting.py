@@ -0,0 +1,458 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+from lightgbm import LGBMClassifier
+from loguru import logger
+from sklearn.base import BaseEstimator, ClassifierMixin
+from xgboost import XGBClassifier
+
+# LightGBM parameters that change how the training data is binned. All the other
+# parameters can be changed without rebuilding the Dataset
+LIGHTGBM_DATASET_PARAMS = (
+    "max_bin",
+    "max_bin_by_feature",
+    "min_data_in_bin",
+    "bin_construct_sample_cnt",
+    "data_random_seed",
+    "use_missing",
+    "zero_as_missing",
+    "enable_bundle",
+    "linear_tree",
+)
+# Names of the parameters of the LightGBM booster set by `LGBMClassifier`
+LIGHTGBM_SKLEARN_PARAMS = {
+    "boosting_type": "boosting",
+    "subsample_for_bin": "bin_construct_sample_cnt",
+    "min_split_gain": "min_gain_to_split",
+    "min_child_weight": "min_sum_hessian_in_leaf",
+    "min_child_samples": "min_data_in_leaf",
+    "subsample": "bagging_fraction",
+    "subsample_freq": "bagging_freq",
+    "colsample_bytree": "feature_fraction",
+    "reg_alpha": "lambda_l1",
+    "reg_lambda": "lambda_l2",
+    "random_state": "seed",
+    "n_jobs": "num_threads",
+}
+
+
+def lightgbm_train_params(params: Optional[dict] = None) -> tuple[dict, int]:
+    """Translate the parameters of `LGBMClassifier` to those of `lgb.train`.
+
+    The parameters missing from `params` take the defaults of `LGBMClassifier`,
+    so that the booster is the same as the one trained by the classifier.
+
+    Args:
+        params (Optional[dict]): Optional, default None. Parameters of
+            `LGBMClassifier`, including any native parameter of the booster.
+
+    Returns:
+        dict: Parameters of the booster, with their native names.
+        int: Number of boosting rounds.
+
+    Raises:
+        ValueError: If `class_weight` is set, use sample weights instead.
+    """
+    params = LGBMClassifier(**(params or {})).get_params()
+    if params.pop("class_weight", None) is not None:
+        msg = "`class_weight` is not supported, use sample weights instead."
+        logger.error(msg)
+        raise ValueError(msg)
+    for name in ("importance_type", "silent"):
+        params.pop(name, None)
+    num_boost_round = params.pop("n_estimators")
+
+    train_params = {"objective": params.pop("objective", None) or "binary"}
+    for name, value in params.items():
+        # Native names set explicitly take precedence over the sklearn ones
+        if name not in LIGHTGBM_SKLEARN_PARAMS:
+            train_params[name] = value
+    for name, native_name in LIGHTGBM_SKLEARN_PARAMS.items():
+        if params.get(name) is not None:
+            train_params.setdefault(native_name, params[name])
+    return train_params, num_boost_round
+
+
+def xgboost_train_params(params: Optional[dict] = None) -> tuple[dict, int, dict]:
+    """Translate the parameters of `XGBClassifier` to those of `xgb.train`.
+
+    The parameters missing from `params` take the defaults of `XGBClassifier`
+    (e.g. its `tree_method`), so that the booster is the same as the one trained
+    by the classifier.
+
+    Args:
+        params (Optional[dict]): Optional, default None. Parameters of
+            `XGBClassifier`, including any native parameter of the booster.
+
+    Returns:
+        dict: Parameters of the booster.
+        int: Number of boosting rounds.
+        dict: Other arguments of `xgb.train`, i.e. the callbacks and the early
+            stopping rounds.
+    """
+    params = dict(params or {})
+    params.pop("use_label_encoder", None)
+    classifier = XGBClassifier(**params)
+    sklearn_params = classifier.get_params()
+    train_args = {
+        k: sklearn_params[k]
+        for k in ("callbacks", "early_stopping_rounds")
+        if sklearn_params.get(k) is not None
+    }
+    return classifier.get_xgb_params(), sklearn_params["n_estimators"], train_args
+
+
+def binned_dataset_key(
+    data_version: str,
+    feature_names: list[str],
+    n_rows: int,
+    params: Optional[dict] = None,
+) -> str:
+    """Compute the cache key of a binned training dataset.
+
+    Args:
+        data_version (str): Version of the data the dataset was built from.
+        feature_names (list[str]): Features of the dataset, in order.
+        n_rows (int): Number of rows of the dataset.
+        params (Optional[dict]): Optional, default None. Any other parameter that
+            changes the content of the dataset (e.g. binning or resampling
+            parameters).
+
+    Returns:
+        str: Hex digest identifying the dataset.
+    """
+    payload = json.dumps(
+        dict(
+            data_version=data_version,
+            feature_names=list(feature_names),
+            n_rows=int(n_rows),
+            params=params or {},
+        ),
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def data_digest(*arrays: Optional[np.ndarray]) -> str:
+    """Compute a digest of the content of arrays or DataFrames.
+
+    Args:
+        *arrays (Optional[np.ndarray]): Arrays to hash, None values are skipped.
+
+    Returns:
+        str: Hex digest of the arrays, to be used as data version of a cache key.
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        if array is not None:
+            digest.update(np.ascontiguousarray(np.asarray(array)).tobytes())
+    return digest.hexdigest()[:32]
+
+
+def _raw_lightgbm_dataset(
+    key: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    params: Optional[dict] = None,
+    weight: Optional[np.ndarray] = None,
+    reference: Optional[lgb.Dataset] = None,
+) -> lgb.Dataset:
+    # Same signature as `BinnedDatasetCache.lightgbm_dataset`, but the dataset is
+    # not cached and keeps its raw data
+    params = {"feature_pre_filter": False, "verbosity": -1, **(params or {})}
+    return lgb.Dataset(
+        X,
+        label=y,
+        weight=weight,
+        params=params,
+        reference=reference,
+        free_raw_data=False,
+    )
+
+
+class BinnedDatasetCache:
+    """Local cache of LightGBM Datasets and XGBoost DMatrices saved in binary format.
+
+    Files are written to a temporary path and then renamed, so a partially written
+    file is never loaded by a concurrent reader.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]) -> None:
+        """Create the cache folder if it does not exist.
+
+        Args:
+            cache_dir (Union[str, Path]): Folder where the binary files are stored.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{key}.{suffix}"
+
+    def lightgbm_dataset(
+        self,
+        key: str,
+        X: np.ndarray,
+        y: np.ndarray,
+        params: Optional[dict] = None,
+        weight: Optional[np.ndarray] = None,
+        reference: Optional[lgb.Dataset] = None,
+    ) -> lgb.Dataset:
+        """Load a LightGBM Dataset from the cache, or build and save it.
+
+        Args:
+            key (str): Cache key of the dataset.
+            X (np.ndarray): Features, only used if the dataset is not cached.
+            y (np.ndarray): Target variable, only used if the dataset is not cached.
+            params (Optional[dict]): Optional, default None. Dataset parameters.
+            weight (Optional[np.ndarray]): Optional, default None. Sample weights.
+            reference (Optional[lgb.Dataset]): Optional, default None. Training
+                dataset whose bins are reused, to be set for validation datasets.
+
+        Returns:
+            lgb.Dataset: The constructed dataset.
+        """
+        path = self._path(key, "lgb.bin")
+        params = {"feature_pre_filter": False, "verbosity": -1, **(params or {})}
+        if path.exists():
+            logger.info(f"Loading LightGBM dataset from cache {path}.")
+            return lgb.Dataset(str(path), params=params, reference=reference)
+
+        logger.info(f"Building LightGBM dataset {key}.")
+        dataset = lgb.Dataset(
+            X,
+            label=y,
+            weight=weight,
+            params=params,
+            reference=reference,
+            free_raw_data=True,
+        ).construct()
+        tmp_path = self._path(f"{key}.{os.getpid()}.tmp", "lgb.bin")
+        dataset.save_binary(str(tmp_path))
+        os.replace(tmp_path, path)
+        logger.info(f"Saved LightGBM dataset to cache {path}.")
+        return dataset
+
+    def xgboost_dmatrix(
+        self,
+        key: str,
+        X: np.ndarray,
+        y: np.ndarray,
+        feature_names: Optional[list[str]] = None,
+        weight: Optional[np.ndarray] = None,
+    ) -> xgb.DMatrix:
+        """Load an XGBoost DMatrix from the cache, or build and save it.
+
+        Args:
+            key (str): Cache key of the DMatrix.
+            X (np.ndarray): Features, only used if the DMatrix is not cached.
+            y (np.ndarray): Target variable, only used if the DMatrix is not cached.
+            feature_names (Optional[list[str]]): Optional, default None. Names of
+                the features.
+            weight (Optional[np.ndarray]): Optional, default None. Sample weights.
+
+        Returns:
+            xgb.DMatrix: The DMatrix.
+        """
+        path = self._path(key, "dmatrix")
+        if path.exists():
+            logger.info(f"Loading XGBoost DMatrix from cache {path}.")
+            return xgb.DMatrix(str(path))
+
+        logger.info(f"Building XGBoost DMatrix {key}.")
+        dmatrix = xgb.DMatrix(X, label=y, weight=weight, feature_names=feature_names)
+        tmp_path = self._path(f"{key}.{os.getpid()}.tmp", "dmatrix")
+        dmatrix.save_binary(str(tmp_path))
+        os.replace(tmp_path, path)
+        logger.info(f"Saved XGBoost DMatrix to cache {path}.")
+        return dmatrix
+
+
+class CachedBoosterClassifier(ClassifierMixin, BaseEstimator):
+    """LightGBM or XGBoost binary classifier trained on cached binned datasets.
+
+    The model is trained with the native API of the library, so that the training
+    and validation datasets can be loaded from a `BinnedDatasetCache` instead of
+    being rebuilt from the input arrays at every run.
+    """
+
+    def __init__(
+        self,
+        booster: str = "lightgbm",
+        params: Optional[dict] = None,
+        cache_dir: Union[str, Path] = "binned_datasets",
+        cache_key: str = "default",
+    ) -> None:
+        """Set the parameters of the classifier.
+
+        Args:
+            booster (str): Optional, default "lightgbm". Either "lightgbm" or
+                "xgboost".
+            params (Optional[dict]): Optional, default None. Parameters of the
+                booster, as in the sklearn API of the library (e.g. n_estimators,
+                learning_rate, random_state). The missing parameters take the
+                defaults of `LGBMClassifier` or `XGBClassifier`, see
+                `lightgbm_train_params` and `xgboost_train_params`.
+            cache_dir (Union[str, Path]): Optional, default "binned_datasets".
+                Folder of the binned datasets cache.
+            cache_key (str): Optional, default "default". Cache key of the
+                training data, see `binned_dataset_key`.
+        """
+        self.booster = booster
+        self.params = params
+        self.cache_dir = cache_dir
+        self.cache_key = cache_key
+
+    def fit(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        sample_weight: Optional[np.ndarray] = None,
+        eval_set: Optional[list[tuple[np.ndarray, np.ndarray]]] = None,
+        verbose: Union[bool, int] = False,
+        init_model: Optional[Union[lgb.Booster, xgb.Booster]] = None,
+    ):
+        """Train the booster, loading the binned datasets from the cache if possible.
+
+        Args:
+            X (np.ndarray): Training data features.
+            y (np.ndarray): Training data target variable.
+            sample_weight (Optional[np.ndarray]): Optional, default None. Weights
+                of the training samples.
+            eval_set (Optional[list[tuple[np.ndarray, np.ndarray]]]): Optional,
+                default None. Validation sets, evaluated at each boosting round.
+            verbose (Union[bool, int]): Optional, default False. Whether (or how
+                often) to log the evaluation metrics.
+            init_model (Optional[Union[lgb.Booster, xgb.Booster]]): Optional,
+                default None. Trained booster to continue, e.g. the `booster_` of
+                a fitted classifier, with `n_estimators` new boosting rounds.
+                LightGBM computes the scores of the initial booster on the raw
+                data, which the cached datasets do not keep, so the LightGBM
+                datasets are not cached in this case.
+
+        Returns:
+            CachedBoosterClassifier: The fitted classifier.
+        """
+        cache = BinnedDatasetCache(self.cache_dir)
+        feature_names = [str(c) for c in getattr(X, "columns", [])] or None
+        eval_set = eval_set or []
+
+        if self.booster == "lightgbm":
+            params, num_boost_round = lightgbm_train_params(self.params)
+            dataset_params = {
+                k: params[k] for k in LIGHTGBM_DATASET_PARAMS if k in params
+            }
+            build_dataset = cache.lightgbm_dataset
+            if init_model is not None:
+                build_dataset = _raw_lightgbm_dataset
+            train_set = build_dataset(
+                f"{self.cache_key}_train",
+                X,
+                y,
+                params=dataset_params,
+                weight=sample_weight,
+            )
+            valid_sets = [
+                build_dataset(
+                    self._eval_set_key(X_valid, y_valid),
+                    X_valid,
+                    y_valid,
+                    params=dataset_params,
+                    reference=train_set,
+                )
+                for X_valid, y_valid in eval_set
+            ]
+            callbacks = []
+            if verbose:
+                callbacks.append(lgb.log_evaluation(int(verbose)))
+            self.booster_ = lgb.train(
+                params,
+                train_set,
+                num_boost_round=num_boost_round,
+                valid_sets=valid_sets,
+                callbacks=callbacks,
+                init_model=init_model,
+            )
+        elif self.booster == "xgboost":
+            params, num_boost_round, train_args = xgboost_train_params(self.params)
+            dtrain = cache.xgboost_dmatrix(
+                f"{self.cache_key}_train",
+                X,
+                y,
+                feature_names=feature_names,
+                weight=sample_weight,
+            )
+            evals = [
+                (
+                    cache.xgboost_dmatrix(
+                        self._eval_set_key(X_valid, y_valid),
+                        X_valid,
+                        y_valid,
+                        feature_names=feature_names,
+                    ),
+                    f"validation_{i}",
+                )
+                for i, (X_valid, y_valid) in enumerate(eval_set)
+            ]
+            self.booster_ = xgb.train(
+                params,
+                dtrain,
+                num_boost_round=num_boost_round,
+                evals=evals,
+                verbose_eval=verbose,
+                xgb_model=init_model,
+                **train_args,
+            )
+        else:
+            msg = "`booster` must be one of 'lightgbm', 'xgboost'."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.classes_ = np.array([0, 1])
+        self.feature_names_ = feature_names
+        return self
+
+    def _eval_set_key(self, X_valid: np.ndarray, y_valid: np.ndarray) -> str:
+        # The validation sets change without the training set, e.g. with the new
+        # rows of an incremental split refresh, so they are keyed by their content
+        return f"{self.cache_key}_valid_{data_digest(X_valid, y_valid)}"
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Predict class probabilities.
+
+        Args:
+            X (np.ndarray): Input features to the model.
+
+        Returns:
+            np.ndarray: Probabilities of class 0 and class 1 for each sample.
+        """
+        if self.booster == "xgboost":
+            X = xgb.DMatrix(np.asarray(X), feature_names=self.feature_names_)
+            # Only the rounds up to the best one with early stopping, as in
+            # `XGBClassifier` (LightGBM boosters do the same by default)
+            try:
+                iteration_range = (0, self.booster_.best_iteration + 1)
+            except AttributeError:
+                iteration_range = (0, 0)
+            proba = self.booster_.predict(X, iteration_range=iteration_range)
+        else:
+            proba = self.booster_.predict(np.asarray(X))
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict classes.
+
+        Args:
+            X (np.ndarray): Input features to the model.
+
+        Returns:
+            np.ndarray: Predicted class for each sample.
+        """
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
@@ -0,0 +1,172 @@
+import json
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from loguru import logger
+
+# Label of the split of each transaction, in the data extracted from the split table
+SPLIT_COLUMN = "split"
+
+
+class TabularData:
+    """Compact, array-backed container for a labelled dataset.
+
+    The features are stored in a single C-contiguous 2-D array, so that they can be
+    handed to sklearn / LightGBM / XGBoost without being copied. The target and the
+    transaction ids are stored in separate 1-D arrays.
+    """
+
+    def __init__(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        ids: np.ndarray,
+        feature_names: list[str],
+    ) -> None:
+        """Create the container, checking that all the arrays are consistent.
+
+        Args:
+            X (np.ndarray): Features, with shape (n_samples, n_features).
+            y (np.ndarray): Target variable, with shape (n_samples,).
+            ids (np.ndarray): Transaction ids, with shape (n_samples,).
+            feature_names (list[str]): Names of the columns of `X`.
+        """
+        if X.ndim != 2 or X.shape[1] != len(feature_names):
+            msg = (
+                f"`X` must have shape (n_samples, {len(feature_names)}), "
+                f"got {X.shape} instead."
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+        if not (X.shape[0] == y.shape[0] == ids.shape[0]):
+            msg = "`X`, `y` and `ids` must have the same number of samples."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        self.X = X
+        self.y = y
+        self.ids = ids
+        self.feature_names = list(feature_names)
+
+    def __len__(self) -> int:
+        """Number of samples in the dataset."""
+        return self.X.shape[0]
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """Shape of the feature matrix."""
+        return self.X.shape
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Features as a DataFrame sharing memory with `X`.
+
+        Use this instead of `X` when the feature names need to be preserved by
+        the model (e.g. to be able to predict on DataFrames at serving time).
+        """
+        return pd.DataFrame(self.X, columns=self.feature_names, copy=False)
+
+    def save_npy(self, folder: Union[str, Path]) -> None:
+        """Save the arrays as .npy files, so they can be memory-mapped when loaded.
+
+        Args:
+            folder (Union[str, Path]): Folder where the files are saved.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        np.save(folder / "X.npy", self.X)
+        np.save(folder / "y.npy", self.y)
+        np.save(folder / "ids.npy", self.ids)
+        with open(folder / "feature_names.json", "w") as f:
+            json.dump(self.feature_names, f)
+
+    @classmethod
+    def load_npy(
+        cls, folder: Union[str, Path], mmap_mode: Optional[str] = "r"
+    ) -> "TabularData":
+        """Load a dataset saved with `save_npy`.
+
+        Args:
+            folder (Union[str, Path]): Folder containing the files.
+            mmap_mode (Optional[str], optional): Memory-map mode of the arrays, see
+                `np.load`. With the default read-only mode, several processes can
+                share the same copy of the data. Defaults to "r".
+
+        Returns:
+            TabularData: The loaded dataset.
+        """
+        folder = Path(folder)
+        with open(folder / "feature_names.json") as f:
+            feature_names = json.load(f)
+        return cls(
+            X=np.load(folder / "X.npy", mmap_mode=mmap_mode),
+            y=np.load(folder / "y.npy", mmap_mode=mmap_mode),
+            ids=np.load(folder / "ids.npy", mmap_mode=mmap_mode),
+            feature_names=feature_names,
+        )
+
+
+def load_dataset(
+    path: Union[str, Path, pa.Table],
+    target_column: str,
+    id_column: str = "transaction_id",
+    feature_columns: Optional[list[str]] = None,
+    dtype: np.dtype = np.float32,
+) -> TabularData:
+    """Load a Parquet or in-memory Arrow dataset into a `TabularData` container.
+
+    Only the required columns are read, and the file is converted one record batch
+    at a time into a preallocated array, so that the peak memory usage is close to
+    the size of the output.
+
+    Args:
+        path (Union[str, Path, pa.Table]): Parquet file or folder containing
+            Parquet files, or Arrow table (e.g. read with `read_table_to_arrow`).
+        target_column (str): Column containing the target variable.
+        id_column (str): Column containing the transaction ids. Defaults to
+            "transaction_id".
+        feature_columns (Optional[list[str]], optional): Columns to use as features.
+            If None, use all the columns except `target_column`, `id_column` and
+            the split label. Defaults to None.
+        dtype (np.dtype, optional): Data type of the feature matrix. Defaults to
+            np.float32.
+
+    Returns:
+        TabularData: The loaded dataset.
+    """
+    if isinstance(path, pa.Table):
+        dataset = ds.dataset(path)
+    else:
+        dataset = ds.dataset(str(path), format="parquet")
+
+    if feature_columns is None:
+        feature_columns = [
+            c
+            for c in dataset.schema.names
+            if c not in (target_column, id_column, SPLIT_COLUMN)
+        ]
+    columns = [*feature_columns, target_column, id_column]
+
+    n_rows = dataset.count_rows()
+    X = np.empty((n_rows, len(feature_columns)), dtype=dtype)
+    y = np.empty(n_rows, dtype=np.int8)
+    ids = np.empty(n_rows, dtype=np.int64)
+
+    start = 0
+    for batch in dataset.to_batches(columns=columns):
+        stop = start + batch.num_rows
+        for i, col in enumerate(feature_columns):
+            X[start:stop, i] = batch.column(col).to_numpy(zero_copy_only=False)
+        y[start:stop] = batch.column(target_column).to_numpy(zero_copy_only=False)
+        ids[start:stop] = batch.column(id_column).to_numpy(zero_copy_only=False)
+        start = stop
+
+    source = "an Arrow table" if isinstance(path, pa.Table) else path
+    logger.debug(
+        f"Loaded {n_rows} rows and {len(feature_columns)} features from {source}."
+    )
+    return TabularData(X=X, y=y, ids=ids, feature_names=feature_columns)
@@ -0,0 +1,143 @@
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from probatus.feature_elimination import ShapRFECV
+from sklearn.base import ClassifierMixin, clone
+from sklearn.metrics import average_precision_score
+
+
+def measure_scoring_latency(
+    classifier: ClassifierMixin,
+    X: pd.DataFrame,
+    n_repeats: int = 5,
+    n_single_rows: int = 100,
+) -> dict:
+    """Measure the time taken by a trained classifier to score new data.
+
+    Args:
+        classifier (ClassifierMixin): Trained classifier.
+        X (pd.DataFrame): Data to score.
+        n_repeats (int): Optional, default 5. Number of times the whole data is
+            scored. The median duration is reported.
+        n_single_rows (int): Optional, default 100. Number of rows scored one at a
+            time, as done by the serving API.
+
+    Returns:
+        dict: Median time to score 1000 rows in a batch, and median time to score a
+            single row, in milliseconds.
+    """
+    batch_times = []
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        classifier.predict_proba(X)
+        batch_times.append(time.perf_counter() - start)
+
+    single_times = []
+    for i in range(min(n_single_rows, len(X))):
+        row = X.iloc[[i]]
+        start = time.perf_counter()
+        classifier.predict_proba(row)
+        single_times.append(time.perf_counter() - start)
+
+    return {
+        "batch_latency_ms_per_1000_rows": 1e6 * np.median(batch_times) / len(X),
+        "single_row_latency_ms": 1e3 * np.median(single_times),
+    }
+
+
+def shap_feature_elimination(
+    classifier: ClassifierMixin,
+    X_train: pd.DataFrame,
+    y_train: np.ndarray,
+    X_valid: pd.DataFrame,
+    y_valid: np.ndarray,
+    step: float = 0.1,
+    min_features_to_select: int = 5,
+    cv: int = 5,
+    n_jobs: int = -1,
+    tolerance: Optional[float] = None,
+    columns_to_keep: Optional[list[str]] = None,
+    random_state: int = 42,
+) -> tuple[list[str], pd.DataFrame]:
+    """Prune the features of a model with recursive feature elimination using SHAP.
+
+    At each step of the elimination, the features with the lowest mean absolute
+    SHAP value are removed, and the model is evaluated with cross-validation on the
+    training data (in parallel over the folds). The model is then fit on the whole
+    training data with the remaining features, to measure its average precision on
+    the validation data and its scoring latency.
+
+    The selected feature set is the smallest one whose cross-validated average
+    precision is within `tolerance` of the best one.
+
+    Args:
+        classifier (ClassifierMixin): Untrained classifier supported by SHAP, e.g.
+            a tree-based model.
+        X_train (pd.DataFrame): Training data features.
+        y_train (np.ndarray): Training data target variable.
+        X_valid (pd.DataFrame): Validation data features.
+        y_valid (np.ndarray): Validation data target variable.
+        step (float): Optional, default 0.1. Number (if int) or fraction (if float)
+            of features removed at each step.
+        min_features_to_select (int): Optional, default 5. Minimum number of
+            features to keep.
+        cv (int): Optional, default 5. Number of cross-validation folds.
+        n_jobs (int): Optional, default -1. Number of folds evaluated in parallel.
+            If -1, use all the available cores.
+        tolerance (Optional[float]): Optional, default None. Maximum decrease of
+            cross-validated average precision with respect to the best feature
+            set. If None, use the standard deviation across the folds of the best
+            feature set.
+        columns_to_keep (Optional[list[str]]): Optional, default None. Features that
+            are never removed.
+        random_state (int): Optional, default 42. Random state of the
+            cross-validation.
+
+    Returns:
+        list[str]: Selected features, in the same order as in `X_train`.
+        pd.DataFrame: Report with the number of features, the cross-validated and
+            validation average precision and the scoring latency at each step.
+    """
+    shap_elimination = ShapRFECV(
+        classifier,
+        step=step,
+        min_features_to_select=min_features_to_select,
+        cv=cv,
+        scoring="average_precision",
+        n_jobs=n_jobs,
+        verbose=0,
+        random_state=random_state,
+    )
+    report = shap_elimination.fit_compute(
+        X_train, y_train, columns_to_keep=columns_to_keep
+    )
+    report = report.reset_index(drop=True)
+    logger.info(f"Completed SHAP feature elimination in {len(report)} steps.")
+
+    valid_ap, latencies = [], []
+    for features in report["features_set"]:
+        model = clone(classifier).fit(X_train[features], y_train)
+        probas = model.predict_proba(X_valid[features])[:, 1]
+        valid_ap.append(average_precision_score(y_valid, probas))
+        latencies.append(measure_scoring_latency(model, X_valid[features]))
+        logger.debug(
+            f"Validation average precision with {len(features)} features: "
+            f"{valid_ap[-1]:.4f}."
+        )
+    report["valid_average_precision"] = valid_ap
+    report = pd.concat([report, pd.DataFrame(latencies)], axis=1)
+
+    best = report["val_metric_mean"].idxmax()
+    if tolerance is None:
+        tolerance = report.loc[best, "val_metric_std"]
+    threshold = report.loc[best, "val_metric_mean"] - tolerance
+    candidates = report[report["val_metric_mean"] >= threshold]
+    selected = candidates.loc[candidates["num_features"].idxmin(), "features_set"]
+    report["selected"] = report["num_features"] == len(selected)
+
+    selected = [c for c in X_train.columns if c in set(selected)]
+    logger.info(f"Selected {len(selected)} out of {X_train.shape[1]} features.")
+    return selected, report
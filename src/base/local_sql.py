@@ -0,0 +1,665 @@
+import re
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+
+from src.base.schemas import RAW_TABLES
+from src.base.sql import _mask_comments_and_strings, split_script
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Pandas types of the empty columns of the generated raw tables
+MISSING_DTYPES = {"INT64": "Int64", "FLOAT64": "float64", "STRING": "string"}
+# Clauses of the CREATE TABLE statements that only matter to BigQuery storage
+STORAGE_CLAUSES = re.compile(
+    r"^[ \t]*(CLUSTER BY|PARTITION BY RANGE_BUCKET|PARTITION BY DATE|OPTIONS\s*\().*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# `CREATE TABLE ... COPY` statements, copying a table into a new one
+TABLE_COPY = re.compile(
+    r"^(\s*CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\S+)"
+    r"\s+COPY\s+(\S+)\s*$",
+    re.IGNORECASE,
+)
+
+
+def _check_duckdb() -> None:
+    if duckdb is None:
+        msg = "The local SQL backend requires duckdb, install the test dependencies."
+        logger.error(msg)
+        raise ImportError(msg)
+
+
+def _closing_parenthesis(masked: str, start: int) -> int:
+    """Position of the parenthesis closing the one at position `start`."""
+    depth = 0
+    for i in range(start, len(masked)):
+        if masked[i] == "(":
+            depth += 1
+        elif masked[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    msg = f"Unbalanced parenthesis at position {start} of the statement."
+    logger.error(msg)
+    raise ValueError(msg)
+
+
+def _split_arguments(sql: str, masked: str) -> list[str]:
+    """Split the arguments of a function call on the top-level commas."""
+    arguments, depth, start = [], 0, 0
+    for i, c in enumerate(masked):
+        depth += (c == "(") - (c == ")")
+        if c == "," and depth == 0:
+            arguments.append(sql[start:i].strip())
+            start = i + 1
+    arguments.append(sql[start:].strip())
+    return arguments
+
+
+def _replace_calls(
+    sql: str, name: str, replace: Callable[[list[str], str], Any]
+) -> str:
+    """Replace the calls of a function, e.g. to a DuckDB equivalent.
+
+    Args:
+        sql (str): SQL code.
+        name (str): Name of the function, or regular expression matching it.
+        replace (Callable[[list[str], str], Any]): Function of the
+            (already translated) arguments and of the text following the call,
+            returning the replacement of the call. If it returns None, the call is
+            left as it is. The replacement can also consume a subscript following
+            the call, by returning a tuple (replacement, number of characters).
+
+    Returns:
+        str: The SQL code with the replaced calls.
+    """
+    masked = _mask_comments_and_strings(sql)
+    pattern = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    position = 0
+    while (match := pattern.search(masked, position)) is not None:
+        opening = match.end() - 1
+        closing = _closing_parenthesis(masked, opening)
+        arguments = [
+            _replace_calls(a, name, replace)
+            for a in _split_arguments(
+                sql[opening + 1 : closing], masked[opening + 1 : closing]
+            )
+        ]
+        replacement = replace(arguments, sql[closing + 1 :])
+        if replacement is None:
+            position = match.end()
+            continue
+        consumed = 0
+        if isinstance(replacement, tuple):
+            replacement, consumed = replacement
+        end = closing + 1 + consumed
+        sql = sql[: match.start()] + replacement + sql[end:]
+        masked = (
+            masked[: match.start()]
+            + _mask_comments_and_strings(replacement)
+            + masked[end:]
+        )
+        position = match.start() + len(replacement)
+    return sql
+
+
+def _double_quoted_strings_to_single(sql: str) -> str:
+    """Turn the double-quoted string literals of BigQuery into single-quoted ones."""
+    masked = _mask_comments_and_strings(sql)
+    out, i = [], 0
+    while i < len(sql):
+        if sql[i] == '"' and masked[i] == " ":
+            end = i + 1
+            while sql[end] != '"':
+                end += 2 if sql[end] == "\\" else 1
+            content = sql[i + 1 : end].replace('\\"', '"').replace("'", "''")
+            out.append(f"'{content}'")
+            i = end + 1
+        else:
+            out.append(sql[i])
+            i += 1
+    return "".join(out)
+
+
+def _approx_quantiles(arguments: list[str], following: str) -> Optional[tuple]:
+    # APPROX_QUANTILES(x, n)[OFFSET(k)] is the k-th of the n-quantiles of x
+    match = re.match(r"\s*\[\s*OFFSET\s*\(", following, re.IGNORECASE)
+    if match is None:
+        return None
+    masked = _mask_comments_and_strings(following)
+    closing = _closing_parenthesis(masked, match.end() - 1)
+    bracket = masked.index("]", closing)
+    offset = following[match.end() : closing]
+    expression = f"quantile_disc({arguments[0]}, ({offset}) / {arguments[1]})"
+    return expression, bracket + 1
+
+
+def _extract(arguments: list[str], _) -> Optional[str]:
+    # BigQuery numbers the days of the week from 1 (Sunday), DuckDB from 0
+    part, _, expression = arguments[0].partition(" ")
+    expression = re.sub(r"^\s*FROM\s+", "", expression, flags=re.IGNORECASE)
+    if part.upper() == "DAYOFWEEK":
+        return f"(1 + dayofweek({expression}))"
+    if part.upper() == "DATE":
+        return f"CAST({expression} AS DATE)"
+    return None
+
+
+def _merge_to_insert(statement: str) -> str:
+    """Turn a MERGE only inserting the new rows into an INSERT ... WHERE NOT EXISTS."""
+    masked = _mask_comments_and_strings(statement)
+    header = re.match(
+        r"\s*MERGE\s+(?:INTO\s+)?(\S+)\s+(?:AS\s+)?(\w+)\s+USING\s+", masked, re.I
+    )
+    if header is None:
+        return statement
+    start = header.end()
+    if masked[start] == "(":
+        source_end = _closing_parenthesis(masked, start) + 1
+    else:
+        source_end = start + len(masked[start:].split()[0])
+    rest = re.match(
+        r"\s+(?:AS\s+)?(\w+)\s+ON\s+(.+?)\s+WHEN\s+NOT\s+MATCHED\s+(?:BY\s+TARGET\s+)?"
+        r"THEN\s+INSERT\s+ROW\s*$",
+        masked[source_end:],
+        re.IGNORECASE | re.DOTALL,
+    )
+    if rest is None:
+        msg = "Only MERGE statements inserting the unmatched rows are supported."
+        logger.error(msg)
+        raise ValueError(msg)
+    target = statement[header.start(1) : header.end(1)]
+    condition_start = source_end + rest.start(2)
+    condition = statement[condition_start : source_end + rest.end(2)]
+    return (
+        f"INSERT INTO {target}\n"
+        f"SELECT {rest.group(1)}.*\n"
+        f"FROM {statement[start:source_end]} {rest.group(1)}\n"
+        f"WHERE NOT EXISTS (\n"
+        f"    SELECT 1 FROM {target} {header.group(2)}\n"
+        f"    WHERE {condition}\n"
+        f")"
+    )
+
+
+def bigquery_to_duckdb(statement: str) -> str:
+    """Translate a BigQuery statement to DuckDB.
+
+    Only the BigQuery constructs used by the queries of the pipelines are
+    translated: string literals and quoted identifiers, the storage clauses of
+    `CREATE TABLE`, `CREATE TABLE ... COPY`, `SAFE_DIVIDE`, `DATE_DIFF`,
+    `DATETIME`, `UNIX_SECONDS`, `EXTRACT`, `APPROX_QUANTILES(...)[OFFSET(...)]`,
+    `SELECT * EXCEPT`, named windows with a frame and
+    `MERGE ... WHEN NOT MATCHED THEN INSERT ROW`.
+
+    Args:
+        statement (str): BigQuery statement, not a procedural one.
+
+    Returns:
+        str: The equivalent DuckDB statement.
+    """
+    statement = _double_quoted_strings_to_single(statement)
+    statement = _merge_to_insert(statement)
+    statement = statement.replace("`", '"')
+    statement = STORAGE_CLAUSES.sub("", statement)
+    statement = TABLE_COPY.sub(r"\1 AS SELECT * FROM \2", statement)
+
+    statement = _replace_calls(
+        statement,
+        "SAFE_DIVIDE",
+        lambda a, _: f"(CASE WHEN ({a[1]}) = 0 THEN NULL ELSE ({a[0]}) / ({a[1]}) END)",
+    )
+    statement = _replace_calls(
+        statement,
+        "DATE_DIFF",
+        lambda a, _: f"date_diff('{a[2].lower()}', {a[1]}, {a[0]})",
+    )
+    statement = _replace_calls(
+        statement,
+        "DATETIME",
+        lambda a, _: f"make_timestamp({', '.join(a)})" if len(a) == 6 else None,
+    )
+    statement = _replace_calls(
+        statement, "UNIX_SECONDS", lambda a, _: f"CAST(epoch({a[0]}) AS BIGINT)"
+    )
+    statement = _replace_calls(statement, "APPROX_QUANTILES", _approx_quantiles)
+    statement = _replace_calls(statement, "EXTRACT", _extract)
+    statement = re.sub(r"\.\*\s+EXCEPT\s*\(", ".* EXCLUDE(", statement, flags=re.I)
+    # DuckDB only accepts `OVER name` for named windows with a frame
+    return re.sub(r"\bOVER\s*\(\s*(\w+)\s*\)", r"OVER \1", statement, flags=re.I)
+
+
+def _sql_literal(value: Any) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "NULL"
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return repr(value.item() if hasattr(value, "item") else value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class LocalScript:
+    """Interpreter of the procedural BigQuery scripts, running on DuckDB.
+
+    DuckDB has no scripting, so `DECLARE`, `SET`, `IF` and `BEGIN ... EXCEPTION
+    WHEN ERROR THEN ... END` are evaluated here. The values of the variables are
+    substituted in the statements before translating and running them.
+    """
+
+    def __init__(self, connection: Any) -> None:
+        """Create the interpreter.
+
+        Args:
+            connection (Any): DuckDB connection running the statements.
+        """
+        self.connection = connection
+        self.variables = {}
+
+    def substitute(self, statement: str) -> str:
+        """Replace the variables of a statement with their values."""
+        if not self.variables:
+            return statement
+        masked = _mask_comments_and_strings(statement)
+        pattern = re.compile(
+            rf"(?<![\w.])({'|'.join(map(re.escape, self.variables))})(?![\w])",
+            re.IGNORECASE,
+        )
+        out, position = [], 0
+        for match in pattern.finditer(masked):
+            # Column aliases may have the name of a variable, e.g. `(...) AS x`
+            if re.search(r"(\bAS|[)\]])\s*$", masked[: match.start()], re.I):
+                continue
+            out.append(statement[position : match.start()])
+            out.append(_sql_literal(self.variables[match.group(1).lower()]))
+            position = match.end()
+        out.append(statement[position:])
+        return "".join(out)
+
+    def evaluate(self, expression: str) -> tuple:
+        """Values of an expression, or of the columns of a `SELECT AS STRUCT`."""
+        expression = expression.strip()
+        masked = _mask_comments_and_strings(expression)
+        if (
+            masked.startswith("(")
+            and _closing_parenthesis(masked, 0) == len(masked) - 1
+        ):
+            inner = expression[1:-1].strip()
+            if re.match(r"SELECT\s+AS\s+STRUCT\b", inner, re.IGNORECASE):
+                query = re.sub(r"^SELECT\s+AS\s+STRUCT\b", "SELECT", inner, flags=re.I)
+            elif re.match(r"SELECT\b", inner, re.IGNORECASE):
+                query = f"SELECT ({inner})"
+            else:
+                query = f"SELECT {inner}"
+        else:
+            query = f"SELECT {expression}"
+        row = self.execute(query).fetchone()
+        return tuple(row) if row is not None else (None,)
+
+    def execute(self, statement: str) -> Any:
+        """Substitute the variables, translate and run a statement."""
+        return self.connection.execute(bigquery_to_duckdb(self.substitute(statement)))
+
+    def run(self, script: str) -> Optional[pd.DataFrame]:
+        """Run a script.
+
+        Args:
+            script (str): BigQuery script.
+
+        Returns:
+            Optional[pd.DataFrame]: Result of the last statement, if it is a query.
+        """
+        result = None
+        for statement in split_script(script):
+            result = self.run_statement(statement)
+        return result
+
+    def run_statement(self, statement: str) -> Optional[pd.DataFrame]:
+        """Run a single statement, procedural or not."""
+        masked = _mask_comments_and_strings(statement)
+        offset = len(masked) - len(masked.lstrip())
+        keyword = masked.split()[0].upper()
+
+        if keyword == "DECLARE":
+            match = re.match(
+                r"DECLARE\s+([\w\s,]+?)\s+\w+(?:<.*>)?(?:\s+DEFAULT\s+(.*))?$",
+                statement[offset:],
+                re.IGNORECASE | re.DOTALL,
+            )
+            names = [n.strip().lower() for n in match.group(1).split(",")]
+            value = None if match.group(2) is None else self.evaluate(match.group(2))[0]
+            self.variables.update({n: value for n in names})
+        elif keyword == "SET":
+            match = re.match(
+                r"SET\s+(\(.*?\)|\w+)\s*=\s*(.*)$",
+                statement[offset:],
+                re.IGNORECASE | re.DOTALL,
+            )
+            names = [n.strip().lower() for n in match.group(1).strip("()").split(",")]
+            values = self.evaluate(match.group(2))
+            self.variables.update(dict(zip(names, values)))
+        elif keyword == "IF":
+            for condition, body in self._if_branches(statement[offset:]):
+                if condition is None or self.evaluate(condition)[0] is True:
+                    return self.run(body)
+        elif keyword == "BEGIN":
+            body, handler = self._begin_block(statement[offset:])
+            try:
+                return self.run(body)
+            except duckdb.Error as e:
+                if handler is None:
+                    raise e
+                logger.debug(f"Handled error: {e}.")
+                return self.run(handler)
+        else:
+            cursor = self.execute(statement)
+            if cursor.description is not None:
+                return cursor.df()
+        return None
+
+    @staticmethod
+    def _if_branches(statement: str) -> list[tuple]:
+        """Conditions (None for ELSE) and bodies of an `IF ... END IF` block."""
+        masked = _mask_comments_and_strings(statement)
+        end = re.search(r"\bEND\s+IF\s*$", masked, re.IGNORECASE)
+        then = re.search(r"\bTHEN\b", masked, re.IGNORECASE)
+        branches = [[statement[2 : then.start()], []]]
+        for piece in split_script(statement[then.end() : end.start()]):
+            piece_masked = _mask_comments_and_strings(piece)
+            elseif = re.match(r"\s*ELSEIF\b(.*?)\bTHEN\b", piece_masked, re.I | re.S)
+            if elseif is not None:
+                branches.append(
+                    [piece[elseif.start(1) : elseif.end(1)], [piece[elseif.end() :]]]
+                )
+            elif re.match(r"\s*ELSE\b", piece_masked, re.IGNORECASE):
+                start = re.match(r"\s*ELSE\b", piece_masked, re.IGNORECASE).end()
+                branches.append([None, [piece[start:]]])
+            else:
+                branches[-1][1].append(piece)
+        return [(c, ";\n".join(b)) for c, b in branches]
+
+    @staticmethod
+    def _begin_block(statement: str) -> tuple:
+        """Body and error handler (or None) of a `BEGIN ... END` block."""
+        masked = _mask_comments_and_strings(statement)
+        end = re.search(r"\bEND\s*$", masked, re.IGNORECASE)
+        body, handler = [], None
+        for piece in split_script(statement[len("BEGIN") : end.start()]):
+            piece_masked = _mask_comments_and_strings(piece)
+            match = re.match(
+                r"\s*EXCEPTION\s+WHEN\s+ERROR\s+THEN\b", piece_masked, re.IGNORECASE
+            )
+            if match is not None:
+                handler = [piece[match.end() :]]
+            elif handler is not None:
+                handler.append(piece)
+            else:
+                body.append(piece)
+        return ";\n".join(body), None if handler is None else ";\n".join(handler)
+
+
+class LocalQueryJob:
+    """Query job of a `LocalClient`, run when its result is requested."""
+
+    def __init__(self, client: "LocalClient", query: str) -> None:
+        """Create the job of a query, or of a script, of a client."""
+        self.client = client
+        self.query = query
+
+    def result(self) -> Optional[pd.DataFrame]:
+        """Run the query on a new cursor of the client database.
+
+        Returns:
+            Optional[pd.DataFrame]: Result of the last statement, if it is a query.
+        """
+        with self.client.connection.cursor() as cursor:
+            return LocalScript(cursor).run(self.query)
+
+
+class LocalClient:
+    """Local stand-in for the BigQuery client, backed by DuckDB.
+
+    The tables are Parquet files registered under their BigQuery IDs, so that the
+    templates of the pipelines run unchanged. Each query job runs on its own
+    cursor, so that jobs can run concurrently (e.g. with `StatementGraph.run`),
+    and temporary tables only exist within the job creating them, as in BigQuery.
+    """
+
+    def __init__(
+        self,
+        tables: Optional[dict[str, Union[str, Path]]] = None,
+        database: str = ":memory:",
+    ) -> None:
+        """Create the client.
+
+        Args:
+            tables (Optional[dict[str, Union[str, Path]]]): Parquet file, or folder
+                of Parquet files, of each table, by BigQuery table ID. Defaults to
+                None.
+            database (str): Path of the DuckDB database. Defaults to ":memory:".
+        """
+        _check_duckdb()
+        self.connection = duckdb.connect(database)
+        for table_id, path in (tables or {}).items():
+            self.register_parquet(table_id, path)
+
+    def register_parquet(self, table_id: str, path: Union[str, Path]) -> None:
+        """Expose Parquet data as a table.
+
+        Args:
+            table_id (str): BigQuery ID of the table (e.g. `project.dataset.table`).
+            path (Union[str, Path]): Parquet file or folder of Parquet files.
+        """
+        path = Path(path)
+        pattern = str(path / "*.parquet") if path.is_dir() else str(path)
+        self.connection.execute(
+            f'CREATE OR REPLACE VIEW "{table_id}" AS '
+            f"SELECT * FROM read_parquet('{pattern}')"
+        )
+
+    def query(self, query: str, job_config: Optional[Any] = None) -> LocalQueryJob:
+        """Create a query job, the job configuration is ignored.
+
+        Args:
+            query (str): BigQuery script.
+            job_config (Optional[Any]): Ignored. Defaults to None.
+
+        Returns:
+            LocalQueryJob: The job, run when its result is requested.
+        """
+        return LocalQueryJob(self, query)
+
+    def delete_table(self, table: str, not_found_ok: bool = False) -> None:
+        """Delete a table.
+
+        Args:
+            table (str): BigQuery ID of the table.
+            not_found_ok (bool): Whether to ignore missing tables. Defaults to False.
+        """
+        if_exists = "IF EXISTS " if not_found_ok else ""
+        self.connection.execute(f'DROP TABLE {if_exists}"{table}"')
+
+    def to_dataframe(self, table: str) -> pd.DataFrame:
+        """Content of a table.
+
+        Args:
+            table (str): BigQuery ID of the table.
+
+        Returns:
+            pd.DataFrame: The rows of the table.
+        """
+        return self.connection.execute(f'SELECT * FROM "{table}"').df()
+
+    def export_table(self, table: str, path: Union[str, Path]) -> None:
+        """Export a table as a Parquet file, as the BQ extraction step would.
+
+        Args:
+            table (str): BigQuery ID of the table.
+            path (Union[str, Path]): Path of the Parquet file.
+        """
+        self.connection.execute(
+            f"COPY (SELECT * FROM \"{table}\") TO '{path}' (FORMAT PARQUET)"
+        )
+
+
+class LocalStorageReader:
+    """Local stand-in for `StorageReader`, reading the tables of a `LocalClient`.
+
+    The column projection and the row restriction are applied by DuckDB, and the
+    rows are split into at most `max_streams` streams of record batches, so that
+    `read_table_to_parquet` and `read_table_to_arrow` can be run locally.
+    """
+
+    def __init__(self, client: LocalClient, batch_size: int = 10_000) -> None:
+        """Create the reader.
+
+        Args:
+            client (LocalClient): Client holding the tables.
+            batch_size (int): Maximum number of rows of the record batches.
+                Defaults to 10_000.
+        """
+        self.client = client
+        self.batch_size = batch_size
+
+    def create_session(
+        self,
+        table: str,
+        columns: Optional[list[str]] = None,
+        row_restriction: Optional[str] = None,
+        max_streams: int = 4,
+    ) -> tuple[pa.Schema, list[pa.Table]]:
+        """Read a table and split its rows into streams.
+
+        Args:
+            table (str): BigQuery ID of the table.
+            columns (Optional[list[str]]): Columns to read. If None, read all the
+                columns. Defaults to None.
+            row_restriction (Optional[str]): BigQuery SQL filter of the rows to
+                read. If None, read all the rows. Defaults to None.
+            max_streams (int): Maximum number of streams, there are no more
+                streams than rows as in BigQuery. Defaults to 4.
+
+        Returns:
+            tuple[pa.Schema, list[pa.Table]]: Schema of the record batches and
+                streams of the session.
+        """
+        select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        query = f'SELECT {select} FROM "{table}"'
+        if row_restriction:
+            query = f"{query} WHERE {bigquery_to_duckdb(row_restriction)}"
+        with self.client.connection.cursor() as cursor:
+            data = cursor.execute(query).fetch_record_batch().read_all()
+
+        n_streams = min(max_streams, data.num_rows)
+        size = -(-data.num_rows // n_streams) if n_streams else 0
+        return data.schema, [data.slice(i * size, size) for i in range(n_streams)]
+
+    def read_stream(self, stream: pa.Table) -> Iterator[pa.RecordBatch]:
+        """Read the record batches of a stream.
+
+        Args:
+            stream (pa.Table): Stream returned by `create_session`.
+
+        Yields:
+            pa.RecordBatch: Record batches of the stream.
+        """
+        yield from stream.to_batches(max_chunksize=self.batch_size)
+
+
+def make_raw_tables(
+    n_transactions: int, n_users: int = 100, seed: int = 42
+) -> dict[str, pd.DataFrame]:
+    """Generate random raw tables with the schema of the ones loaded in BigQuery.
+
+    Args:
+        n_transactions (int): Number of transactions.
+        n_users (int): Number of users, with 2 cards each. Defaults to 100.
+        seed (int): Seed of the random number generator. Defaults to 42.
+
+    Returns:
+        dict[str, pd.DataFrame]: The transactions, users, cards and holidays
+            tables. The transactions span 1991 to 2020 and have distinct times.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.choice(30 * 365 * 1440, n_transactions, replace=False))
+    datetimes = pd.Timestamp("1991-01-01") + pd.to_timedelta(minutes, unit="min")
+    transactions = pd.DataFrame(
+        {
+            "user": rng.integers(0, n_users, n_transactions),
+            "card": rng.integers(0, 2, n_transactions),
+            "year": datetimes.year,
+            "month": datetimes.month,
+            "day": datetimes.day,
+            "time": datetimes.strftime("%H:%M"),
+            "amount": rng.gamma(2, 40, n_transactions).round(2),
+            "use_chip": rng.choice(
+                ["Chip Transaction", "Swipe Transaction", "Online Transaction"],
+                n_transactions,
+            ),
+            "mcc": rng.choice([5411, 5812, 5912, 4829, 7011], n_transactions),
+            "Is_Fraud_": rng.random(n_transactions) < 0.01,
+        }
+    )
+    users = pd.DataFrame(
+        {
+            "user": np.arange(n_users),
+            "gender": rng.choice(["Male", "Female"], n_users),
+            "Per Capita Income - Zipcode": [
+                f"${v}" for v in rng.integers(10000, 50000, n_users)
+            ],
+            "Yearly Income - Person": [
+                f"${v}" for v in rng.integers(20000, 100000, n_users)
+            ],
+            "Total Debt": [f"${v}" for v in rng.integers(0, 100000, n_users)],
+        }
+    )
+    cards = pd.DataFrame(
+        {
+            "user": np.repeat(np.arange(n_users), 2),
+            "card_index": np.tile([0, 1], n_users),
+            "card_brand": rng.choice(
+                ["Amex", "Discover", "Mastercard", "Visa"], 2 * n_users
+            ),
+            "card_type": rng.choice(
+                ["Credit", "Debit", "Debit (Prepaid)"], 2 * n_users
+            ),
+            "credit_limit": [f"${v}" for v in rng.integers(1000, 30000, 2 * n_users)],
+            "has_chip": rng.random(2 * n_users) < 0.9,
+            "card_on_dark_web": rng.random(2 * n_users) < 0.01,
+        }
+    )
+    holidays = pd.DataFrame(
+        {"date": pd.date_range("1991-01-01", "2020-12-31", freq="MS").date}
+    )
+    holidays["name"] = "Holiday"
+    tables = {
+        "transactions": transactions,
+        "users": users,
+        "cards": cards,
+        "holidays": holidays,
+    }
+
+    # Order the columns as in BQ and add the unused ones, empty. The names of the
+    # used ones are kept as in the queries, since DuckDB keeps their case in the
+    # output columns and BQ ignores it
+    for name, table in tables.items():
+        columns = {c.lower(): c for c in table.columns}
+        tables[name] = pd.DataFrame(
+            {
+                columns.get(column.lower(), column): (
+                    table[columns[column.lower()]]
+                    if column.lower() in columns
+                    else pd.array([None] * len(table), dtype=MISSING_DTYPES[bq_type])
+                )
+                for column, bq_type in RAW_TABLES[name]
+            }
+        )
+    return tables
@@ -1,10 +1,13 @@
-from typing import Optional
+from typing import Iterator, Optional, Union
 
 import numpy as np
 from imblearn.over_sampling import RandomOverSampler
+from lightgbm import LGBMClassifier
 from loguru import logger
-from sklearn.base import ClassifierMixin
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.exceptions import NotFittedError
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import (
     average_precision_score,
     f1_score,
@@ -16,7 +19,156 @@ from sklearn.metrics import (
 )
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.utils import _safe_indexing
 from sklearn.utils.validation import check_is_fitted
+from xgboost import XGBClassifier
+
+from src.base.boosting import CachedBoosterClassifier, binned_dataset_key, data_digest
+from src.utils.profiling import Profiler, get_profiler
+
+# Models that use all the available cores by default, and that need to share them
+# with other models trained in parallel
+MULTITHREADED_MODELS = ("random_forest", "lightgbm", "xgboost")
+
+
+class SamplingCorrectedClassifier(ClassifierMixin, BaseEstimator):
+    """Classifier trained on a downsampled majority class.
+
+    The predicted probabilities of the wrapped estimator are corrected for the
+    rate at which the majority (negative) class was sampled, so that they refer
+    to the original class distribution.
+    """
+
+    def __init__(self, estimator: ClassifierMixin, majority_fraction: float = 1.0):
+        """Wrap the estimator.
+
+        Args:
+            estimator (ClassifierMixin): Any sklearn-type classifier with fit,
+                predict and predict_proba methods.
+            majority_fraction (float): Fraction of the majority class that was kept
+                in the training data. Defaults to 1.0 (no correction).
+        """
+        self.estimator = estimator
+        self.majority_fraction = majority_fraction
+
+    def fit(self, X: np.ndarray, y: np.ndarray, **fit_params):
+        """Fit the wrapped estimator.
+
+        Args:
+            X (np.ndarray): Training data features.
+            y (np.ndarray): Training data target variable.
+            fit_params: Keyword arguments passed to the `fit` method of the
+                wrapped estimator.
+
+        Returns:
+            SamplingCorrectedClassifier: The fitted classifier.
+        """
+        self.estimator.fit(X, y, **fit_params)
+        self.classes_ = self.estimator.classes_
+        return self
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Predict class probabilities corrected for the sampling rate.
+
+        Args:
+            X (np.ndarray): Input features to the model.
+
+        Returns:
+            np.ndarray: Probabilities of class 0 and class 1 for each sample.
+        """
+        proba = self.estimator.predict_proba(X)[:, 1]
+        rate = self.majority_fraction
+        proba = rate * proba / (rate * proba + 1 - proba)
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict classes using the corrected probabilities.
+
+        Args:
+            X (np.ndarray): Input features to the model.
+
+        Returns:
+            np.ndarray: Predicted class for each sample.
+        """
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+
+def build_classifier(
+    model_name: str, model_params: Optional[dict] = None, random_state: int = 42
+) -> tuple[ClassifierMixin, bool]:
+    """Create an untrained classifier from its name and hyperparameters.
+
+    Args:
+        model_name (str): Name of the classifier. Must be one of
+            'logistic_regression', 'sgd_classifier', 'random_forest', 'lightgbm',
+            'xgboost'.
+        model_params (Optional[dict]): Optional, default None. Hyperparameters of
+            the classifier.
+        random_state (int): Optional, default 42. Random state of the classifier.
+
+    Returns:
+        ClassifierMixin: The untrained classifier.
+        bool: Whether the classifier should be fit using an evaluation set.
+    """
+    model_params = model_params or {}
+    use_eval_set = False
+    if model_name == "logistic_regression":
+        classifier = LogisticRegression(random_state=random_state, **model_params)
+    elif model_name == "sgd_classifier":
+        classifier = SGDClassifier(random_state=random_state, **model_params)
+    elif model_name == "random_forest":
+        classifier = RandomForestClassifier(random_state=random_state, **model_params)
+    elif model_name == "lightgbm":
+        classifier = LGBMClassifier(random_state=random_state, **model_params)
+        use_eval_set = True
+    elif model_name == "xgboost":
+        classifier = XGBClassifier(
+            use_label_encoder=False, random_state=random_state, **model_params
+        )
+        use_eval_set = True
+    else:
+        msg = (
+            "`model_name` must be one of 'logistic_regression', 'sgd_classifier', "
+            "'random_forest', 'lightgbm', 'xgboost'."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+    return classifier, use_eval_set
+
+
+def build_scaler(
+    data_standardization: str = "standard",
+) -> Optional[Union[StandardScaler, MinMaxScaler]]:
+    """Create an unfitted scaler for the input features.
+
+    Args:
+        data_standardization (str): Optional, default "standard". Data
+            standardization method. Options: "standard", "min_max", "none".
+
+    Returns:
+        Optional[Union[StandardScaler, MinMaxScaler]]: The scaler, or None if the
+            data should not be scaled.
+    """
+    # Scale data to mean zero and unit variance
+    if data_standardization == "standard":
+        scaler = StandardScaler()
+    # Scale data to [0,1] interval
+    elif data_standardization == "min_max":
+        scaler = MinMaxScaler()
+    # No scaling
+    elif data_standardization == "none":
+        scaler = None
+    else:
+        msg = (
+            "`data_standardization` parameter not correctly set! "
+            "It should have one of the following values: 'standard', 'min_max', "
+            "'none'."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+    return scaler
 
 
 def calculate_precision_top_k(
@@ -45,6 +197,128 @@ def calculate_precision_top_k(
     return precision_top_k
 
 
+def downsample_majority_class(
+    y: np.ndarray,
+    majority_fraction: float = 0.1,
+    strata: Optional[np.ndarray] = None,
+    random_state: int = 42,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Randomly keep a fraction of the majority class (class 0).
+
+    All the samples of the minority class are kept. If `strata` is provided, the
+    same fraction of the majority class is kept within each stratum (e.g. each
+    month of data), so that the time distribution of the data is preserved.
+
+    Args:
+        y (np.ndarray): Target variable.
+        majority_fraction (float): Optional, default 0.1. Fraction of the majority
+            class to keep. Must be in the interval (0, 1].
+        strata (Optional[np.ndarray]): Optional, default None. Label of the stratum
+            of each sample.
+        random_state (int): Optional, default 42. For controlling the randomization
+            of the sampling.
+
+    Returns:
+        np.ndarray: Sorted indices of the samples to keep.
+        np.ndarray: Importance weight of each sample to keep, equal to the inverse
+            of the rate at which its class (and stratum) was sampled.
+    """
+    if not 0 < majority_fraction <= 1:
+        msg = "`majority_fraction` must be in the interval (0, 1]."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    y = np.asarray(y)
+    rng = np.random.default_rng(random_state)
+    negatives = np.flatnonzero(y == 0)
+    if strata is None:
+        strata_neg = np.zeros(negatives.size, dtype=np.int8)
+    else:
+        strata_neg = np.asarray(strata)[negatives]
+
+    # Shuffle the negatives within each stratum, then keep the first ones
+    order = np.lexsort((rng.random(negatives.size), strata_neg))
+    _, block_start, block_size = np.unique(
+        strata_neg[order], return_index=True, return_counts=True
+    )
+    block_keep = np.maximum(np.round(block_size * majority_fraction), 1).astype(int)
+    block = np.repeat(np.arange(block_start.size), block_size)
+    rank = np.arange(negatives.size) - block_start[block]
+    kept = rank < block_keep[block]
+
+    indices = np.concatenate([np.flatnonzero(y != 0), negatives[order][kept]])
+    weights = np.concatenate(
+        [
+            np.ones(indices.size - kept.sum()),
+            (block_size / block_keep)[block][kept],
+        ]
+    )
+    sorter = np.argsort(indices)
+    return indices[sorter], weights[sorter]
+
+
+def generate_rose_batches(
+    X: np.ndarray,
+    y: np.ndarray,
+    upsampled_minority_proportion: float = 0.01,
+    shrinkage: float = 1,
+    batch_size: int = 10000,
+    random_state: Optional[np.random.Generator] = None,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Lazily generate mini-batches of ROSE-upsampled training data.
+
+    The training data is shuffled and split into mini-batches. Each mini-batch is
+    extended with its share of the synthetic minority class samples, generated with
+    the same smoothed bootstrap used by `RandomOverSampler`, so the resampled
+    training matrix is never materialized in memory.
+
+    Args:
+        X (np.ndarray): Training data features.
+        y (np.ndarray): Training data target variable.
+        upsampled_minority_proportion (float): Optional, default 0.01. Proportion
+            of the minority class in the upsampled data.
+        shrinkage (float): Optional, default 1. Parameter controlling the shrinkage
+            applied to the covariance matrix of the synthetic samples.
+        batch_size (int): Optional, default 10000. Number of original samples in
+            each mini-batch.
+        random_state (Optional[np.random.Generator]): Optional, default None.
+            Random number generator used for the shuffling and the noise.
+
+    Yields:
+        tuple[np.ndarray, np.ndarray]: Features and target of each mini-batch.
+    """
+    rng = np.random.default_rng(random_state)
+    X = np.asarray(X)
+    y = np.asarray(y)
+    n_samples, n_features = X.shape
+
+    minority = np.flatnonzero(y == 1)
+    n_synthetic = max(
+        int(
+            np.sum(y == 0)
+            * upsampled_minority_proportion
+            / (1 - upsampled_minority_proportion)
+        )
+        - minority.size,
+        0,
+    )
+    smoothing_constant = (4 / ((n_features + 2) * n_samples)) ** (1 / (n_features + 4))
+    scale = shrinkage * smoothing_constant * np.std(X[minority, :], axis=0)
+
+    order = rng.permutation(n_samples)
+    bounds = np.linspace(0, n_synthetic, -(-n_samples // batch_size) + 1).astype(int)
+    for i, start in enumerate(range(0, n_samples, batch_size)):
+        batch = order[start : start + batch_size]
+        bootstrap = rng.choice(minority, size=bounds[i + 1] - bounds[i])
+        X_new = (
+            X[bootstrap, :] + rng.standard_normal((bootstrap.size, n_features)) * scale
+        )
+        yield (
+            np.concatenate([X[batch, :], X_new.astype(X.dtype, copy=False)]),
+            np.concatenate([y[batch], np.ones(bootstrap.size, dtype=y.dtype)]),
+        )
+
+
 def evaluate_model(
     trained_classifier: ClassifierMixin,
     X: np.ndarray,
@@ -123,8 +397,15 @@ def train_model(
     rose_random_state: int = 42,
     rose_shrinkage: int = 1,
     upsampling_coefficient: int = 2,
+    rose_batch_size: int = 10000,
+    rose_epochs: int = 5,
+    downsampling_majority_fraction: float = 0.1,
+    downsampling_strata: Optional[np.ndarray] = None,
+    downsampling_use_weights: bool = True,
+    downsampling_random_state: int = 42,
     use_eval_set: bool = True,
     fit_args: dict = {},
+    profiler: Optional[Profiler] = None,
 ) -> tuple[ClassifierMixin, dict]:
     """Train any sklearn-type classifier and calculate cross-validation metrics.
 
@@ -141,7 +422,8 @@ def train_model(
             mode for data scaling. Options: "standard", "min_max", "none".
         data_sampling (str): Optional, default "none". Used to select data sampling
             strategy, e.g., upsampling of minority class. Options: "none", "rose",
-            "upsampling_with_duplicates".
+            "upsampling_with_duplicates", "upsampling_with_weights", "rose_batches",
+            "downsample_majority".
         rose_upsampled_minority_proportion (float): Optional, default 0.01. The
             desired proportion of the minority class after upsampling. Only used if
             data_sampling="rose".
@@ -155,89 +437,164 @@ def train_model(
             data_sampling="rose".
         upsampling_coefficient (int): Optional, default 2. Number of times to
             duplicate the minority class data points. Only used if
-            data_sampling="upsampling_with_duplicates".
+            data_sampling="upsampling_with_duplicates" or
+            data_sampling="upsampling_with_weights".
+        rose_batch_size (int): Optional, default 10000. Number of original samples
+            in each mini-batch. Only used if data_sampling="rose_batches".
+        rose_epochs (int): Optional, default 5. Number of passes over the training
+            data, each with newly generated synthetic samples. Only used if
+            data_sampling="rose_batches".
+        downsampling_majority_fraction (float): Optional, default 0.1. Fraction of
+            the majority class to keep. Only used if
+            data_sampling="downsample_majority".
+        downsampling_strata (Optional[np.ndarray]): Optional, default None. Stratum
+            of each training sample (e.g. the month of the transaction), used to
+            keep the same fraction of the majority class in every stratum. Only
+            used if data_sampling="downsample_majority".
+        downsampling_use_weights (bool): Optional, default True. If True, the kept
+            samples of the majority class are weighted by the inverse of the
+            sampling rate during training. Otherwise, the predicted probabilities
+            are corrected for the sampling rate after training. Only used if
+            data_sampling="downsample_majority".
+        downsampling_random_state (int): Optional, default 42. For controlling the
+            randomization of the downsampling. Only used if
+            data_sampling="downsample_majority".
         use_eval_set (boolean): Optional, default True. If True, model fitting
             is done using an evaluation set. Also, the best model is chosen.
         fit_args (dict): Dictionary of optional arguments for model fitting.
+        profiler (Optional[Profiler]): Optional, default None. If provided, record
+            the resources used by the scale, resample, fit and evaluate phases.
 
     Returns:
         ClassifierMixin: Trained classifier model
         dict: Model performance metrics on the training data
     """
-    # Scale data to mean zero and unit variance
-    if data_standardization == "standard":
-        scaler = StandardScaler()
-    # Scale data to [0,1] interval
-    elif data_standardization == "min_max":
-        scaler = MinMaxScaler()
-    # No scaling
-    elif data_standardization == "none":
-        scaler = None
-    else:
-        msg = (
-            "`data_standardization` parameter not correctly set! "
-            "It should have one of the following values: 'standard', 'min_max', "
-            "'none'."
-        )
-        logger.error(msg)
-        raise ValueError(msg)
+    profiler = get_profiler(profiler)
+    with profiler.phase("scale"):
+        scaler = build_scaler(data_standardization)
 
-    if scaler is not None:
-        # Standardize X_train and X_valid. However, use only X_train for fitting
-        X_train = scaler.fit_transform(X_train)
-        X_valid_sc = scaler.transform(X_valid)
+        X_valid_sc = X_valid
+        if scaler is not None:
+            # Standardize X_train and X_valid. However, use only X_train for fitting
+            X_train = scaler.fit_transform(X_train)
+            if X_valid is not None:
+                X_valid_sc = scaler.transform(X_valid)
 
-    if data_sampling == "none":
-        logger.info("Using no upsampling strategy.")
+    with profiler.phase("resample"):
+        fit_incrementally = False
+        if data_sampling == "none":
+            logger.info("Using no upsampling strategy.")
 
-    elif data_sampling == "rose":
-        logger.info(
-            f"Using rose upsampling strategy with shrinkage {rose_shrinkage} "
-            f"and minority proportion {rose_upsampled_minority_proportion}."
-        )
-        # Upsample minority class in the training set
+        elif data_sampling == "rose":
+            logger.info(
+                f"Using rose upsampling strategy with shrinkage {rose_shrinkage} "
+                f"and minority proportion {rose_upsampled_minority_proportion}."
+            )
+            # Upsample minority class in the training set
 
-        # Sampling strategy is the relative size of the minority class to the majority
-        # class, rose_upsampled_minority_proportion gives the desired final proportion
-        # of the minority class in the whole data set
-        my_sampling_strategy = rose_upsampled_minority_proportion / (
-            1 - rose_upsampled_minority_proportion
-        )
-        ros = RandomOverSampler(
-            sampling_strategy=my_sampling_strategy,
-            random_state=rose_random_state,
-            shrinkage=rose_shrinkage,
-        )
-        X_train, y_train = ros.fit_resample(X_train, y_train)
-    elif data_sampling == "upsampling_with_duplicates":
-        logger.info(
-            "Using resampling upsampling strategy "
-            f"with coefficient {upsampling_coefficient}."
-        )
-        # Upsample minority class in the training set
-        new_values = np.tile(
-            X_train[y_train == 1, :].copy(), (upsampling_coefficient, 1)
-        )
-        X_train = np.append(X_train, new_values, axis=0)
-        y_train = np.append(
-            y_train, np.ones(upsampling_coefficient * np.sum(y_train == 1))
-        )
-    else:
-        msg = (
-            "`data_sampling` parameter not correctly set! "
-            "It should have one of the following values: 'none', 'rose', "
-            "'upsampling_with_duplicates'."
-        )
-        logger.error(msg)
-        raise ValueError(msg)
+            # Sampling strategy is the relative size of the minority class to the majority
+            # class, rose_upsampled_minority_proportion gives the desired final proportion
+            # of the minority class in the whole data set
+            my_sampling_strategy = rose_upsampled_minority_proportion / (
+                1 - rose_upsampled_minority_proportion
+            )
+            ros = RandomOverSampler(
+                sampling_strategy=my_sampling_strategy,
+                random_state=rose_random_state,
+                shrinkage=rose_shrinkage,
+            )
+            X_train, y_train = ros.fit_resample(X_train, y_train)
+        elif data_sampling == "upsampling_with_duplicates":
+            logger.info(
+                "Using resampling upsampling strategy "
+                f"with coefficient {upsampling_coefficient}."
+            )
+            # Upsample minority class in the training set
+            new_values = np.tile(
+                X_train[y_train == 1, :].copy(), (upsampling_coefficient, 1)
+            )
+            X_train = np.append(X_train, new_values, axis=0)
+            y_train = np.append(
+                y_train, np.ones(upsampling_coefficient * np.sum(y_train == 1))
+            )
+        elif data_sampling == "upsampling_with_weights":
+            logger.info(
+                "Using weighted upsampling strategy "
+                f"with coefficient {upsampling_coefficient}."
+            )
+            # Equivalent to adding `upsampling_coefficient` copies of each minority
+            # class sample, without copying the data
+            sample_weight = np.where(
+                np.asarray(y_train) == 1, 1 + upsampling_coefficient, 1
+            )
+            fit_args = {**fit_args, "sample_weight": sample_weight}
+        elif data_sampling == "rose_batches":
+            logger.info(
+                f"Using rose mini-batch upsampling strategy with shrinkage {rose_shrinkage} "
+                f"and minority proportion {rose_upsampled_minority_proportion}."
+            )
+            if not hasattr(classifier, "partial_fit"):
+                msg = (
+                    "`data_sampling` 'rose_batches' requires a classifier that supports "
+                    "`partial_fit`."
+                )
+                logger.error(msg)
+                raise ValueError(msg)
+            fit_incrementally = True
+        elif data_sampling == "downsample_majority":
+            logger.info(
+                "Using majority class downsampling strategy "
+                f"with fraction {downsampling_majority_fraction}."
+            )
+            # Downsample majority class in the training set
+            indices, sample_weight = downsample_majority_class(
+                y_train,
+                majority_fraction=downsampling_majority_fraction,
+                strata=downsampling_strata,
+                random_state=downsampling_random_state,
+            )
+            X_train = _safe_indexing(X_train, indices)
+            y_train = np.asarray(y_train)[indices]
+            if downsampling_use_weights is True:
+                fit_args = {**fit_args, "sample_weight": sample_weight}
+            else:
+                classifier = SamplingCorrectedClassifier(
+                    classifier, majority_fraction=downsampling_majority_fraction
+                )
+            logger.info(f"Downsampled training set to {len(indices)} samples.")
+        else:
+            msg = (
+                "`data_sampling` parameter not correctly set! "
+                "It should have one of the following values: 'none', 'rose', "
+                "'upsampling_with_duplicates', 'upsampling_with_weights', "
+                "'rose_batches', 'downsample_majority'."
+            )
+            logger.error(msg)
+            raise ValueError(msg)
 
-    # Fit model
-    if use_eval_set is True and X_valid is not None and y_valid is not None:
-        logger.debug("Using validation set to guide training.")
-        classifier.fit(X_train, y_train, eval_set=[(X_valid_sc, y_valid)], **fit_args)
-    else:
-        logger.debug("Not using validation set.")
-        classifier.fit(X_train, y_train, **fit_args)
+    with profiler.phase("fit"):
+        # Fit model
+        if fit_incrementally is True:
+            logger.debug(f"Fitting model on mini-batches for {rose_epochs} epochs.")
+            rng = np.random.default_rng(rose_random_state)
+            for _ in range(rose_epochs):
+                for X_batch, y_batch in generate_rose_batches(
+                    X_train,
+                    y_train,
+                    upsampled_minority_proportion=rose_upsampled_minority_proportion,
+                    shrinkage=rose_shrinkage,
+                    batch_size=rose_batch_size,
+                    random_state=rng,
+                ):
+                    classifier.partial_fit(X_batch, y_batch, classes=[0, 1], **fit_args)
+        elif use_eval_set is True and X_valid is not None and y_valid is not None:
+            logger.debug("Using validation set to guide training.")
+            classifier.fit(
+                X_train, y_train, eval_set=[(X_valid_sc, y_valid)], **fit_args
+            )
+        else:
+            logger.debug("Not using validation set.")
+            classifier.fit(X_train, y_train, **fit_args)
 
     try:
         check_is_fitted(classifier)
@@ -249,14 +606,124 @@ def train_model(
         raise err
 
     # Evaluate model performance on training set
-    (
-        train_metrics,
-        _,
-        _,
-    ) = evaluate_model(classifier, X_train, y_train)
+    with profiler.phase("evaluate"):
+        (
+            train_metrics,
+            _,
+            _,
+        ) = evaluate_model(classifier, X_train, y_train)
 
     if scaler is not None:
         classifier = Pipeline(steps=[("scaler", scaler), ("classifier", classifier)])
         logger.info("Saved classifier as pipeline.")
 
     return classifier, train_metrics
+
+
+def continue_training(
+    trained_model: ClassifierMixin,
+    X_new: np.ndarray,
+    y_new: np.ndarray,
+    X_valid: Optional[np.ndarray] = None,
+    y_valid: Optional[np.ndarray] = None,
+    n_estimators: int = 100,
+    n_epochs: int = 1,
+    fit_args: dict = {},
+) -> tuple[ClassifierMixin, dict]:
+    """Continue the training of an already trained model on new data only.
+
+    If the model is a pipeline, the scaler is kept as it is and only the classifier
+    is updated. SGD classifiers are updated with `partial_fit`, while LightGBM and
+    XGBoost classifiers (including `CachedBoosterClassifier`) are extended with
+    `n_estimators` new boosting rounds fitted on the new data. The other
+    classifiers cannot be trained incrementally.
+
+    Args:
+        trained_model (ClassifierMixin): Trained model, optionally in a pipeline
+            with a scaler as returned by `train_model`.
+        X_new (np.ndarray): New training data features.
+        y_new (np.ndarray): New training data target variable.
+        X_valid (Optional[np.ndarray]): Optional, default None. Validation data
+            features, only used by the gradient boosting classifiers.
+        y_valid (Optional[np.ndarray]): Optional, default None. Validation data
+            target variable, only used by the gradient boosting classifiers.
+        n_estimators (int): Optional, default 100. Number of boosting rounds to add
+            to LightGBM and XGBoost classifiers.
+        n_epochs (int): Optional, default 1. Number of passes over the new data for
+            SGD classifiers.
+        fit_args (dict): Dictionary of optional arguments for model fitting.
+
+    Returns:
+        ClassifierMixin: Updated model, with the same structure as `trained_model`
+        dict: Model performance metrics on the new training data
+    """
+    scaler = None
+    classifier = trained_model
+    if isinstance(trained_model, Pipeline):
+        scaler = trained_model[:-1]
+        classifier = trained_model[-1]
+        X_new = scaler.transform(X_new)
+        if X_valid is not None:
+            X_valid = scaler.transform(X_valid)
+
+    # Update the classifier inside the sampling correction wrapper, if any
+    wrapper = None
+    if isinstance(classifier, SamplingCorrectedClassifier):
+        wrapper = classifier
+        classifier = classifier.estimator
+
+    eval_args = {}
+    if X_valid is not None and y_valid is not None:
+        eval_args = dict(eval_set=[(X_valid, y_valid)])
+
+    if isinstance(classifier, SGDClassifier):
+        logger.info(f"Updating SGD classifier for {n_epochs} epochs.")
+        for _ in range(n_epochs):
+            classifier.partial_fit(X_new, y_new, **fit_args)
+    elif isinstance(classifier, LGBMClassifier):
+        logger.info(f"Adding {n_estimators} boosting rounds to LightGBM classifier.")
+        init_model = classifier.booster_
+        classifier = clone(classifier).set_params(n_estimators=n_estimators)
+        classifier.fit(X_new, y_new, init_model=init_model, **eval_args, **fit_args)
+    elif isinstance(classifier, XGBClassifier):
+        logger.info(f"Adding {n_estimators} boosting rounds to XGBoost classifier.")
+        xgb_model = classifier.get_booster()
+        classifier = clone(classifier).set_params(n_estimators=n_estimators)
+        classifier.fit(X_new, y_new, xgb_model=xgb_model, **eval_args, **fit_args)
+    elif isinstance(classifier, CachedBoosterClassifier):
+        logger.info(
+            f"Adding {n_estimators} boosting rounds to cached {classifier.booster} "
+            "classifier."
+        )
+        init_model = classifier.booster_
+        # The cache key of the trained model identifies its own training data, so
+        # the new data is cached under a key computed from its content
+        cache_key = binned_dataset_key(
+            data_version=data_digest(X_new, y_new, X_valid, y_valid),
+            feature_names=classifier.feature_names_ or [],
+            n_rows=len(y_new),
+            params=dict(continued_from=classifier.cache_key),
+        )
+        classifier = clone(classifier).set_params(
+            params={**(classifier.params or {}), "n_estimators": n_estimators},
+            cache_key=cache_key,
+        )
+        classifier.fit(X_new, y_new, init_model=init_model, **eval_args, **fit_args)
+    else:
+        msg = (
+            f"Classifier of type {type(classifier).__name__} cannot be trained "
+            "incrementally. Only SGD, LightGBM and XGBoost classifiers are supported."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+    if wrapper is not None:
+        wrapper.estimator = classifier
+        classifier = wrapper
+
+    train_metrics, _, _ = evaluate_model(classifier, X_new, y_new)
+
+    if scaler is not None:
+        classifier = Pipeline(steps=[*scaler.steps, ("classifier", classifier)])
+
+    return classifier, train_metrics
@@ -1,278 +1,952 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from loguru import logger
 
+from src.utils.profiling import Profiler, get_profiler
+
+# Prefixes of the rolling fraud features and the columns they are computed from
+FRAUD_INDICATORS = {
+    "fraud": "is_fraud",
+    "fraud_swipe": "fraud_swipe",
+    "fraud_chip": "fraud_chip",
+    "fraud_online": "fraud_online",
+    "fraud_card_present": "fraud_card_present",
+}
+# Names and lengths in days of the rolling windows
+ROLLING_WINDOWS = {"30_days": 30, "60_days": 60, "365_days": 365, "2_years": 730}
+# Names and lengths in days of the windows of the user features, in the order of the
+# columns of `q_preprocessing.sql`
+USER_WINDOWS = {"year": 365, "30_days": 30, "7_days": 7, "2_days": 2, "1_days": 1}
+SECONDS_IN_DAY = 86400
+
+
+def user_feature_names() -> list[str]:
+    """Names of the features computed by `user_feature_engineering`.
+
+    Returns:
+        list[str]: Names of the features, in the same order as the columns of the
+            `rolling_aux_amount_frequency` table in `q_preprocessing.sql`.
+    """
+    names = ["mean_amount", "transaction_count", "days_since_first_transaction"]
+    names += [f"mean_amount_last_{w}" for w in USER_WINDOWS]
+    names += ["transaction_frequency_all"]
+    names += [f"transaction_frequency_last_{w}" for w in USER_WINDOWS]
+    names += [
+        f"mean_amount_last_{short}_relative_to_last_{long}"
+        for long in ("year", "30_days")
+        for short in ("7_days", "2_days", "1_days")
+    ]
+    names += [
+        f"{short}_transaction_frequency_relative_to_last_{long}"
+        for long in ("year", "30_days")
+        for short in ("7_days", "2_days", "1_days")
+    ]
+    return names
+
+
+def rolling_feature_names() -> tuple[list[str], list[tuple[str, str, str]]]:
+    """Names of the features computed by `rolling_feature_engineering`.
+
+    Returns:
+        list[str]: Names of the rolling means, in the order of `FRAUD_INDICATORS`
+            and `ROLLING_WINDOWS`.
+        list[tuple[str, str, str]]: Name, numerator and denominator of each ratio.
+    """
+    means = [
+        f"{prefix}_rolling_mean_{window}"
+        for prefix in FRAUD_INDICATORS
+        for window in ROLLING_WINDOWS
+    ]
+
+    # Compare different fraud types' recent averages to
+    # longer term averages (find spikes and lows)
+    ratios = [
+        (
+            f"{prefix}_rolling_{short}_relative_to_{long}",
+            f"{prefix}_rolling_mean_{short}",
+            f"{prefix}_rolling_mean_{long}",
+        )
+        for prefix in FRAUD_INDICATORS
+        for short in ("30_days", "60_days")
+        for long in ("365_days", "2_years")
+    ]
+    # Rolling proportions relative all frauds
+    ratios += [
+        (
+            f"{prefix}_rolling_{window}_relative_to_all_frauds",
+            f"{prefix}_rolling_mean_{window}",
+            f"fraud_rolling_mean_{window}",
+        )
+        for window in ROLLING_WINDOWS
+        for prefix in list(FRAUD_INDICATORS)[1:]
+    ]
+    # Mean amount spent over short time periods relative to longer time periods
+    ratios += [
+        (
+            f"mean_amount_last_{short}_days_relative_to_last_{long}",
+            f"mean_amount_last_{short}_days",
+            f"mean_amount_last_{long}",
+        )
+        for long in ("year", "30_days")
+        for short in (7, 2, 1)
+    ]
+    # Statistics related to transaction frequencies
+    ratios += [
+        (
+            f"{short}_days_transaction_frequency_relative_to_last_{long}",
+            f"transaction_frequency_last_{short}_days",
+            f"transaction_frequency_last_{long}",
+        )
+        for short in (1, 2, 7)
+        for long in ("30_days", "year")
+    ]
+    return means, ratios
+
+
+def _indicator_arrays(data: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    # Timestamps in nanoseconds, and one row per fraud indicator so that each
+    # indicator is contiguous in memory
+    times = data["datetime_offset"].to_numpy().astype("datetime64[ns]")
+    values = data[list(FRAUD_INDICATORS.values())].to_numpy(np.float64).T
+    return times.view(np.int64), values
+
+
+def _fill_rolling_means(
+    features: np.ndarray,
+    columns: dict[str, int],
+    times: np.ndarray,
+    values: np.ndarray,
+    n_history: int = 0,
+) -> None:
+    # `times` and `values` cover `n_history` earlier rows followed by the rows of
+    # `features`, all sorted by time
+    is_valid = ~np.isnan(values)
+    # Column i of the cumulative sums covers the rows before i, so the sum over
+    # rows [start, end) is sums[:, end] - sums[:, start]
+    sums = np.zeros((values.shape[0], len(times) + 1))
+    np.cumsum(np.where(is_valid, values, 0), axis=1, out=sums[:, 1:])
+    if not is_valid.all():
+        counts = np.zeros(sums.shape, dtype=np.int64)
+        np.cumsum(is_valid, axis=1, out=counts[:, 1:])
+
+    new_times = times[n_history:]
+    # The window closes before the first row with the same timestamp
+    end = np.searchsorted(times, new_times, side="left")
+    sums_end = sums[:, end]
+    for window, days in ROLLING_WINDOWS.items():
+        length = np.timedelta64(days, "D").astype("m8[ns]").view(np.int64)
+        start = np.searchsorted(times, new_times - length, side="left")
+        if is_valid.all():
+            window_counts = np.broadcast_to(end - start, sums_end.shape)
+        else:
+            window_counts = counts[:, end] - counts[:, start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            window_means = (sums_end - sums[:, start]) / window_counts
+        window_means[window_counts == 0] = np.nan
+        for i, prefix in enumerate(FRAUD_INDICATORS):
+            name = f"{prefix}_rolling_mean_{window}"
+            features[:, columns[name]] = window_means[i]
+
+
+def _fill_rolling_ratios(
+    features: np.ndarray, columns: dict[str, int], data: pd.DataFrame
+) -> None:
+    _, ratios = rolling_feature_names()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, numerator, denominator in ratios:
+            if numerator in columns:
+                numerator = features[:, columns[numerator]]
+                denominator = features[:, columns[denominator]]
+            else:
+                numerator = data[numerator].to_numpy(np.float64)
+                denominator = data[denominator].to_numpy(np.float64)
+            np.divide(numerator, denominator, out=features[:, columns[name]])
+
+
+def _add_features(
+    data: pd.DataFrame, features: np.ndarray, columns: dict[str, int]
+) -> pd.DataFrame:
+    data = data.reset_index(drop=True)
+    data = data[["datetime_offset"] + [c for c in data if c != "datetime_offset"]]
+    # Features already in the data (e.g. the ratios of the user features computed
+    # by the query) are overwritten in place
+    for column in set(columns).intersection(data.columns):
+        data[column] = features[:, columns[column]]
+    new_columns = {c: i for c, i in columns.items() if c not in data.columns}
+    if len(new_columns) < len(columns):
+        features = features[:, list(new_columns.values())]
+    features = pd.DataFrame(
+        features,
+        columns=list(new_columns),
+        index=data.index,
+        copy=False,
+    )
+    return pd.concat([data, features], axis=1)
+
 
 def rolling_feature_engineering(
     data: pd.DataFrame,
+    profiler: Optional[Profiler] = None,
+    dtype: np.dtype = np.float64,
 ) -> pd.DataFrame:
     """Calculate rolling features over the dataset.
 
+    The rolling mean of each fraud indicator over the previous 30 days, 60 days,
+    365 days and 2 years (excluding the current timestamp) is computed in a single
+    pass: the data is sorted once, the cumulative sums of all the indicators are
+    stored in one array, and the boundaries of every window are found with a
+    binary search. The rolling means and their ratios are written into one
+    preallocated array.
+
     Args:
         data (pd.DataFrame): Dataframe over which to compute the rolling features.
+            The `datetime_offset` column must contain timezone-naive datetimes.
+        profiler (Optional[Profiler]): If provided, record the resources used to
+            compute the rolling means and the ratios. Defaults to None.
+        dtype (np.dtype): Data type of the computed features. With the default
+            float64 the results are identical to pandas' time-based rolling means,
+            float32 halves the memory usage. Defaults to np.float64.
 
     Returns:
-        pd.DataFrame: Dataframe with rolling features.
+        pd.DataFrame: Dataframe with rolling features, sorted by `datetime_offset`.
     """
-    data = data.sort_values("datetime_offset")
-    data = data.set_index("datetime_offset")
+    profiler = get_profiler(profiler)
+    means, ratios = rolling_feature_names()
+    columns = {c: i for i, c in enumerate(means + [r[0] for r in ratios])}
 
-    # Calculate rolling averages for different fraud types
-    data["fraud_rolling_mean_30_days"] = (
-        data["is_fraud"].rolling("30d", closed="left").mean()
-    )
-    data["fraud_rolling_mean_60_days"] = (
-        data["is_fraud"].rolling("60d", closed="left").mean()
-    )
-    data["fraud_rolling_mean_365_days"] = (
-        data["is_fraud"].rolling("365d", closed="left").mean()
-    )
-    data["fraud_rolling_mean_2_years"] = (
-        data["is_fraud"].rolling("730d", closed="left").mean()
-    )
+    with profiler.phase("rolling_means"):
+        data = data.sort_values("datetime_offset")
+        times, values = _indicator_arrays(data)
+        # Column-major, so each feature is contiguous and the DataFrame is built
+        # without copying
+        features = np.empty((len(data), len(columns)), dtype=dtype, order="F")
+        _fill_rolling_means(features, columns, times, values)
+        logger.info("Computed fraud rolling statistics.")
 
-    data["fraud_swipe_rolling_mean_30_days"] = (
-        data["fraud_swipe"].rolling("30d", closed="left").mean()
-    )
-    data["fraud_swipe_rolling_mean_60_days"] = (
-        data["fraud_swipe"].rolling("60d", closed="left").mean()
-    )
-    data["fraud_swipe_rolling_mean_365_days"] = (
-        data["fraud_swipe"].rolling("365d", closed="left").mean()
-    )
-    data["fraud_swipe_rolling_mean_2_years"] = (
-        data["fraud_swipe"].rolling("730d", closed="left").mean()
-    )
+    with profiler.phase("ratios"):
+        _fill_rolling_ratios(features, columns, data)
+        logger.info("Computed proportions of rolling statistics.")
 
-    data["fraud_chip_rolling_mean_30_days"] = (
-        data["fraud_chip"].rolling("30d", closed="left").mean()
-    )
-    data["fraud_chip_rolling_mean_60_days"] = (
-        data["fraud_chip"].rolling("60d", closed="left").mean()
-    )
-    data["fraud_chip_rolling_mean_365_days"] = (
-        data["fraud_chip"].rolling("365d", closed="left").mean()
-    )
-    data["fraud_chip_rolling_mean_2_years"] = (
-        data["fraud_chip"].rolling("730d", closed="left").mean()
-    )
+    return _add_features(data, features, columns)
 
-    data["fraud_online_rolling_mean_30_days"] = (
-        data["fraud_online"].rolling("30d", closed="left").mean()
-    )
-    data["fraud_online_rolling_mean_60_days"] = (
-        data["fraud_online"].rolling("60d", closed="left").mean()
-    )
-    data["fraud_online_rolling_mean_365_days"] = (
-        data["fraud_online"].rolling("365d", closed="left").mean()
-    )
-    data["fraud_online_rolling_mean_2_years"] = (
-        data["fraud_online"].rolling("730d", closed="left").mean()
-    )
 
-    data["fraud_card_present_rolling_mean_30_days"] = (
-        data["fraud_card_present"].rolling("30d", closed="left").mean()
-    )
-    data["fraud_card_present_rolling_mean_60_days"] = (
-        data["fraud_card_present"].rolling("60d", closed="left").mean()
-    )
-    data["fraud_card_present_rolling_mean_365_days"] = (
-        data["fraud_card_present"].rolling("365d", closed="left").mean()
-    )
-    data["fraud_card_present_rolling_mean_2_years"] = (
-        data["fraud_card_present"].rolling("730d", closed="left").mean()
-    )
-    logger.info("Computed fraud rolling statistics.")
+def read_transaction_chunks(
+    path: Union[str, Path], chunk_size: int = 1_000_000
+) -> Iterator[pd.DataFrame]:
+    """Read transactions in chunks from Parquet or CSV files.
 
-    # Reset index back to original
-    data = data.reset_index(drop=False)
+    Args:
+        path (Union[str, Path]): Path of a file, or of a folder of files read in
+            alphabetical order. Files with a .csv extension are read as CSV, all
+            the other files as Parquet.
+        chunk_size (int): Maximum number of rows of each chunk. Defaults to
+            1000000.
 
-    # Compare different fraud types' recent averages to
-    # longer term averages (find spikes and lows)
-    data["fraud_rolling_30_days_relative_to_365_days"] = (
-        data["fraud_rolling_mean_30_days"] / data["fraud_rolling_mean_365_days"]
-    )
-    data["fraud_rolling_30_days_relative_to_2_years"] = (
-        data["fraud_rolling_mean_30_days"] / data["fraud_rolling_mean_2_years"]
-    )
-    data["fraud_rolling_60_days_relative_to_365_days"] = (
-        data["fraud_rolling_mean_60_days"] / data["fraud_rolling_mean_365_days"]
-    )
-    data["fraud_rolling_60_days_relative_to_2_years"] = (
-        data["fraud_rolling_mean_60_days"] / data["fraud_rolling_mean_2_years"]
-    )
+    Yields:
+        pd.DataFrame: Chunk of transactions.
+    """
+    path = Path(path)
+    files = (
+        sorted(f for f in path.iterdir() if f.is_file()) if path.is_dir() else [path]
+    )
+    for file in files:
+        if file.suffix == ".csv":
+            yield from pd.read_csv(
+                file, chunksize=chunk_size, parse_dates=["datetime_offset"]
+            )
+        else:
+            for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
 
-    data["fraud_swipe_rolling_30_days_relative_to_365_days"] = (
-        data["fraud_swipe_rolling_mean_30_days"]
-        / data["fraud_swipe_rolling_mean_365_days"]
-    )
-    data["fraud_swipe_rolling_30_days_relative_to_2_years"] = (
-        data["fraud_swipe_rolling_mean_30_days"]
-        / data["fraud_swipe_rolling_mean_2_years"]
-    )
-    data["fraud_swipe_rolling_60_days_relative_to_365_days"] = (
-        data["fraud_swipe_rolling_mean_60_days"]
-        / data["fraud_swipe_rolling_mean_365_days"]
-    )
-    data["fraud_swipe_rolling_60_days_relative_to_2_years"] = (
-        data["fraud_swipe_rolling_mean_60_days"]
-        / data["fraud_swipe_rolling_mean_2_years"]
-    )
 
-    data["fraud_chip_rolling_30_days_relative_to_365_days"] = (
-        data["fraud_chip_rolling_mean_30_days"]
-        / data["fraud_chip_rolling_mean_365_days"]
-    )
-    data["fraud_chip_rolling_30_days_relative_to_2_years"] = (
-        data["fraud_chip_rolling_mean_30_days"]
-        / data["fraud_chip_rolling_mean_2_years"]
-    )
-    data["fraud_chip_rolling_60_days_relative_to_365_days"] = (
-        data["fraud_chip_rolling_mean_60_days"]
-        / data["fraud_chip_rolling_mean_365_days"]
-    )
-    data["fraud_chip_rolling_60_days_relative_to_2_years"] = (
-        data["fraud_chip_rolling_mean_60_days"]
-        / data["fraud_chip_rolling_mean_2_years"]
-    )
+def stream_rolling_feature_engineering(
+    chunks: Iterable[pd.DataFrame],
+    output_path: Union[str, Path],
+    profiler: Optional[Profiler] = None,
+    dtype: np.dtype = np.float64,
+) -> int:
+    """Calculate rolling features over chunks of data, writing them to Parquet.
 
-    data["fraud_online_rolling_30_days_relative_to_365_days"] = (
-        data["fraud_online_rolling_mean_30_days"]
-        / data["fraud_online_rolling_mean_365_days"]
-    )
-    data["fraud_online_rolling_30_days_relative_to_2_years"] = (
-        data["fraud_online_rolling_mean_30_days"]
-        / data["fraud_online_rolling_mean_2_years"]
-    )
-    data["fraud_online_rolling_60_days_relative_to_365_days"] = (
-        data["fraud_online_rolling_mean_60_days"]
-        / data["fraud_online_rolling_mean_365_days"]
-    )
-    data["fraud_online_rolling_60_days_relative_to_2_years"] = (
-        data["fraud_online_rolling_mean_60_days"]
-        / data["fraud_online_rolling_mean_2_years"]
-    )
+    This is the out-of-core version of `rolling_feature_engineering`: the chunks
+    must be in time order (the rows within a chunk can be in any order), and only
+    the timestamps and fraud indicators of the last 2 years are kept in memory
+    between chunks, so the memory usage is bounded by the length of the longest
+    window rather than by the whole history. Each chunk is written to the output
+    file as soon as its features are computed.
 
-    data["fraud_card_present_rolling_30_days_relative_to_365_days"] = (
-        data["fraud_card_present_rolling_mean_30_days"]
-        / data["fraud_card_present_rolling_mean_365_days"]
-    )
-    data["fraud_card_present_rolling_30_days_relative_to_2_years"] = (
-        data["fraud_card_present_rolling_mean_30_days"]
-        / data["fraud_card_present_rolling_mean_2_years"]
-    )
-    data["fraud_card_present_rolling_60_days_relative_to_365_days"] = (
-        data["fraud_card_present_rolling_mean_60_days"]
-        / data["fraud_card_present_rolling_mean_365_days"]
-    )
-    data["fraud_card_present_rolling_60_days_relative_to_2_years"] = (
-        data["fraud_card_present_rolling_mean_60_days"]
-        / data["fraud_card_present_rolling_mean_2_years"]
-    )
+    Args:
+        chunks (Iterable[pd.DataFrame]): Chunks of data, e.g. from
+            `read_transaction_chunks`.
+        output_path (Union[str, Path]): Path of the output Parquet file.
+        profiler (Optional[Profiler]): If provided, record the resources used to
+            compute the rolling means and the ratios, and to write the chunks.
+            Defaults to None.
+        dtype (np.dtype): Data type of the computed features. Defaults to
+            np.float64.
 
-    # Rolling proportions relative all frauds
-    data["fraud_swipe_rolling_30_days_relative_to_all_frauds"] = (
-        data["fraud_swipe_rolling_mean_30_days"] / data["fraud_rolling_mean_30_days"]
-    )
-    data["fraud_chip_rolling_30_days_relative_to_all_frauds"] = (
-        data["fraud_chip_rolling_mean_30_days"] / data["fraud_rolling_mean_30_days"]
-    )
-    data["fraud_online_rolling_30_days_relative_to_all_frauds"] = (
-        data["fraud_online_rolling_mean_30_days"] / data["fraud_rolling_mean_30_days"]
-    )
-    data["fraud_card_present_rolling_30_days_relative_to_all_frauds"] = (
-        data["fraud_card_present_rolling_mean_30_days"]
-        / data["fraud_rolling_mean_30_days"]
-    )
+    Returns:
+        int: Number of rows written.
+    """
+    profiler = get_profiler(profiler)
+    means, ratios = rolling_feature_names()
+    columns = {c: i for i, c in enumerate(means + [r[0] for r in ratios])}
+    max_window = np.timedelta64(max(ROLLING_WINDOWS.values()), "D")
+    max_window = max_window.astype("m8[ns]").view(np.int64)
 
-    data["fraud_swipe_rolling_60_days_relative_to_all_frauds"] = (
-        data["fraud_swipe_rolling_mean_60_days"] / data["fraud_rolling_mean_60_days"]
-    )
-    data["fraud_chip_rolling_60_days_relative_to_all_frauds"] = (
-        data["fraud_chip_rolling_mean_60_days"] / data["fraud_rolling_mean_60_days"]
-    )
-    data["fraud_online_rolling_60_days_relative_to_all_frauds"] = (
-        data["fraud_online_rolling_mean_60_days"] / data["fraud_rolling_mean_60_days"]
-    )
-    data["fraud_card_present_rolling_60_days_relative_to_all_frauds"] = (
-        data["fraud_card_present_rolling_mean_60_days"]
-        / data["fraud_rolling_mean_60_days"]
-    )
+    history_times = np.empty(0, dtype=np.int64)
+    history_values = np.empty((len(FRAUD_INDICATORS), 0))
+    writer, n_rows = None, 0
+    try:
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            with profiler.phase("rolling_means"):
+                chunk = chunk.sort_values("datetime_offset")
+                times, values = _indicator_arrays(chunk)
+                if len(history_times) > 0 and times[0] < history_times[-1]:
+                    msg = "The chunks of data must be sorted by `datetime_offset`."
+                    logger.error(msg)
+                    raise ValueError(msg)
+                times = np.concatenate([history_times, times])
+                values = np.concatenate([history_values, values], axis=1)
+                features = np.empty((len(chunk), len(columns)), dtype=dtype, order="F")
+                _fill_rolling_means(
+                    features, columns, times, values, n_history=len(history_times)
+                )
 
-    data["fraud_swipe_rolling_365_days_relative_to_all_frauds"] = (
-        data["fraud_swipe_rolling_mean_365_days"] / data["fraud_rolling_mean_365_days"]
-    )
-    data["fraud_chip_rolling_365_days_relative_to_all_frauds"] = (
-        data["fraud_chip_rolling_mean_365_days"] / data["fraud_rolling_mean_365_days"]
-    )
-    data["fraud_online_rolling_365_days_relative_to_all_frauds"] = (
-        data["fraud_online_rolling_mean_365_days"] / data["fraud_rolling_mean_365_days"]
-    )
-    data["fraud_card_present_rolling_365_days_relative_to_all_frauds"] = (
-        data["fraud_card_present_rolling_mean_365_days"]
-        / data["fraud_rolling_mean_365_days"]
-    )
+            with profiler.phase("ratios"):
+                _fill_rolling_ratios(features, columns, chunk)
 
-    data["fraud_swipe_rolling_2_years_relative_to_all_frauds"] = (
-        data["fraud_swipe_rolling_mean_2_years"] / data["fraud_rolling_mean_2_years"]
-    )
-    data["fraud_chip_rolling_2_years_relative_to_all_frauds"] = (
-        data["fraud_chip_rolling_mean_2_years"] / data["fraud_rolling_mean_2_years"]
-    )
-    data["fraud_online_rolling_2_years_relative_to_all_frauds"] = (
-        data["fraud_online_rolling_mean_2_years"] / data["fraud_rolling_mean_2_years"]
-    )
-    data["fraud_card_present_rolling_2_years_relative_to_all_frauds"] = (
-        data["fraud_card_present_rolling_mean_2_years"]
-        / data["fraud_rolling_mean_2_years"]
-    )
-    logger.info("Computed proportions of fraud rolling statistics.")
+            with profiler.phase("write"):
+                table = pa.Table.from_pandas(
+                    _add_features(chunk, features, columns), preserve_index=False
+                )
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                else:
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
 
-    # Mean amount spent over short time periods relative to longer time periods
-    data["mean_amount_last_7_days_relative_to_last_year"] = (
-        data["mean_amount_last_7_days"] / data["mean_amount_last_year"]
-    )
-    data["mean_amount_last_2_days_relative_to_last_year"] = (
-        data["mean_amount_last_2_days"] / data["mean_amount_last_year"]
-    )
-    data["mean_amount_last_1_days_relative_to_last_year"] = (
-        data["mean_amount_last_1_days"] / data["mean_amount_last_year"]
-    )
-    data["mean_amount_last_7_days_relative_to_last_30_days"] = (
-        data["mean_amount_last_7_days"] / data["mean_amount_last_30_days"]
-    )
-    data["mean_amount_last_2_days_relative_to_last_30_days"] = (
-        data["mean_amount_last_2_days"] / data["mean_amount_last_30_days"]
-    )
-    data["mean_amount_last_1_days_relative_to_last_30_days"] = (
-        data["mean_amount_last_1_days"] / data["mean_amount_last_30_days"]
-    )
-    logger.info("Computed proportions of rolling mean amount.")
+            # Only keep the rows that can be in the windows of the next chunks
+            keep = np.searchsorted(times, times[-1] - max_window, side="left")
+            history_times, history_values = times[keep:], values[:, keep:]
+            n_rows += len(chunk)
+            logger.debug(
+                f"Wrote {n_rows} rows, keeping {len(history_times)} rows of history."
+            )
+    finally:
+        if writer is not None:
+            writer.close()
 
-    # Calculate statistic related to transaction frequencies
-    data["1_days_transaction_frequency_relative_to_last_30_days"] = (
-        data["transaction_frequency_last_1_days"]
-        / data["transaction_frequency_last_30_days"]
-    )
-    data["1_days_transaction_frequency_relative_to_last_year"] = (
-        data["transaction_frequency_last_1_days"]
-        / data["transaction_frequency_last_year"]
+    logger.info(f"Saved rolling features of {n_rows} rows to {output_path}.")
+    return n_rows
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    # Same as COALESCE(SAFE_DIVIDE(numerator, denominator), 0) in BigQuery
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+def _user_partition_features(
+    keys: np.ndarray,
+    user_codes: np.ndarray,
+    times: np.ndarray,
+    amounts: np.ndarray,
+    weights: np.ndarray,
+) -> np.ndarray:
+    # The rows are sorted by key, i.e. by user and time
+    position = np.arange(len(keys))
+    first = np.searchsorted(user_codes, user_codes, side="left")
+    # RANGE windows end before the first row with the same time
+    end = np.searchsorted(keys, keys, side="left")
+    sums = np.concatenate([[0], np.cumsum(amounts, dtype=np.float64)])
+    counts = np.concatenate([[0], np.cumsum(weights, dtype=np.int64)])
+
+    names = {name: i for i, name in enumerate(user_feature_names())}
+    features = np.zeros((len(keys), len(names)), order="F")
+
+    # ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+    count = counts[position] - counts[first]
+    features[:, names["mean_amount"]] = _safe_divide(
+        sums[position] - sums[first], count
     )
-    data["2_days_transaction_frequency_relative_to_last_30_days"] = (
-        data["transaction_frequency_last_2_days"]
-        / data["transaction_frequency_last_30_days"]
+    features[:, names["transaction_count"]] = count
+    days = times // SECONDS_IN_DAY - times[first] // SECONDS_IN_DAY
+    features[:, names["days_since_first_transaction"]] = days
+    features[:, names["transaction_frequency_all"]] = np.where(
+        days > 0, _safe_divide(count - 1, days), 0
     )
-    data["2_days_transaction_frequency_relative_to_last_year"] = (
-        data["transaction_frequency_last_2_days"]
-        / data["transaction_frequency_last_year"]
+
+    # RANGE BETWEEN <window> PRECEDING AND 1 PRECEDING
+    for window, window_days in USER_WINDOWS.items():
+        start = np.searchsorted(keys, keys - window_days * SECONDS_IN_DAY, side="left")
+        window_count = counts[end] - counts[start]
+        features[:, names[f"mean_amount_last_{window}"]] = _safe_divide(
+            sums[end] - sums[start], window_count
+        )
+        features[:, names[f"transaction_frequency_last_{window}"]] = np.where(
+            days > 0, _safe_divide(window_count, np.minimum(window_days, days)), 0
+        )
+
+    for long in ("year", "30_days"):
+        for short in ("7_days", "2_days", "1_days"):
+            features[:, names[f"mean_amount_last_{short}_relative_to_last_{long}"]] = (
+                _safe_divide(
+                    features[:, names[f"mean_amount_last_{short}"]],
+                    features[:, names[f"mean_amount_last_{long}"]],
+                )
+            )
+            name = f"{short}_transaction_frequency_relative_to_last_{long}"
+            features[:, names[name]] = _safe_divide(
+                features[:, names[f"transaction_frequency_last_{short}"]],
+                features[:, names[f"transaction_frequency_last_{long}"]],
+            )
+    return features
+
+
+def user_feature_engineering(
+    data: pd.DataFrame,
+    user_column: str = "user",
+    time_column: str = "datetime_unix_seconds",
+    amount_column: str = "amount",
+    weight_column: Optional[str] = None,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """Calculate the rolling amount and frequency features of each user.
+
+    The features are the same as the ones computed with window functions by
+    `q_preprocessing.sql`, so they can be computed locally without running the
+    query. The data is sorted by user and time (ties keep the order of `data`),
+    then every window is computed at once with cumulative sums and binary
+    searches. The users are split into `n_jobs` partitions, processed in parallel.
+
+    Args:
+        data (pd.DataFrame): Transactions. The amounts must not be missing.
+        user_column (str): Column with the user of each transaction. Defaults to
+            "user".
+        time_column (str): Column with the time of each transaction, in seconds
+            since the Unix epoch. Defaults to "datetime_unix_seconds".
+        amount_column (str): Column with the amount of each transaction. Defaults
+            to "amount".
+        weight_column (Optional[str]): Column with the number of transactions
+            that each row stands for, in which case the amount is their total
+            amount. This is used to summarise old transactions when resuming from
+            a `FeatureCheckpoint`. If None, each row is one transaction. Defaults
+            to None.
+        n_jobs (int): Number of processes. If -1, use all the available cores.
+            Defaults to 1.
+
+    Returns:
+        pd.DataFrame: Features of each transaction, sorted by user and time, with
+            the index of the transaction in `data`.
+    """
+    _, user_codes = np.unique(data[user_column].to_numpy(), return_inverse=True)
+    times = data[time_column].to_numpy(np.int64)
+    amounts = data[amount_column].to_numpy(np.float64)
+    weights = (
+        np.ones(len(data), dtype=np.int64)
+        if weight_column is None
+        else data[weight_column].to_numpy(np.int64)
     )
-    data["7_days_transaction_frequency_relative_to_last_30_days"] = (
-        data["transaction_frequency_last_7_days"]
-        / data["transaction_frequency_last_30_days"]
+
+    # Key each row by its user and time, with the users far enough apart that no
+    # window spans two users, so that a single sort and binary search cover them
+    span = int(times.max() - times.min()) + max(USER_WINDOWS.values()) * SECONDS_IN_DAY
+    keys = user_codes.astype(np.int64) * (span + 1) + (times - times.min())
+    order = np.argsort(keys, kind="stable")
+    keys, user_codes = keys[order], user_codes[order]
+
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    # Split the sorted rows at user boundaries into partitions of similar size
+    boundaries = np.flatnonzero(np.diff(user_codes)) + 1
+    splits = []
+    if n_jobs > 1 and len(boundaries) > 0:
+        targets = np.linspace(0, len(order), n_jobs + 1)[1:-1]
+        cuts = np.searchsorted(boundaries, targets).clip(0, len(boundaries) - 1)
+        splits = np.unique(boundaries[cuts])
+    partitions = np.split(np.arange(len(order)), splits)
+    worker_args = [
+        (keys[p], user_codes[p], times[order[p]], amounts[order[p]], weights[order[p]])
+        for p in partitions
+    ]
+
+    logger.info(
+        f"Computing user features of {len(data)} rows in {len(partitions)} partitions."
+    )
+    if len(partitions) == 1:
+        results = [_user_partition_features(*a) for a in worker_args]
+    else:
+        with ProcessPoolExecutor(max_workers=len(partitions)) as executor:
+            results = list(executor.map(_user_partition_features, *zip(*worker_args)))
+
+    # The partitions are contiguous blocks of the sorted rows
+    features = np.empty((len(data), len(user_feature_names())), order="F")
+    for partition, result in zip(partitions, results):
+        features[partition[0] : partition[-1] + 1] = result
+    logger.info("Computed user rolling amount and frequency features.")
+
+    features = pd.DataFrame(
+        features, columns=user_feature_names(), index=data.index[order], copy=False
     )
-    data["7_days_transaction_frequency_relative_to_last_year"] = (
-        data["transaction_frequency_last_7_days"]
-        / data["transaction_frequency_last_year"]
+    return features.astype({"transaction_count": np.int64})
+
+
+def decayed_feature_names(half_lives_days: Iterable[float]) -> list[str]:
+    """Names of the features computed by `decayed_feature_engineering`.
+
+    Args:
+        half_lives_days (Iterable[float]): Half-lives of the decay, in days.
+
+    Returns:
+        list[str]: Names of the features, for each half-life the user features
+            followed by the fraud features in the order of `FRAUD_INDICATORS`.
+    """
+    names = []
+    for half_life in half_lives_days:
+        suffix = f"{half_life:g}_days"
+        names += [
+            f"decayed_mean_amount_{suffix}",
+            f"decayed_transaction_frequency_{suffix}",
+        ]
+        names += [f"{prefix}_decayed_mean_{suffix}" for prefix in FRAUD_INDICATORS]
+    return names
+
+
+def _decayed_sums(
+    times: np.ndarray, values: np.ndarray, half_life_seconds: float
+) -> np.ndarray:
+    # Sums of `values` over the earlier timestamps, each weighted by 2 ** (-age /
+    # half-life), for rows sorted by time. Within a block the weights are taken
+    # relative to the end of the block, so they fit in a float64 as long as the
+    # block is shorter than about 1000 half-lives. The state carried between the
+    # blocks is the decayed sum at the end of the previous block.
+    rate = np.log(2) / half_life_seconds
+    times = times.astype(np.float64)
+    sums = np.empty(values.shape)
+    carry, carry_time = np.zeros(values.shape[0]), times[0]
+    blocks = (times - times[0]) // (600 / rate)
+    boundaries = np.concatenate(
+        [[0], np.flatnonzero(np.diff(blocks)) + 1, [len(times)]]
+    )
+    for start, stop in zip(boundaries[:-1], boundaries[1:]):
+        block_times = times[start:stop]
+        end_time = block_times[-1]
+        cumulative = np.zeros((values.shape[0], stop - start + 1))
+        np.cumsum(
+            values[:, start:stop] * np.exp(rate * (block_times - end_time)),
+            axis=1,
+            out=cumulative[:, 1:],
+        )
+        # The rows with the same timestamp are excluded
+        end = np.searchsorted(block_times, block_times, side="left")
+        sums[:, start:stop] = cumulative[:, end] * np.exp(
+            rate * (end_time - block_times)
+        ) + np.outer(carry, np.exp(rate * (carry_time - block_times)))
+        carry = cumulative[:, -1] + carry * np.exp(rate * (carry_time - end_time))
+        carry_time = end_time
+    return sums
+
+
+def decayed_feature_engineering(
+    data: pd.DataFrame,
+    half_lives_days: Iterable[float] = (7, 30, 365),
+    user_column: str = "user",
+    time_column: str = "datetime_unix_seconds",
+    amount_column: str = "amount",
+    dtype: np.dtype = np.float64,
+) -> pd.DataFrame:
+    """Calculate exponentially decayed alternatives to the rolling features.
+
+    Instead of a fixed window, every earlier transaction is weighted by
+    2 ** (-age / half-life), so each feature only needs a decayed sum and a decayed
+    count as state, per user or globally, which are updated with the new
+    transactions by decaying them and adding the new values. The features are:
+
+    - the decayed mean amount and the decayed number of transactions per day of
+      each user;
+    - the decayed mean of each fraud indicator over all the transactions.
+
+    As for the other features, the transactions at the same time are excluded.
+    The data is sorted once by user and time and once by time, then the decayed
+    sums are computed with cumulative sums.
+
+    Args:
+        data (pd.DataFrame): Transactions. The amounts must not be missing.
+        half_lives_days (Iterable[float]): Half-lives of the decay, in days.
+            Defaults to (7, 30, 365).
+        user_column (str): Column with the user of each transaction. Defaults to
+            "user".
+        time_column (str): Column with the time of each transaction, in seconds
+            since the Unix epoch. Defaults to "datetime_unix_seconds".
+        amount_column (str): Column with the amount of each transaction. Defaults
+            to "amount".
+        dtype (np.dtype): Data type of the computed features. Defaults to
+            np.float64.
+
+    Returns:
+        pd.DataFrame: Features of each transaction, with the index of `data`. When
+            there are no earlier transactions the features are 0.
+    """
+    half_lives_days = list(half_lives_days)
+    times = data[time_column].to_numpy(np.int64)
+    amounts = data[amount_column].to_numpy(np.float64)
+    indicators = data[list(FRAUD_INDICATORS.values())].to_numpy(np.float64).T
+    is_valid = ~np.isnan(indicators)
+    indicators = np.where(is_valid, indicators, 0)
+
+    _, user_codes = np.unique(data[user_column].to_numpy(), return_inverse=True)
+    user_order = np.lexsort((times, user_codes))
+    user_times, user_amounts = times[user_order], amounts[user_order]
+    user_boundaries = np.concatenate(
+        [[0], np.flatnonzero(np.diff(user_codes[user_order])) + 1, [len(data)]]
+    )
+    time_order = np.argsort(times, kind="stable")
+    fraud_values = np.concatenate([indicators, is_valid])[:, time_order]
+
+    columns = {c: i for i, c in enumerate(decayed_feature_names(half_lives_days))}
+    features = np.empty((len(data), len(columns)), dtype=dtype, order="F")
+    for half_life in half_lives_days:
+        suffix = f"{half_life:g}_days"
+        half_life_seconds = half_life * SECONDS_IN_DAY
+
+        # Each user is a contiguous block of the rows sorted by user and time
+        user_sums = np.empty((2, len(data)))
+        for start, stop in zip(user_boundaries[:-1], user_boundaries[1:]):
+            user_sums[:, start:stop] = _decayed_sums(
+                user_times[start:stop],
+                np.stack([user_amounts[start:stop], np.ones(stop - start)]),
+                half_life_seconds,
+            )
+        features[user_order, columns[f"decayed_mean_amount_{suffix}"]] = _safe_divide(
+            user_sums[0], user_sums[1]
+        )
+        # Transactions per day: the decayed count divided by the mean age of the
+        # weights, which is half-life / ln(2)
+        features[user_order, columns[f"decayed_transaction_frequency_{suffix}"]] = (
+            user_sums[1] * np.log(2) / half_life
+        )
+
+        fraud_sums = _decayed_sums(times[time_order], fraud_values, half_life_seconds)
+        fraud_means = _safe_divide(
+            fraud_sums[: len(FRAUD_INDICATORS)], fraud_sums[len(FRAUD_INDICATORS) :]
+        )
+        for i, prefix in enumerate(FRAUD_INDICATORS):
+            features[time_order, columns[f"{prefix}_decayed_mean_{suffix}"]] = (
+                fraud_means[i]
+            )
+    logger.info("Computed exponentially decayed features.")
+
+    return pd.DataFrame(features, columns=list(columns), index=data.index, copy=False)
+
+
+def _summarise_user_history(rows: pd.DataFrame, end_time: int) -> pd.DataFrame:
+    # Keep the transactions that can be in the windows of transactions newer than
+    # `end_time`, and summarise the older ones of each user in a single row at the
+    # time of the first transaction of the user
+    is_recent = (
+        rows["datetime_unix_seconds"]
+        >= end_time - max(USER_WINDOWS.values()) * SECONDS_IN_DAY
+    )
+    summary = (
+        rows[~is_recent]
+        .groupby("user", as_index=False)
+        .agg(
+            datetime_unix_seconds=("datetime_unix_seconds", "min"),
+            amount=("amount", "sum"),
+            n_transactions=("n_transactions", "sum"),
+        )
+    )
+    return pd.concat([summary, rows[is_recent]], ignore_index=True)
+
+
+class FeatureCheckpoint:
+    """Trailing-window state of the rolling features at the end of a run.
+
+    A run of `materialize_features` or `materialize_features_incrementally`
+    returns a checkpoint, so that the next run only computes the features of the
+    transactions newer than the checkpoint. It contains:
+
+    - the timestamps and fraud indicators of the transactions of the last 2
+      years, for the global fraud features;
+    - the amounts of the transactions of the last year of each user, plus one row
+      per user summarising the number and total amount of the older ones, for the
+      user features.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(
+        self,
+        user_end_time: int,
+        fraud_end_time: pd.Timestamp,
+        fraud_history: pd.DataFrame,
+        user_history: pd.DataFrame,
+    ) -> None:
+        """Create the checkpoint.
+
+        Args:
+            user_end_time (int): Time of the last transaction, in seconds since the
+                Unix epoch.
+            fraud_end_time (pd.Timestamp): Last value of `datetime_offset`.
+            fraud_history (pd.DataFrame): `datetime_offset` and fraud indicators
+                of the transactions in the longest window before
+                `fraud_end_time`.
+            user_history (pd.DataFrame): User, time, amount and number of
+                transactions of each row of the history of the users.
+        """
+        self.user_end_time = int(user_end_time)
+        self.fraud_end_time = pd.Timestamp(fraud_end_time)
+        self.fraud_history = fraud_history
+        self.user_history = user_history
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame) -> "FeatureCheckpoint":
+        """Create the checkpoint at the end of a history of transactions.
+
+        Args:
+            data (pd.DataFrame): All the transactions up to the checkpoint.
+
+        Returns:
+            FeatureCheckpoint: The checkpoint.
+        """
+        return cls._extend(None, data)
+
+    @classmethod
+    def _extend(
+        cls, checkpoint: Optional["FeatureCheckpoint"], data: pd.DataFrame
+    ) -> "FeatureCheckpoint":
+        fraud_rows = data[["datetime_offset"] + list(FRAUD_INDICATORS.values())]
+        user_rows = data[["user", "datetime_unix_seconds", "amount"]].assign(
+            n_transactions=1
+        )
+        if checkpoint is not None:
+            fraud_rows = pd.concat([checkpoint.fraud_history, fraud_rows])
+            user_rows = pd.concat([checkpoint.user_history, user_rows])
+
+        user_end_time = user_rows["datetime_unix_seconds"].max()
+        fraud_end_time = fraud_rows["datetime_offset"].max()
+        window = pd.Timedelta(days=max(ROLLING_WINDOWS.values()))
+        fraud_rows = fraud_rows[
+            fraud_rows["datetime_offset"] >= fraud_end_time - window
+        ]
+        return cls(
+            user_end_time=user_end_time,
+            fraud_end_time=fraud_end_time,
+            fraud_history=fraud_rows.sort_values("datetime_offset").reset_index(
+                drop=True
+            ),
+            user_history=_summarise_user_history(user_rows, user_end_time),
+        )
+
+    def save(self, folder: Union[str, Path]) -> None:
+        """Save the checkpoint as Parquet files and a JSON file.
+
+        Args:
+            folder (Union[str, Path]): Folder where the checkpoint is saved.
+        """
+        folder = Path(folder)
+        folder.mkdir(parents=True, exist_ok=True)
+        self.fraud_history.to_parquet(folder / "fraud_history.parquet", index=False)
+        self.user_history.to_parquet(folder / "user_history.parquet", index=False)
+        with open(folder / "checkpoint.json", "w") as f:
+            json.dump(
+                {
+                    "format_version": self.FORMAT_VERSION,
+                    "user_end_time": self.user_end_time,
+                    "fraud_end_time": self.fraud_end_time.isoformat(),
+                },
+                f,
+                indent=2,
+            )
+        logger.info(f"Saved feature checkpoint to {folder}.")
+
+    @classmethod
+    def load(cls, folder: Union[str, Path]) -> "FeatureCheckpoint":
+        """Load a checkpoint saved with `save`.
+
+        Args:
+            folder (Union[str, Path]): Folder where the checkpoint is saved.
+
+        Returns:
+            FeatureCheckpoint: The checkpoint.
+        """
+        folder = Path(folder)
+        with open(folder / "checkpoint.json") as f:
+            metadata = json.load(f)
+        if metadata["format_version"] > cls.FORMAT_VERSION:
+            msg = f"Unsupported feature checkpoint format in {folder}."
+            logger.error(msg)
+            raise ValueError(msg)
+        return cls(
+            user_end_time=metadata["user_end_time"],
+            fraud_end_time=pd.Timestamp(metadata["fraud_end_time"]),
+            fraud_history=pd.read_parquet(folder / "fraud_history.parquet"),
+            user_history=pd.read_parquet(folder / "user_history.parquet"),
+        )
+
+
+def materialize_features(
+    data: pd.DataFrame, dtype: np.dtype = np.float64
+) -> tuple[pd.DataFrame, FeatureCheckpoint]:
+    """Compute the user and rolling fraud features of all the transactions.
+
+    Args:
+        data (pd.DataFrame): Transactions.
+        dtype (np.dtype): Data type of the rolling fraud features. Defaults to
+            np.float64.
+
+    Returns:
+        pd.DataFrame: Transactions with the features, see
+            `rolling_feature_engineering`.
+        FeatureCheckpoint: Checkpoint at the end of the transactions.
+    """
+    user_features = user_feature_engineering(data)
+    data = data.drop(columns=user_features.columns, errors="ignore")
+    features = rolling_feature_engineering(data.join(user_features), dtype=dtype)
+    return features, FeatureCheckpoint.from_data(data)
+
+
+def materialize_features_incrementally(
+    data: pd.DataFrame, checkpoint: FeatureCheckpoint, dtype: np.dtype = np.float64
+) -> tuple[pd.DataFrame, FeatureCheckpoint]:
+    """Compute the features of the transactions newer than a checkpoint.
+
+    The result is the same as running `materialize_features` on the whole history
+    and keeping the new transactions, up to floating point rounding of the sums of
+    amounts.
+
+    Args:
+        data (pd.DataFrame): New transactions. The transactions not newer than the
+            checkpoint are skipped.
+        checkpoint (FeatureCheckpoint): Checkpoint of the previous run.
+        dtype (np.dtype): Data type of the rolling fraud features. Defaults to
+            np.float64.
+
+    Returns:
+        pd.DataFrame: New transactions with the features, see
+            `rolling_feature_engineering`.
+        FeatureCheckpoint: Checkpoint at the end of the new transactions.
+    """
+    is_new = data["datetime_unix_seconds"] > checkpoint.user_end_time
+    if not is_new.all():
+        logger.warning(
+            f"Skipping {(~is_new).sum()} transactions not newer than the checkpoint."
+        )
+    data = data[is_new]
+    if (data["datetime_offset"] < checkpoint.fraud_end_time).any():
+        msg = "The new transactions must have `datetime_offset` after the checkpoint."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    # Resume the user windows from the history of each user in the checkpoint
+    user_rows = pd.concat(
+        [
+            checkpoint.user_history,
+            data[["user", "datetime_unix_seconds", "amount"]].assign(n_transactions=1),
+        ],
+        ignore_index=True,
+    )
+    user_features = user_feature_engineering(user_rows, weight_column="n_transactions")
+    user_features = user_features[
+        user_features.index >= len(checkpoint.user_history)
+    ].astype({"transaction_count": np.int64})
+    user_features.index = data.index[user_features.index - len(checkpoint.user_history)]
+    data = data.drop(columns=user_features.columns, errors="ignore")
+    with_user_features = data.join(user_features).sort_values("datetime_offset")
+
+    # Resume the global windows from the fraud history in the checkpoint
+    means, ratios = rolling_feature_names()
+    columns = {c: i for i, c in enumerate(means + [r[0] for r in ratios])}
+    history_times, history_values = _indicator_arrays(checkpoint.fraud_history)
+    times, values = _indicator_arrays(with_user_features)
+    features = np.empty((len(data), len(columns)), dtype=dtype, order="F")
+    _fill_rolling_means(
+        features,
+        columns,
+        np.concatenate([history_times, times]),
+        np.concatenate([history_values, values], axis=1),
+        n_history=len(history_times),
+    )
+    _fill_rolling_ratios(features, columns, with_user_features)
+    logger.info(f"Computed features of {len(data)} new transactions.")
+
+    return (
+        _add_features(with_user_features, features, columns),
+        FeatureCheckpoint._extend(checkpoint, data),
     )
-    logger.info("Computed proportions of rolling transaction frequency.")
 
-    return data
+
+def verify_incremental_features(
+    data: pd.DataFrame,
+    split_time: int,
+    n_users: int = 50,
+    id_column: str = "transaction_id",
+    random_state: int = 42,
+) -> dict:
+    """Check that incremental and full computations of the features agree.
+
+    The transactions of a random sample of users are split at `split_time`. The
+    features of the later ones are computed from the checkpoint of the earlier
+    ones, and compared with the features computed on all the transactions of the
+    sample.
+
+    Args:
+        data (pd.DataFrame): Transactions.
+        split_time (int): Time of the checkpoint, in seconds since the Unix epoch.
+        n_users (int): Number of users in the sample. Defaults to 50.
+        id_column (str): Column identifying the transactions. Defaults to
+            "transaction_id".
+        random_state (int): Random state of the sample. Defaults to 42.
+
+    Returns:
+        dict: Number of transactions compared, maximum absolute difference of the
+            features, and whether the features match.
+    """
+    users = pd.Series(data["user"].unique())
+    users = users.sample(min(n_users, len(users)), random_state=random_state)
+    sample = data[data["user"].isin(users)]
+    is_new = sample["datetime_unix_seconds"] > split_time
+
+    _, checkpoint = materialize_features(sample[~is_new])
+    incremental, _ = materialize_features_incrementally(sample[is_new], checkpoint)
+    full, _ = materialize_features(sample)
+    full = full[full[id_column].isin(incremental[id_column])]
+
+    incremental = incremental.sort_values(id_column).reset_index(drop=True)
+    full = full.sort_values(id_column).reset_index(drop=True)[incremental.columns]
+    means, ratios = rolling_feature_names()
+    feature_columns = list(
+        dict.fromkeys(user_feature_names() + means + [r[0] for r in ratios])
+    )
+    differences = np.abs(
+        incremental[feature_columns].to_numpy(np.float64)
+        - full[feature_columns].to_numpy(np.float64)
+    )
+    report = {
+        "n_transactions": len(incremental),
+        "max_abs_difference": float(np.nan_to_num(differences, nan=0).max(initial=0)),
+        "match": bool(
+            np.allclose(
+                incremental[feature_columns].to_numpy(np.float64),
+                full[feature_columns].to_numpy(np.float64),
+                rtol=1e-9,
+                atol=1e-9,
+                equal_nan=True,
+            )
+        ),
+    }
+    if report["match"] is False:
+        logger.error(f"Incremental features do not match a full recompute: {report}.")
+    else:
+        logger.info(f"Incremental features match a full recompute: {report}.")
+    return report
@@ -0,0 +1,308 @@
+import re
+from pathlib import Path
+from typing import Optional, Union
+
+import pyarrow as pa
+import pyarrow.csv as csv
+import pyarrow.dataset as ds
+from google.cloud import bigquery
+from loguru import logger
+
+from src.base.data import SPLIT_COLUMN
+from src.base.utilities import read_yaml
+
+PARAMS_PATH = Path(__file__).parents[1] / "pipelines" / "configuration" / "params.yaml"
+
+# Columns of the raw tables, in the order of the source files, with the names given
+# by the BQ autodetection (e.g. `Is Fraud?` becomes `Is_Fraud_`)
+RAW_TABLES = {
+    "transactions": [
+        ("User", "INT64"),
+        ("Card", "INT64"),
+        ("Year", "INT64"),
+        ("Month", "INT64"),
+        ("Day", "INT64"),
+        ("Time", "STRING"),
+        ("Amount", "FLOAT64"),
+        ("Use_Chip", "STRING"),
+        ("Merchant_Name", "INT64"),
+        ("Merchant_City", "STRING"),
+        ("Merchant_State", "STRING"),
+        ("Zip", "FLOAT64"),
+        ("MCC", "INT64"),
+        ("Errors_", "STRING"),
+        ("Is_Fraud_", "BOOL"),
+    ],
+    "users": [
+        ("Person", "STRING"),
+        ("Current Age", "INT64"),
+        ("Retirement Age", "INT64"),
+        ("Birth Year", "INT64"),
+        ("Birth Month", "INT64"),
+        ("Gender", "STRING"),
+        ("Address", "STRING"),
+        ("Apartment", "FLOAT64"),
+        ("City", "STRING"),
+        ("State", "STRING"),
+        ("Zipcode", "INT64"),
+        ("Latitude", "FLOAT64"),
+        ("Longitude", "FLOAT64"),
+        ("Per Capita Income - Zipcode", "STRING"),
+        ("Yearly Income - Person", "STRING"),
+        ("Total Debt", "STRING"),
+        ("FICO Score", "INT64"),
+        ("Num Credit Cards", "INT64"),
+        ("User", "INT64"),
+    ],
+    "cards": [
+        ("User", "INT64"),
+        ("CARD_INDEX", "INT64"),
+        ("Card_Brand", "STRING"),
+        ("Card_Type", "STRING"),
+        ("Card_Number", "INT64"),
+        ("Expires", "STRING"),
+        ("CVV", "INT64"),
+        ("Has_Chip", "BOOL"),
+        ("Cards_Issued", "INT64"),
+        ("Credit_Limit", "STRING"),
+        ("Acct_Open_Date", "STRING"),
+        ("Year_PIN_last_Changed", "INT64"),
+        ("Card_on_Dark_Web", "BOOL"),
+    ],
+    "holidays": [("date", "DATE"), ("name", "STRING")],
+}
+# Values of the BOOL columns in the raw CSV files
+TRUE_VALUES = ["Yes", "YES", "true", "True", "TRUE"]
+FALSE_VALUES = ["No", "NO", "false", "False", "FALSE"]
+
+# Features taking only the values 0 and 1, and integer features
+BINARY_FEATURES = {
+    "has_chip",
+    "gender",
+    "online_transaction",
+    "amex",
+    "discover",
+    "mastercard",
+    "visa",
+    "credit",
+    "debit",
+    "debit_prepaid",
+    "card_present_transaction",
+    "is_holiday",
+    "weekend",
+    "is_2015_or_later",
+}
+INTEGER_FEATURES = {"transaction_count", "days_since_first_transaction"}
+
+# Narrowest Arrow type holding the values of each kind of column
+ARROW_TYPES = {
+    "INT64": pa.int64(),
+    "FLOAT64": pa.float64(),
+    "BOOL": pa.bool_(),
+    "STRING": pa.string(),
+    "DATE": pa.date32(),
+}
+# Checks of the Arrow types that can be loaded into each BQ type
+COMPATIBLE_ARROW_TYPES = {
+    "INT64": pa.types.is_integer,
+    "FLOAT64": lambda t: pa.types.is_floating(t) or pa.types.is_integer(t),
+    "BOOL": pa.types.is_boolean,
+    "STRING": lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    "DATE": pa.types.is_date,
+}
+
+
+def _autodetected_name(name: str) -> str:
+    """Column name given by the BQ autodetection to a CSV header."""
+    return re.sub(r"[^0-9A-Za-z_]", "_", name)
+
+
+class SchemaRegistry:
+    """Explicit schemas of the BQ tables of the pipelines.
+
+    The raw tables are defined in `RAW_TABLES`, the preprocessed and split tables
+    from the features in `params.yaml`. Each column has a BQ type, used by the
+    loads instead of the autodetection, and the narrowest Arrow type holding its
+    values, used by the readers (e.g. `int8` for the binary features and
+    `float32` for the continuous ones).
+    """
+
+    def __init__(self, features: list[str], target_column: str = "is_fraud") -> None:
+        """Create the registry.
+
+        Args:
+            features (list[str]): Features of the preprocessed table.
+            target_column (str): Column containing the target variable. Defaults
+                to "is_fraud".
+        """
+        feature_columns = []
+        for feature in features:
+            if feature in BINARY_FEATURES:
+                feature_columns.append((feature, "INT64", pa.int8()))
+            elif feature in INTEGER_FEATURES:
+                feature_columns.append((feature, "INT64", pa.int32()))
+            else:
+                feature_columns.append((feature, "FLOAT64", pa.float32()))
+        target = (target_column, "INT64", pa.int8())
+
+        self.tables = {
+            table: [(c, t, ARROW_TYPES[t]) for c, t in columns]
+            for table, columns in RAW_TABLES.items()
+        }
+        self.tables["preprocessed"] = [
+            ("transaction_id", "INT64", pa.int64()),
+            *feature_columns,
+            target,
+            ("datetime_unix_seconds", "INT64", pa.int64()),
+        ]
+        self.tables["split"] = [
+            (SPLIT_COLUMN, "INT64", pa.int8()),
+            ("transaction_id", "INT64", pa.int64()),
+            *feature_columns,
+            target,
+        ]
+
+    @classmethod
+    def from_params(cls, path: Union[str, Path] = PARAMS_PATH) -> "SchemaRegistry":
+        """Create the registry of the features of a `params.yaml` file.
+
+        Args:
+            path (Union[str, Path]): Path of the parameters file. Defaults to the
+                `params.yaml` of the pipelines.
+
+        Returns:
+            SchemaRegistry: The registry.
+        """
+        params = read_yaml(path)
+        return cls(params["features"], target_column=params["target_column"])
+
+    def _columns(self, table: str, columns: Optional[list[str]] = None) -> list:
+        if table not in self.tables:
+            msg = (
+                f"Table {table} not in the registry, choose one of {list(self.tables)}."
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+        if columns is None:
+            return self.tables[table]
+        by_name = {c[0].lower(): c for c in self.tables[table]}
+        missing = [c for c in columns if c.lower() not in by_name]
+        if missing:
+            msg = f"Columns {missing} not in the schema of table {table}."
+            logger.error(msg)
+            raise ValueError(msg)
+        return [by_name[c.lower()] for c in columns]
+
+    def bigquery_schema(
+        self, table: str, columns: Optional[list[str]] = None
+    ) -> list[bigquery.SchemaField]:
+        """BQ schema of a table, to be set in the configuration of load jobs.
+
+        Args:
+            table (str): Name of the table, e.g. "transactions".
+            columns (Optional[list[str]]): Columns to include, in this order. If
+                None, include all the columns. Defaults to None.
+
+        Returns:
+            list[bigquery.SchemaField]: Schema of the table.
+        """
+        return [bigquery.SchemaField(c, t) for c, t, _ in self._columns(table, columns)]
+
+    def arrow_schema(
+        self, table: str, columns: Optional[list[str]] = None
+    ) -> pa.Schema:
+        """Arrow schema of a table, with the narrowest type of each column.
+
+        Args:
+            table (str): Name of the table, e.g. "split".
+            columns (Optional[list[str]]): Columns to include, in this order. If
+                None, include all the columns. Defaults to None.
+
+        Returns:
+            pa.Schema: Schema of the table.
+        """
+        return pa.schema([(c, a) for c, _, a in self._columns(table, columns)])
+
+    def validate(
+        self, path: Union[str, Path, pa.Table], table: str, file_format: str = "parquet"
+    ) -> None:
+        """Check that a file can be loaded into a table with its explicit schema.
+
+        The column names are compared case-insensitively, as in BQ. The Parquet
+        and Arrow data must have all the columns of the table, with compatible
+        types. The header of a CSV file must match the columns of the table in
+        order, and all its values are parsed with the types of the table.
+
+        Args:
+            path (Union[str, Path, pa.Table]): Parquet file or folder containing
+                Parquet files, CSV file, or Arrow table.
+            table (str): Name of the table, e.g. "transactions".
+            file_format (str): Format of the file, must be one of `parquet`,
+                `csv`. Ignored for Arrow tables. Defaults to "parquet".
+
+        Raises:
+            ValueError: If the file does not match the schema of the table.
+        """
+        columns = self._columns(table)
+        if file_format == "csv" and not isinstance(path, pa.Table):
+            errors = self._validate_csv(path, columns)
+        elif file_format == "parquet" or isinstance(path, pa.Table):
+            if isinstance(path, pa.Table):
+                schema = path.schema
+            else:
+                schema = ds.dataset(str(path), format="parquet").schema
+            errors = self._validate_arrow_schema(schema, columns)
+        else:
+            msg = f"File format {file_format} not supported."
+            logger.error(msg)
+            raise ValueError(msg)
+
+        if errors:
+            msg = f"Data does not match the schema of table {table}: " + "; ".join(
+                errors
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+        logger.info(f"Data matches the schema of table {table}.")
+
+    @staticmethod
+    def _validate_arrow_schema(schema: pa.Schema, columns: list) -> list[str]:
+        types = {name.lower(): schema.field(name).type for name in schema.names}
+        errors = []
+        for name, bq_type, _ in columns:
+            if name.lower() not in types:
+                errors.append(f"missing column {name}")
+            elif not COMPATIBLE_ARROW_TYPES[bq_type](types[name.lower()]):
+                errors.append(
+                    f"column {name} has type {types[name.lower()]}, "
+                    f"incompatible with {bq_type}"
+                )
+        expected = {name.lower() for name, _, _ in columns}
+        errors.extend(f"unexpected column {n}" for n in types if n not in expected)
+        return errors
+
+    @staticmethod
+    def _validate_csv(path: Union[str, Path], columns: list) -> list[str]:
+        with open(path) as f:
+            header = f.readline().rstrip("\r\n")
+        names = [_autodetected_name(n) for n in header.split(",")]
+        expected = [_autodetected_name(name) for name, _, _ in columns]
+        if [n.lower() for n in names] != [n.lower() for n in expected]:
+            return [f"header {names} does not match the columns {expected}"]
+
+        reader = csv.open_csv(
+            path,
+            read_options=csv.ReadOptions(column_names=expected, skip_rows=1),
+            convert_options=csv.ConvertOptions(
+                column_types={n: a for n, (_, _, a) in zip(expected, columns)},
+                true_values=TRUE_VALUES,
+                false_values=FALSE_VALUES,
+                strings_can_be_null=True,
+            ),
+        )
+        try:
+            for _ in reader:
+                pass
+        except pa.ArrowInvalid as e:
+            return [str(e)]
+        return []
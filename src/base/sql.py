@@ -0,0 +1,327 @@
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from loguru import logger
+
+from src.utils.job_statistics import JobStatistics
+
+# Keywords opening a block closed by `END`, the procedural `IF` is handled separately
+BLOCK_KEYWORDS = ("BEGIN", "CASE", "LOOP", "WHILE", "REPEAT")
+# Keywords after which a procedural `IF` can start
+IF_PRECEDING_KEYWORDS = (None, "BEGIN", "DO", "LOOP", "REPEAT", "THEN", "ELSE")
+# Statements of the prelude of a script, whose variables are used by the others
+PRELUDE_KEYWORDS = ("DECLARE", "SET", "IF", "BEGIN")
+# Keywords of the statements that create or change tables
+WRITE_KEYWORDS = ("CREATE", "INSERT", "MERGE", "UPDATE", "DELETE", "DROP", "TRUNCATE")
+# Keywords followed by the name of a table being read
+TABLE_REFERENCE = r"\b(FROM|JOIN|USING|TABLE)(\s+){name}\b"
+TEMP_TABLE = re.compile(r"CREATE\s+TEMP(?:ORARY)?\s+TABLE\s+(\w+)", re.IGNORECASE)
+# Names of the variables declared by a `DECLARE` statement
+DECLARED_VARIABLES = re.compile(
+    r"\s*DECLARE\s+([\w\s,]+?)\s+\w+(?:<.*>)?(?:\s+DEFAULT\b.*)?$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Names of the variables set by the `SET` statements of a procedural block
+SET_VARIABLES = re.compile(
+    r"(?:^|;|\b(?:THEN|ELSE|BEGIN|DO|LOOP|REPEAT))\s*SET\s+(\([^)]*\)|\w+)\s*=",
+    re.IGNORECASE,
+)
+
+
+def _mask_comments_and_strings(script: str) -> str:
+    """Replace the comments and the string literals of a script with spaces.
+
+    The masked script has the same length as the original one, so positions in
+    one are valid in the other.
+    """
+    masked = list(script)
+    i = 0
+    while i < len(script):
+        if script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            end = len(script) if end == -1 else end + 2
+        elif script.startswith("--", i) or script[i] == "#":
+            end = script.find("\n", i)
+            end = len(script) if end == -1 else end
+        elif script[i] in "'\"`":
+            quote = script[i] * 3 if script.startswith(script[i] * 3, i) else script[i]
+            end = i + len(quote)
+            while end < len(script) and not script.startswith(quote, end):
+                end += 2 if script[end] == "\\" else 1
+            end = min(end + len(quote), len(script))
+            # Quoted identifiers are kept, only their content matters
+            if quote == "`":
+                i = end
+                continue
+        else:
+            i += 1
+            continue
+        masked[i:end] = [c if c == "\n" else " " for c in script[i:end]]
+        i = end
+    return "".join(masked)
+
+
+def _block_depth_change(code: str) -> int:
+    """Number of procedural blocks (and `CASE` expressions) opened minus closed."""
+    tokens = re.findall(r"[A-Za-z_]\w*|\(", code.upper())
+    change = 0
+    for i, token in enumerate(tokens):
+        previous = tokens[i - 1] if i > 0 else None
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if previous == "END":
+            # `END IF`, `END LOOP`, ... close a single block
+            continue
+        if token in BLOCK_KEYWORDS and following != "TRANSACTION":
+            change += 1
+        elif token == "END":
+            change -= 1
+        elif token == "IF" and previous in IF_PRECEDING_KEYWORDS:
+            # After `THEN` / `ELSE`, `IF(` is the function of a CASE expression
+            if following != "(" or previous not in ("THEN", "ELSE"):
+                change += 1
+    return change
+
+
+def split_script(script: str) -> list[str]:
+    """Split a SQL script into its top-level statements.
+
+    Semicolons inside comments, string literals and procedural blocks (e.g.
+    `IF ... END IF` or `BEGIN ... END`) do not end a statement, so each block is
+    returned as a single statement.
+
+    Args:
+        script (str): SQL script, with statements separated by semicolons.
+
+    Returns:
+        list[str]: Top-level statements, without the final semicolon.
+    """
+    masked = _mask_comments_and_strings(script)
+    statements = []
+    start, piece_start, depth = 0, 0, 0
+    for match in re.finditer(";", masked):
+        depth += _block_depth_change(masked[piece_start : match.start()])
+        piece_start = match.end()
+        if depth < 0:
+            msg = f"Unbalanced block ending at position {match.start()} of the script."
+            logger.error(msg)
+            raise ValueError(msg)
+        if depth == 0:
+            statements.append(script[start : match.start()].strip())
+            start = match.end()
+    # The last statement may end without a semicolon
+    depth += _block_depth_change(masked[piece_start:])
+    if depth != 0:
+        msg = "The script ends inside a procedural block."
+        logger.error(msg)
+        raise ValueError(msg)
+    statements.append(script[start:].strip())
+    return [s for s in statements if _mask_comments_and_strings(s).strip()]
+
+
+def _leading_keyword(statement: str) -> str:
+    words = _mask_comments_and_strings(statement).split()
+    return words[0].upper() if words else ""
+
+
+def _temp_table_match(statement: str) -> Optional[re.Match]:
+    """Match of the name of the temporary table created by a statement, if any."""
+    code = _mask_comments_and_strings(statement)
+    return TEMP_TABLE.match(code, len(code) - len(code.lstrip()))
+
+
+def _set_variables(statement: str) -> set[str]:
+    """Names of the script variables set by a statement, in lower case."""
+    code = _mask_comments_and_strings(statement)
+    return {
+        name.strip().lower()
+        for match in SET_VARIABLES.finditer(code)
+        for name in match.group(1).strip("()").split(",")
+    }
+
+
+def _references(statement: str, name: str) -> bool:
+    code = _mask_comments_and_strings(statement)
+    return re.search(TABLE_REFERENCE.format(name=name), code, re.IGNORECASE) is not None
+
+
+class StatementGraph:
+    """Dependency graph of the statements of a SQL script.
+
+    The leading `DECLARE` / `SET` statements and procedural blocks that do not
+    write any table form the prelude of the script. Each of the other statements
+    is a node of the graph, named after the temporary table it creates if any,
+    and depends on the statements creating the temporary tables it reads. The
+    statements that do not create a temporary table also depend on each other in
+    order, since their side effects are not tracked.
+
+    The leading procedural blocks that write tables (e.g. to copy a checkpoint
+    read by the prelude) are setup statements: they only run after the prelude
+    statements before them, and all the statements after them depend on them.
+    Since each statement runs in its own job, only the prelude can set the
+    variables of the script.
+    """
+
+    def __init__(self, script: str) -> None:
+        """Split the script and find the dependencies of its statements.
+
+        Args:
+            script (str): SQL script, with statements separated by semicolons.
+
+        Raises:
+            ValueError: If a statement outside the prelude sets variables declared
+                in the prelude, or if a temporary table is created more than once.
+        """
+        self.prelude = []
+        variables = set()
+        self.statements = {}
+        self.temp_tables = []
+        self.dependencies = {}
+        # Number of prelude statements run before each setup statement
+        self._setup_prelude = {}
+        last_side_effect = None
+        in_prelude = True
+        for statement in split_script(script):
+            code = _mask_comments_and_strings(statement).upper()
+            in_prelude = in_prelude and _leading_keyword(statement) in PRELUDE_KEYWORDS
+            if in_prelude and not re.search(rf"\b({'|'.join(WRITE_KEYWORDS)})\b", code):
+                self.prelude.append(statement)
+                declared = DECLARED_VARIABLES.match(
+                    _mask_comments_and_strings(statement)
+                )
+                if declared is not None:
+                    variables.update(
+                        n.strip().lower() for n in declared.group(1).split(",")
+                    )
+                continue
+
+            match = _temp_table_match(statement)
+            name = match.group(1) if match else f"statement_{len(self.statements)}"
+            if name in self.statements:
+                msg = f"Temporary table {name} is created more than once."
+                logger.error(msg)
+                raise ValueError(msg)
+            set_variables = _set_variables(statement) & variables
+            if set_variables:
+                msg = (
+                    f"Statement {name} sets the variables {sorted(set_variables)} "
+                    "outside the prelude, the other statements would not see them. "
+                    "Set them in a procedural block that does not write any table."
+                )
+                logger.error(msg)
+                raise ValueError(msg)
+            dependencies = {t for t in self.temp_tables if _references(statement, t)}
+            if in_prelude:
+                self._setup_prelude[name] = len(self.prelude)
+            elif self._setup_prelude:
+                dependencies.add(list(self._setup_prelude)[-1])
+            if match is None:
+                if last_side_effect is not None:
+                    dependencies.add(last_side_effect)
+                last_side_effect = name
+            else:
+                self.temp_tables.append(name)
+            self.statements[name] = statement
+            self.dependencies[name] = dependencies
+
+    def job_query(self, name: str, table_prefix: str) -> str:
+        """Query of the job running a statement on its own.
+
+        Temporary tables only exist within the script creating them, so they are
+        created as regular tables named `{table_prefix}{name}` instead, and the
+        statements reading them are changed accordingly. The prelude is run again
+        at the start of each job to set the variables used by the statement, or
+        only its statements before the statement for setup statements.
+
+        Args:
+            name (str): Name of the statement.
+            table_prefix (str): Prefix of the full ID of the tables replacing the
+                temporary ones (e.g. `project.dataset._staging_`).
+
+        Returns:
+            str: The query of the job.
+        """
+        statement = self.statements[name]
+        if name in self.temp_tables:
+            match = _temp_table_match(statement)
+            statement = (
+                statement[: match.start()]
+                + f"CREATE OR REPLACE TABLE `{table_prefix}{name}`"
+                + statement[match.end() :]
+            )
+        for table in self.dependencies[name] & set(self.temp_tables):
+            statement = re.sub(
+                TABLE_REFERENCE.format(name=table),
+                rf"\1\2`{table_prefix}{table}`",
+                statement,
+                flags=re.IGNORECASE,
+            )
+        prelude = self.prelude[: self._setup_prelude.get(name, len(self.prelude))]
+        return ";\n\n".join([*prelude, statement]) + ";\n"
+
+    def run(
+        self,
+        client: Any,
+        table_prefix: str,
+        max_workers: int = 4,
+        job_config: Optional[Any] = None,
+        statistics: Optional[JobStatistics] = None,
+    ) -> None:
+        """Run the statements as concurrent query jobs, following the dependencies.
+
+        A statement is submitted as soon as all the statements it depends on have
+        completed, on a pool of `max_workers` threads. The tables replacing the
+        temporary ones are deleted at the end, whether the run succeeded or not.
+
+        Args:
+            client (Any): BigQuery client, or any object with the same `query` and
+                `delete_table` methods.
+            table_prefix (str): Prefix of the full ID of the tables replacing the
+                temporary ones (e.g. `project.dataset._staging_`).
+            max_workers (int): Maximum number of concurrent jobs. Defaults to 4.
+            job_config (Optional[Any]): Configuration of the query jobs. Defaults
+                to None.
+            statistics (Optional[JobStatistics]): If not None, record the
+                statistics of the job of each statement under its name. Defaults
+                to None.
+        """
+
+        def run_job(name: str) -> tuple[Any, float]:
+            start = time.perf_counter()
+            query_job = client.query(
+                self.job_query(name, table_prefix), job_config=job_config
+            )
+            query_job.result()
+            return query_job, time.perf_counter() - start
+
+        pending = dict(self.dependencies)
+        completed = set()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                running = {}
+                while pending or running:
+                    for name in [n for n, d in pending.items() if d <= completed]:
+                        logger.info(f"Submitting statement {name}.")
+                        running[executor.submit(run_job, name)] = name
+                        del pending[name]
+                    if not running:
+                        msg = f"Circular dependencies between {sorted(pending)}."
+                        logger.error(msg)
+                        raise ValueError(msg)
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            query_job, elapsed = future.result()
+                        except Exception as e:
+                            logger.error(f"Statement {name} failed: {e}.")
+                            pending.clear()
+                            raise e
+                        logger.info(f"Statement {name} completed in {elapsed:.1f}s.")
+                        if statistics is not None:
+                            statistics.record(name, query_job)
+                        completed.add(name)
+        finally:
+            for name in self.temp_tables:
+                client.delete_table(f"{table_prefix}{name}", not_found_ok=True)
@@ -0,0 +1,205 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+
+try:
+    from google.cloud import bigquery_storage
+except ImportError:
+    bigquery_storage = None
+
+
+def _cast(batch: pa.RecordBatch, schema: Optional[pa.Schema]) -> pa.Table:
+    table = pa.Table.from_batches([batch])
+    if schema is None:
+        return table
+    return table.select(schema.names).cast(schema)
+
+
+def _check_bigquery_storage() -> None:
+    if bigquery_storage is None:
+        msg = (
+            "The Storage Read API requires google-cloud-bigquery-storage, install "
+            "google-cloud-bigquery with the `bqstorage` extra."
+        )
+        logger.error(msg)
+        raise ImportError(msg)
+
+
+class StorageReader:
+    """Read BigQuery tables over parallel streams of the Storage Read API.
+
+    A read session splits the rows of a table, after the column projection and
+    the row restriction are applied on the server, into streams of Arrow record
+    batches that can be read concurrently. Use `read_table_to_parquet` or
+    `read_table_to_arrow` to read all the streams of a table.
+    """
+
+    def __init__(self, project_id: str, client: Optional[Any] = None) -> None:
+        """Create the reader.
+
+        Args:
+            project_id (str): ID of the project billed for the read sessions.
+            client (Optional[Any]): BigQuery Storage read client. If None, a new
+                `BigQueryReadClient` is created. Defaults to None.
+        """
+        _check_bigquery_storage()
+        self.project_id = project_id
+        self.client = client or bigquery_storage.BigQueryReadClient()
+
+    def create_session(
+        self,
+        table: str,
+        columns: Optional[list[str]] = None,
+        row_restriction: Optional[str] = None,
+        max_streams: int = 4,
+    ) -> tuple[pa.Schema, list]:
+        """Create a read session of a table.
+
+        Args:
+            table (str): Full ID of the table (`project.dataset.table`).
+            columns (Optional[list[str]]): Columns to read. If None, read all the
+                columns. Defaults to None.
+            row_restriction (Optional[str]): SQL filter of the rows to read (e.g.
+                `split = 1`). If None, read all the rows. Defaults to None.
+            max_streams (int): Maximum number of streams, BigQuery can create
+                fewer for small tables. Defaults to 4.
+
+        Returns:
+            tuple[pa.Schema, list]: Schema of the record batches and streams of the
+                session, to be read with `read_stream`.
+        """
+        project, dataset, table_name = table.split(".")
+        types = bigquery_storage.types
+        requested_session = types.ReadSession(
+            table=f"projects/{project}/datasets/{dataset}/tables/{table_name}",
+            data_format=types.DataFormat.ARROW,
+            read_options=types.ReadSession.TableReadOptions(
+                selected_fields=columns or [], row_restriction=row_restriction or ""
+            ),
+        )
+        session = self.client.create_read_session(
+            parent=f"projects/{self.project_id}",
+            read_session=requested_session,
+            max_stream_count=max_streams,
+        )
+        schema = pa.ipc.read_schema(
+            pa.py_buffer(session.arrow_schema.serialized_schema)
+        )
+        return schema, [(session, stream.name) for stream in session.streams]
+
+    def read_stream(self, stream: tuple) -> Iterator[pa.RecordBatch]:
+        """Read the record batches of a stream.
+
+        Args:
+            stream (tuple): Stream returned by `create_session`.
+
+        Yields:
+            pa.RecordBatch: Record batches of the stream.
+        """
+        session, name = stream
+        for page in self.client.read_rows(name).rows(session).pages:
+            yield page.to_arrow()
+
+
+def read_table_to_parquet(
+    reader: Any,
+    table: str,
+    path: Union[str, Path],
+    columns: Optional[list[str]] = None,
+    row_restriction: Optional[str] = None,
+    max_streams: int = 4,
+    schema: Optional[pa.Schema] = None,
+) -> int:
+    """Read a table over parallel streams into a folder of Parquet files.
+
+    Each stream is written to its own file as its record batches arrive, so that
+    the table is never fully loaded in memory.
+
+    Args:
+        reader (Any): `StorageReader`, or any object with the same
+            `create_session` and `read_stream` methods.
+        table (str): Full ID of the table (`project.dataset.table`).
+        path (Union[str, Path]): Output folder.
+        columns (Optional[list[str]]): Columns to read. If None, read all the
+            columns. Defaults to None.
+        row_restriction (Optional[str]): SQL filter of the rows to read. If None,
+            read all the rows. Defaults to None.
+        max_streams (int): Maximum number of streams. Defaults to 4.
+        schema (Optional[pa.Schema]): Schema to cast the record batches to, e.g.
+            with narrower types (see `SchemaRegistry.arrow_schema`). Its columns
+            are selected by name. If None, keep the schema of the session.
+            Defaults to None.
+
+    Returns:
+        int: Number of rows read.
+    """
+    session_schema, streams = reader.create_session(
+        table, columns=columns, row_restriction=row_restriction, max_streams=max_streams
+    )
+    output_schema = schema or session_schema
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    if not streams:
+        # Empty tables have no streams, write an empty file with their schema
+        pq.write_table(output_schema.empty_table(), path / "stream_0000.parquet")
+        return 0
+
+    def write_stream(i: int) -> int:
+        n_rows = 0
+        file_path = path / f"stream_{i:04d}.parquet"
+        with pq.ParquetWriter(file_path, output_schema) as writer:
+            for batch in reader.read_stream(streams[i]):
+                writer.write_table(_cast(batch, schema))
+                n_rows += batch.num_rows
+        return n_rows
+
+    with ThreadPoolExecutor(max_workers=len(streams)) as executor:
+        n_rows = sum(executor.map(write_stream, range(len(streams))))
+    logger.info(f"Read {n_rows} rows of {table} over {len(streams)} streams.")
+    return n_rows
+
+
+def read_table_to_arrow(
+    reader: Any,
+    table: str,
+    columns: Optional[list[str]] = None,
+    row_restriction: Optional[str] = None,
+    max_streams: int = 4,
+    schema: Optional[pa.Schema] = None,
+) -> pa.Table:
+    """Read a table over parallel streams into memory.
+
+    Args:
+        reader (Any): `StorageReader`, or any object with the same
+            `create_session` and `read_stream` methods.
+        table (str): Full ID of the table (`project.dataset.table`).
+        columns (Optional[list[str]]): Columns to read. If None, read all the
+            columns. Defaults to None.
+        row_restriction (Optional[str]): SQL filter of the rows to read. If None,
+            read all the rows. Defaults to None.
+        max_streams (int): Maximum number of streams. Defaults to 4.
+        schema (Optional[pa.Schema]): Schema to cast the record batches to, e.g.
+            with narrower types (see `SchemaRegistry.arrow_schema`). Its columns
+            are selected by name. If None, keep the schema of the session.
+            Defaults to None.
+
+    Returns:
+        pa.Table: The rows of the table, in the order of the streams.
+    """
+    session_schema, streams = reader.create_session(
+        table, columns=columns, row_restriction=row_restriction, max_streams=max_streams
+    )
+
+    def read_stream(stream: Any) -> list[pa.Table]:
+        return [_cast(batch, schema) for batch in reader.read_stream(stream)]
+
+    with ThreadPoolExecutor(max_workers=max(len(streams), 1)) as executor:
+        tables = [t for ts in executor.map(read_stream, streams) for t in ts]
+    output_schema = schema or session_schema
+    data = pa.concat_tables([output_schema.empty_table(), *tables])
+    logger.info(f"Read {data.num_rows} rows of {table} over {len(streams)} streams.")
+    return data
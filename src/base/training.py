@@ -0,0 +1,180 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+import joblib
+from loguru import logger
+from sklearn.pipeline import Pipeline
+
+from src.base.artifacts import save_model_artifact
+from src.base.data import TabularData
+from src.base.model import (
+    MULTITHREADED_MODELS,
+    build_classifier,
+    build_scaler,
+    evaluate_model,
+    train_model,
+)
+from src.base.visualisation import plot_precision_recall_curve
+
+
+def _train_candidate(
+    data_dir: str,
+    output_dir: str,
+    model_name: str,
+    model_params: dict,
+    fit_args: dict,
+    data_processing_args: dict,
+    scaler,
+    n_threads: int,
+) -> dict:
+    # The data is already scaled and memory-mapped, so all the candidates share
+    # the same physical copy
+    train = TabularData.load_npy(Path(data_dir) / "train")
+    valid = TabularData.load_npy(Path(data_dir) / "valid")
+    test = TabularData.load_npy(Path(data_dir) / "test")
+
+    model_params = dict(model_params)
+    if model_name in MULTITHREADED_MODELS:
+        model_params["n_jobs"] = n_threads
+    classifier, use_eval_set = build_classifier(model_name, model_params)
+
+    # Fit on DataFrames as in `train_evaluate_model`, so that the exported model
+    # keeps the feature names used to select the columns at serving time
+    logger.info(f"Training model {model_name}.")
+    classifier, training_metrics = train_model(
+        classifier,
+        X_train=train.frame,
+        y_train=train.y,
+        X_valid=valid.frame,
+        y_valid=valid.y,
+        data_standardization="none",
+        use_eval_set=use_eval_set,
+        fit_args=fit_args,
+        **data_processing_args,
+    )
+    validation_metrics, _, _ = evaluate_model(classifier, valid.frame, valid.y)
+    testing_metrics, _, _ = evaluate_model(classifier, test.frame, test.y)
+    logger.info(f"Training and evaluation of model {model_name} completed.")
+
+    model_dir = Path(output_dir) / model_name
+    model_dir.mkdir(parents=True, exist_ok=True)
+    for split, split_metrics in (
+        ("validation", validation_metrics),
+        ("test", testing_metrics),
+    ):
+        _ = plot_precision_recall_curve(
+            model_name=model_name,
+            curve=split_metrics["precision_recall_curve"],
+            save_path=model_dir / f"precision_recall_curve_{split}_{model_name}.png",
+        )
+
+    if scaler is not None:
+        classifier = Pipeline(steps=[("scaler", scaler), ("classifier", classifier)])
+    joblib.dump(classifier, model_dir / "model.joblib")
+    try:
+        save_model_artifact(classifier, model_dir, train.feature_names)
+    except ValueError:
+        logger.warning(f"Model artifact of {model_name} not saved, using joblib only.")
+
+    metrics = {
+        split: {k: v for k, v in m.items() if k != "precision_recall_curve"}
+        for split, m in (
+            ("train", training_metrics),
+            ("valid", validation_metrics),
+            ("test", testing_metrics),
+        )
+    }
+    with open(model_dir / "metrics.json", "w") as f:
+        json.dump(metrics, f, indent=2)
+    logger.info(f"Saved model {model_name} to {model_dir}.")
+
+    return metrics
+
+
+def train_candidates(
+    train: TabularData,
+    valid: TabularData,
+    test: TabularData,
+    model_names: list[str],
+    output_dir: Union[str, Path],
+    models_params: Optional[dict] = None,
+    fit_args: Optional[dict] = None,
+    data_processing_args: Optional[dict] = None,
+    n_jobs: int = -1,
+) -> dict[str, dict]:
+    """Train and evaluate several candidate models on the same data.
+
+    The scaler is fit once on the training data, and the scaled training,
+    validation and test data are memory-mapped and shared by a pool of processes,
+    one for each candidate. Each candidate is saved in `<output_dir>/<model_name>`
+    together with its metrics and precision-recall curves, with the same layout
+    used by the `train_evaluate_model` component.
+
+    Args:
+        train (TabularData): Training data.
+        valid (TabularData): Validation data.
+        test (TabularData): Test data.
+        model_names (list[str]): Names of the candidate models, see
+            `build_classifier`.
+        output_dir (Union[str, Path]): Folder where the models are saved.
+        models_params (Optional[dict]): Optional, default None. Hyperparameters of
+            each model, in the same format as `models_params` in `params.yaml`.
+        fit_args (Optional[dict]): Optional, default None. Arguments used when
+            fitting each model, in the same format as `fit_args` in `params.yaml`.
+        data_processing_args (Optional[dict]): Optional, default None. Arguments
+            used when running extra processing on the data, see `train_model`.
+        n_jobs (int): Optional, default -1. Number of models trained in parallel.
+            If -1, train all the models in parallel.
+
+    Returns:
+        dict[str, dict]: Training, validation and test metrics of each model.
+    """
+    models_params = models_params or {}
+    fit_args = fit_args or {}
+    data_processing_args = dict(data_processing_args or {})
+    n_jobs = len(model_names) if n_jobs == -1 else max(1, min(n_jobs, len(model_names)))
+    n_threads = max(1, (os.cpu_count() or 1) // n_jobs)
+
+    scaler = build_scaler(data_processing_args.pop("data_standardization", "standard"))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name, data in (("train", train), ("valid", valid), ("test", test)):
+            X = data.X
+            if scaler is not None:
+                if name == "train":
+                    scaler.fit(train.frame)
+                X = scaler.transform(data.frame)
+            TabularData(X, data.y, data.ids, data.feature_names).save_npy(
+                Path(data_dir) / name
+            )
+            logger.debug(f"Saved shared {name} data, shape {data.shape}.")
+
+        logger.info(
+            f"Training {len(model_names)} models on {n_jobs} processes "
+            f"with {n_threads} threads each."
+        )
+        worker_args = [
+            (
+                data_dir,
+                str(output_dir),
+                model_name,
+                models_params.get(model_name, {}),
+                fit_args.get(model_name, {}),
+                data_processing_args,
+                scaler,
+                n_threads,
+            )
+            for model_name in model_names
+        ]
+        if n_jobs == 1:
+            results = [_train_candidate(*a) for a in worker_args]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [executor.submit(_train_candidate, *a) for a in worker_args]
+                results = [future.result() for future in futures]
+
+    return dict(zip(model_names, results))
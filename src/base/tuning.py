@@ -0,0 +1,262 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+import optuna
+from loguru import logger
+from optuna.integration import LightGBMPruningCallback, XGBoostPruningCallback
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+
+from src.base.data import TabularData
+from src.base.model import (
+    MULTITHREADED_MODELS,
+    build_classifier,
+    build_scaler,
+    evaluate_model,
+    train_model,
+)
+
+# States of the trials counted towards the total number of trials of a study
+FINISHED_STATES = (TrialState.COMPLETE, TrialState.PRUNED, TrialState.FAIL)
+
+
+def suggest_params(trial: optuna.Trial, search_space: dict) -> dict:
+    """Sample the hyperparameters of a trial from the search space.
+
+    Args:
+        trial (optuna.Trial): Current trial.
+        search_space (dict): Search space of each hyperparameter, e.g.
+            `{"num_leaves": {"type": "int", "low": 15, "high": 255}}`. Supported
+            types are "float", "int" (both accepting `low`, `high`, `step` and
+            `log`) and "categorical" (accepting `choices`).
+
+    Returns:
+        dict: Sampled hyperparameters.
+    """
+    params = {}
+    for name, spec in search_space.items():
+        spec = dict(spec)
+        kind = spec.pop("type")
+        if kind == "float":
+            params[name] = trial.suggest_float(name, **spec)
+        elif kind == "int":
+            params[name] = trial.suggest_int(name, **spec)
+        elif kind == "categorical":
+            params[name] = trial.suggest_categorical(name, spec["choices"])
+        else:
+            msg = (
+                f"Type of hyperparameter `{name}` must be one of 'float', 'int', "
+                "'categorical'."
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+    return params
+
+
+def _objective(
+    trial: optuna.Trial,
+    train: TabularData,
+    valid: TabularData,
+    model_name: str,
+    search_space: dict,
+    model_params: dict,
+    data_processing_args: dict,
+    n_threads: int,
+) -> float:
+    params = {**model_params, **suggest_params(trial, search_space)}
+    if model_name in MULTITHREADED_MODELS:
+        params["n_jobs"] = n_threads
+
+    # Report the validation AP at each boosting round, so that weak trials are
+    # stopped early by the pruner
+    fit_args = {}
+    if model_name == "lightgbm":
+        fit_args = dict(
+            eval_metric="average_precision",
+            callbacks=[LightGBMPruningCallback(trial, "average_precision")],
+        )
+    elif model_name == "xgboost":
+        params["eval_metric"] = "aucpr"
+        params["callbacks"] = [XGBoostPruningCallback(trial, "validation_0-aucpr")]
+
+    classifier, use_eval_set = build_classifier(model_name, params)
+    classifier, _ = train_model(
+        classifier,
+        X_train=train.frame,
+        y_train=train.y,
+        X_valid=valid.frame,
+        y_valid=valid.y,
+        data_standardization="none",
+        use_eval_set=use_eval_set,
+        fit_args=fit_args,
+        **data_processing_args,
+    )
+    metrics, _, _ = evaluate_model(classifier, valid.frame, valid.y)
+    return metrics["average_precision"]
+
+
+def _optimize_worker(
+    storage_url: str,
+    study_name: str,
+    data_dir: str,
+    model_name: str,
+    search_space: dict,
+    model_params: dict,
+    data_processing_args: dict,
+    n_trials: int,
+    n_threads: int,
+    timeout: Optional[float],
+    seed: int,
+) -> None:
+    # Memory-map the data scaled and saved by the parent process, so that all the
+    # workers share the same physical copy
+    train = TabularData.load_npy(Path(data_dir) / "train")
+    valid = TabularData.load_npy(Path(data_dir) / "valid")
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=storage_url,
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=10),
+    )
+    study.optimize(
+        lambda trial: _objective(
+            trial,
+            train,
+            valid,
+            model_name,
+            search_space,
+            model_params,
+            data_processing_args,
+            n_threads,
+        ),
+        timeout=timeout,
+        # Count the failed trials too, otherwise a search space where every trial
+        # fails would never reach the maximum number of trials
+        callbacks=[MaxTrialsCallback(n_trials, states=FINISHED_STATES)],
+        catch=(ValueError,),
+    )
+
+
+def tune_hyperparameters(
+    train: TabularData,
+    valid: TabularData,
+    model_name: str,
+    search_space: dict,
+    storage_path: Union[str, Path],
+    model_params: Optional[dict] = None,
+    data_processing_args: Optional[dict] = None,
+    n_trials: int = 50,
+    n_jobs: int = -1,
+    timeout: Optional[float] = None,
+    random_state: int = 42,
+) -> tuple[dict, optuna.Study]:
+    """Tune the hyperparameters of a model, maximising the validation average precision.
+
+    The trials are run in a pool of processes sharing the same Optuna study, stored
+    in a SQLite file. The scaler is fit once on the training data, and the scaled
+    training and validation data are memory-mapped, so each process does not hold
+    its own copy of the data and the trials do not scale it again. For LightGBM
+    and XGBoost, the validation average precision is reported at each boosting
+    round and trials that are worse than the median of the previous ones are
+    pruned.
+
+    Args:
+        train (TabularData): Training data.
+        valid (TabularData): Validation data.
+        model_name (str): Name of the classifier, see `build_classifier`.
+        search_space (dict): Search space of the hyperparameters, see
+            `suggest_params`.
+        storage_path (Union[str, Path]): Local SQLite file where the study is
+            stored. If the file already contains a study for the model, the study
+            is resumed.
+        model_params (Optional[dict]): Optional, default None. Fixed hyperparameters
+            of the model, overridden by the tuned ones.
+        data_processing_args (Optional[dict]): Optional, default None. Arguments
+            used when running extra processing on the data, see `train_model`.
+        n_trials (int): Optional, default 50. Total number of trials.
+        n_jobs (int): Optional, default -1. Number of parallel processes, at most
+            `n_trials`. If -1, use all the available cores.
+        timeout (Optional[float]): Optional, default None. Stop each process after
+            this number of seconds.
+        random_state (int): Optional, default 42. Seed of the samplers.
+
+    Returns:
+        dict: Best hyperparameters, in the same shape as `models_params`.
+        optuna.Study: The completed study.
+
+    Raises:
+        ValueError: If no trial completed, e.g. because all of them failed.
+    """
+    model_params = model_params or {}
+    data_processing_args = dict(data_processing_args or {})
+    n_cpus = os.cpu_count() or 1
+    n_jobs = max(1, min(n_cpus if n_jobs == -1 else n_jobs, n_trials))
+    n_threads = max(1, n_cpus // n_jobs)
+
+    storage_url = f"sqlite:///{Path(storage_path).absolute()}"
+    study_name = f"{model_name}_tuning"
+    optuna.create_study(
+        study_name=study_name,
+        storage=storage_url,
+        direction="maximize",
+        load_if_exists=True,
+    )
+    logger.info(
+        f"Tuning {model_name} with {n_trials} trials on {n_jobs} processes "
+        f"with {n_threads} threads each."
+    )
+
+    scaler = build_scaler(data_processing_args.pop("data_standardization", "standard"))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for name, data in (("train", train), ("valid", valid)):
+            X = data.X
+            if scaler is not None:
+                if name == "train":
+                    scaler.fit(train.frame)
+                X = scaler.transform(data.frame)
+            TabularData(X, data.y, data.ids, data.feature_names).save_npy(
+                Path(data_dir) / name
+            )
+        worker_args = [
+            (
+                storage_url,
+                study_name,
+                data_dir,
+                model_name,
+                search_space,
+                model_params,
+                data_processing_args,
+                n_trials,
+                n_threads,
+                timeout,
+                random_state + i,
+            )
+            for i in range(n_jobs)
+        ]
+        if n_jobs == 1:
+            _optimize_worker(*worker_args[0])
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [executor.submit(_optimize_worker, *a) for a in worker_args]
+                for future in futures:
+                    future.result()
+
+    study = optuna.load_study(study_name=study_name, storage=storage_url)
+    if not study.get_trials(states=(TrialState.COMPLETE,)):
+        msg = (
+            f"No trial of {model_name} completed, check the search space and the "
+            "logs of the failed trials."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+    logger.info(
+        f"Best trial {study.best_trial.number} with validation average precision "
+        f"{study.best_value:.4f}."
+    )
+    return {model_name: {**model_params, **study.best_params}}, study
@@ -1,41 +1,115 @@
-from typing import Optional
+from pathlib import Path
+from typing import Optional, Union
 
 import matplotlib.pyplot as plt
 import numpy as np
-from sklearn.base import ClassifierMixin
-from sklearn.metrics import PrecisionRecallDisplay
+from loguru import logger
+from sklearn.metrics import precision_recall_curve
+
+
+def decimate_curve(x: np.ndarray, y: np.ndarray, n_points: int = 200) -> np.ndarray:
+    """Select points of a curve evenly spaced along its length.
+
+    Selecting the points by arc length, instead of by index or threshold, keeps
+    the shape of the curve where it changes quickly and drops the points where it
+    is flat.
+
+    Args:
+        x (np.ndarray): x coordinates of the points of the curve, in order.
+        y (np.ndarray): y coordinates of the points of the curve, in order.
+        n_points (int, optional): Maximum number of points to keep, at least 2.
+            Defaults to 200.
+
+    Returns:
+        np.ndarray: Sorted indices of the selected points, always including the
+            first and the last point.
+
+    Raises:
+        ValueError: If `n_points` is lower than 2.
+    """
+    if n_points < 2:
+        msg = "`n_points` must be at least 2, to keep the ends of the curve."
+        logger.error(msg)
+        raise ValueError(msg)
+    if len(x) <= n_points:
+        return np.arange(len(x))
+    arc_length = np.concatenate([[0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))])
+    # The first target is the first point, the last point is added after them
+    targets = np.linspace(0, arc_length[-1], n_points)[:-1]
+    indices = np.searchsorted(arc_length, targets).clip(0, len(x) - 1)
+    return np.unique(np.concatenate([indices, [len(x) - 1]]))
 
 
 def plot_precision_recall_curve(
-    model: ClassifierMixin,
     model_name: str,
-    X: np.ndarray,
-    y: np.ndarray,
-    save_path: Optional[str] = None,
+    y: Optional[np.ndarray] = None,
+    y_score: Optional[np.ndarray] = None,
+    curve: Optional[tuple] = None,
+    save_path: Optional[Union[str, Path]] = None,
+    n_points: int = 200,
+    figsize: tuple = (8, 6),
 ) -> plt.Figure:
-    """Plot and export the Precision Recall curve for an estimator.
+    """Plot and export the Precision Recall curve of a model.
+
+    The curve is computed from the ground truth and the predicted probabilities,
+    or taken as is if already computed (e.g. by `evaluate_model`), so the model
+    does not need to score the data again. It is then decimated to at most
+    `n_points` points. If `save_path` is provided, the decimated precision, recall
+    and thresholds are also saved next to the image as a .npz file.
 
     Args:
-        model (ClassifierMixin): Model used to generate the plot
-        model_name (str): Name of the model, used to name the output file
-        X (np.ndarray): Model inputs
-        y (np.ndarray): Ground-truth values for the target variable
-        save_path ():
+        model_name (str): Name of the model, used in the title and the legend
+        y (Optional[np.ndarray]): Ground-truth values for the target variable
+        y_score (Optional[np.ndarray]): Predicted probability of class 1
+        curve (Optional[tuple]): Precision, recall and thresholds, as returned by
+            `sklearn.metrics.precision_recall_curve`. If provided, `y` and
+            `y_score` are ignored
+        save_path (Optional[Union[str, Path]]): Path of the output image
+        n_points (int): Maximum number of points of the plotted curve
+        figsize (tuple): Size of the figure in inches
 
     Returns:
         Figure: the PRC plot
     """
-    fig, ax = plt.subplots(1, 1, figsize=(20, 20))
-
-    _ = PrecisionRecallDisplay.from_estimator(
-        model,
-        X=X,
-        y=y,
-        ax=ax,
-        name=model_name,
+    if curve is None:
+        if y is None or y_score is None:
+            msg = "Either `curve` or both `y` and `y_score` must be provided."
+            logger.error(msg)
+            raise ValueError(msg)
+        curve = precision_recall_curve(y, y_score)
+    precisions, recalls, thresholds = (np.asarray(a) for a in curve)
+    # The last point (recall 0, precision 1) has no threshold
+    thresholds = np.append(thresholds, np.nan)
+    average_precision = -np.sum(np.diff(recalls) * precisions[:-1])
+
+    indices = decimate_curve(recalls, precisions, n_points)
+    precisions, recalls, thresholds = (
+        precisions[indices],
+        recalls[indices],
+        thresholds[indices],
+    )
+
+    fig, ax = plt.subplots(1, 1, figsize=figsize)
+    ax.plot(
+        recalls,
+        precisions,
+        drawstyle="steps-post",
+        label=f"{model_name} (AP = {average_precision:0.2f})",
     )
+    ax.set_xlabel("Recall")
+    ax.set_ylabel("Precision")
+    ax.set_xlim(-0.01, 1.01)
+    ax.set_ylim(-0.01, 1.01)
+    ax.legend(loc="lower left")
     ax.set_title(f"Precision-Recall Curve - Model {model_name}.")
     if save_path is not None:
-        plt.savefig(save_path)
+        fig.savefig(save_path)
+        np.savez_compressed(
+            Path(save_path).with_suffix(".npz"),
+            precision=precisions.astype(np.float32),
+            recall=recalls.astype(np.float32),
+            thresholds=thresholds.astype(np.float32),
+            average_precision=average_precision,
+        )
     plt.close(fig)
     return fig
@@ -1,4 +1,6 @@
 from src.components.bigquery.dataset_to_table import dataset_to_bq_table
 from src.components.bigquery.execute_query import execute_query
+from src.components.bigquery.execute_query_graph import execute_query_graph
 from src.components.bigquery.query_to_table import bq_query_to_table
+from src.components.bigquery.stream_to_dataset import bq_stream_to_dataset
 from src.components.bigquery.table_to_dataset import bq_table_to_dataset
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from kfp.dsl import Artifact, Input, component
 
 from src.components.dependencies import PIPELINE_IMAGE_NAME
@@ -12,6 +14,7 @@ def dataset_to_bq_table(
     dataset: Input[Artifact],
     dataset_location: str = "europe-west2",
     dataset_format: str = "csv",
+    schema_table: Optional[str] = None,
 ) -> None:
     """Load datasets in JSONL / CSV / Parquet format from GCS to BQ.
 
@@ -26,10 +29,14 @@ def dataset_to_bq_table(
             the dataset. Defaults to "europe-west2".
         dataset_format (str, optional): Format of the dataset, must be one of
             `csv`, `parquet`, `jsonl`. Defaults to "csv".
+        schema_table (Optional[str], optional): Name of the table of the schema
+            registry (e.g. `transactions`) whose explicit schema is used by the
+            load. If None, the schema is autodetected. Defaults to None.
     """
     from google.cloud import bigquery
     from loguru import logger
 
+    from src.base.schemas import SchemaRegistry
     from src.utils.logging import setup_logger
 
     setup_logger()
@@ -40,22 +47,29 @@ def dataset_to_bq_table(
     logger.info(f"Loading data from GCS location: {dataset.uri}.")
     logger.info(f"Destination table in BQ: {table_id}.")
 
+    if schema_table is None:
+        schema_args = dict(autodetect=True)
+    else:
+        schema = SchemaRegistry.from_params().bigquery_schema(schema_table)
+        schema_args = dict(autodetect=False, schema=schema)
+        logger.info(f"Using the schema of table {schema_table}: {schema}.")
+
     if dataset_format == "csv":
         job_config = bigquery.LoadJobConfig(
-            autodetect=True,
+            **schema_args,
             write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
             source_format=bigquery.SourceFormat.CSV,
             skip_leading_rows=1,
         )
     elif dataset_format == "parquet":
         job_config = bigquery.LoadJobConfig(
-            autodetect=True,
+            **schema_args,
             write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
             source_format=bigquery.SourceFormat.PARQUET,
         )
     elif dataset_format == "jsonl":
         job_config = bigquery.LoadJobConfig(
-            autodetect=True,
+            **schema_args,
             write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
             source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
         )
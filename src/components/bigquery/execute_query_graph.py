@@ -0,0 +1,106 @@
+from typing import Optional
+
+from kfp.dsl import Artifact, Metrics, Output, component
+
+from src.components.dependencies import PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME)
+def execute_query_graph(
+    query: str,
+    bq_client_project_id: str,
+    staging_dataset: str,
+    job_statistics: Output[Artifact],
+    job_metrics: Output[Metrics],
+    dataset_location: str = "europe-west2",
+    query_job_config: str = "{}",
+    max_workers: int = 4,
+    dry_run: bool = False,
+    max_bytes_processed: Optional[int] = None,
+) -> None:
+    """Run a BQ script as concurrent query jobs, one per statement.
+
+    The script is split into a dependency graph of statements, and each statement
+    is submitted as soon as the ones creating the temporary tables it reads have
+    completed. The temporary tables are created as staging tables in
+    `staging_dataset` instead, and deleted at the end.
+
+    Args:
+        query (str): SQL script to execute.
+        bq_client_project_id (str): Project ID that will be used by the BQ client.
+        staging_dataset (str): Full ID of the BQ dataset (`project.dataset`)
+            where the staging tables are created.
+        job_statistics (Output[Artifact]): Output JSON file with the statistics of
+            the job of each statement, this parameter will be passed automatically
+            by the orchestrator.
+        job_metrics (Output[Metrics]): Output bytes processed and billed, slot
+            milliseconds, cache hit and elapsed time of the job of each statement,
+            this parameter will be passed automatically by the orchestrator.
+        dataset_location (str): BQ dataset location.
+        query_job_config (str): JSON-serialised dict containing optional
+            parameters required by the bq query operation. No need to specify
+            destination param. Defaults to "{}". See available parameters here:
+            https://googleapis.dev/python/bigquery/latest/generated/google.cloud.bigquery.job.QueryJobConfig.html
+        max_workers (int): Maximum number of concurrent query jobs. Defaults to 4.
+        dry_run (bool): Whether to dry-run the whole script first, to estimate the
+            bytes it will process. Defaults to False.
+        max_bytes_processed (Optional[int]): If not None, fail before running the
+            script if the dry run estimates that it will process more bytes.
+            Defaults to None.
+
+    Raises:
+        GoogleCloudError: If an error is raised by the operation.
+        ValueError: If the script would process more than `max_bytes_processed`
+            bytes.
+    """
+    import json
+    import uuid
+
+    from google.cloud import bigquery
+    from google.cloud.exceptions import GoogleCloudError
+    from loguru import logger
+
+    from src.base.sql import StatementGraph
+    from src.utils.job_statistics import JobStatistics
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    query_job_config = json.loads(query_job_config)
+    job_config = bigquery.QueryJobConfig(**query_job_config)
+
+    bq_client = bigquery.client.Client(
+        project=bq_client_project_id, location=dataset_location
+    )
+    statistics = JobStatistics()
+    if dry_run is True or max_bytes_processed is not None:
+        dry_run_config = bigquery.QueryJobConfig(
+            **{**query_job_config, "dry_run": True, "use_query_cache": False}
+        )
+        statistics.dry_run(
+            "script", bq_client, query, dry_run_config, max_bytes_processed
+        )
+
+    graph = StatementGraph(query)
+    logger.info(
+        f"Split the script into {len(graph.statements)} statements, "
+        f"{len(graph.temp_tables)} of which create temporary tables."
+    )
+
+    # Unique prefix, so that concurrent runs do not share staging tables
+    table_prefix = f"{staging_dataset}._staging_{uuid.uuid4().hex[:8]}_"
+    try:
+        graph.run(
+            bq_client,
+            table_prefix,
+            max_workers=max_workers,
+            job_config=job_config,
+            statistics=statistics,
+        )
+        logger.info("BQ script executed.")
+    except GoogleCloudError as e:
+        logger.error(e)
+        raise e
+
+    statistics.log_metrics(job_metrics)
+    statistics.to_json(job_statistics.path)
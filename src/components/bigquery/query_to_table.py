@@ -1,4 +1,6 @@
-from kfp.dsl import component
+from typing import Optional
+
+from kfp.dsl import Artifact, Metrics, Output, component
 
 from src.components.dependencies import PIPELINE_IMAGE_NAME
 
@@ -10,8 +12,12 @@ def bq_query_to_table(
     destination_project_id: str,
     dataset_id: str,
     table_id: str,
+    job_statistics: Output[Artifact],
+    job_metrics: Output[Metrics],
     dataset_location: str = "europe-west2",
     query_job_config: dict = {},
+    dry_run: bool = False,
+    max_bytes_processed: Optional[int] = None,
 ) -> None:
     """Run query and create a new BQ table.
 
@@ -22,20 +28,34 @@ def bq_query_to_table(
         dataset_id (str): Dataset ID where BQ table will be created.
         table_id (str): Table name (without project ID and dataset ID) that
             will be created.
+        job_statistics (Output[Artifact]): Output JSON file with the statistics of
+            the job, this parameter will be passed automatically by the
+            orchestrator.
+        job_metrics (Output[Metrics]): Output bytes processed and billed, slot
+            milliseconds, cache hit and elapsed time of the job, this parameter
+            will be passed automatically by the orchestrator.
         dataset_location (str): BQ dataset location.
         query_job_config (dict): Dict containing optional parameters required
             by the bq query operation. No need to specify destination param.
             Defaults to {}.
             See available parameters here
             https://googleapis.dev/python/bigquery/latest/generated/google.cloud.bigquery.job.QueryJobConfig.html
+        dry_run (bool): Whether to dry-run the query first, to estimate the bytes
+            it will process. Defaults to False.
+        max_bytes_processed (Optional[int]): If not None, fail before running the
+            query if the dry run estimates that it will process more bytes.
+            Defaults to None.
 
     Raises:
         GoogleCloudError: If an error is raised by the operation.
+        ValueError: If the query would process more than `max_bytes_processed`
+            bytes.
     """
     from google.cloud import bigquery
     from google.cloud.exceptions import GoogleCloudError
     from loguru import logger
 
+    from src.utils.job_statistics import JobStatistics
     from src.utils.logging import setup_logger
 
     setup_logger()
@@ -49,6 +69,14 @@ def bq_query_to_table(
     bq_client = bigquery.client.Client(
         project=bq_client_project_id, location=dataset_location
     )
+    statistics = JobStatistics()
+    if dry_run is True or max_bytes_processed is not None:
+        dry_run_config = bigquery.QueryJobConfig(
+            **{**query_job_config, "dry_run": True, "use_query_cache": False}
+        )
+        statistics.dry_run(
+            "query", bq_client, query, dry_run_config, max_bytes_processed
+        )
     query_job = bq_client.query(query, job_config=job_config)
 
     try:
@@ -59,3 +87,7 @@ def bq_query_to_table(
         logger.error(query_job.error_result)
         logger.error(query_job.errors)
         raise e
+
+    statistics.record("query", query_job)
+    statistics.log_metrics(job_metrics)
+    statistics.to_json(job_statistics.path)
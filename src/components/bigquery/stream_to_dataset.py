@@ -0,0 +1,86 @@
+from typing import NamedTuple, Optional
+
+from kfp.dsl import Dataset, Output, component
+
+from src.components.dependencies import PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME)
+def bq_stream_to_dataset(
+    bq_client_project_id: str,
+    source_project_id: str,
+    dataset_id: str,
+    table_name: str,
+    dataset: Output[Dataset],
+    destination_gcs_uri: Optional[str] = None,
+    columns: Optional[list] = None,
+    row_restriction: Optional[str] = None,
+    max_streams: int = 4,
+    schema_table: Optional[str] = None,
+    skip_if_exists: bool = True,
+) -> NamedTuple("Outputs", [("dataset_gcs_prefix", str), ("dataset_gcs_uri", list)]):
+    """Read a BQ table into Parquet files with the BQ Storage Read API.
+
+    Unlike `bq_table_to_dataset`, no extract job is run: the rows are read over
+    parallel streams of Arrow record batches, and each stream is written to its
+    own Parquet file in the output dataset.
+
+    Args:
+        bq_client_project_id (str): Project ID billed for the read session.
+        source_project_id (str): Project id from where BQ table will be read.
+        dataset_id (str): Dataset ID from where the BQ table will be read.
+        table_name (str): Table name (without project ID and dataset ID) from
+            where the BQ table will be read.
+        dataset (Output[Dataset]): Output dataset artifact generated by the operation,
+            this parameter will be passed automatically by the orchestrator.
+        destination_gcs_uri (Optional[str], optional): GCS URI to use for
+            saving the files. Defaults to None.
+        columns (Optional[list], optional): Columns to read. If None, read all
+            the columns. Defaults to None.
+        row_restriction (Optional[str], optional): SQL filter of the rows to read
+            (e.g. `split = 1`). If None, read all the rows. Defaults to None.
+        max_streams (int): Maximum number of parallel streams. Defaults to 4.
+        schema_table (Optional[str], optional): Name of the table of the schema
+            registry (e.g. `split`) whose compact types are used in the output
+            files. If None, keep the BQ types. Defaults to None.
+        skip_if_exists (bool): If True, skip reading the table if the output
+            resource already exists.
+
+    Returns:
+        NamedTuple (str, list): Output dataset directory and its GCS uri
+    """
+    from pathlib import Path
+
+    from loguru import logger
+
+    from src.base.schemas import SchemaRegistry
+    from src.base.storage_read import StorageReader, read_table_to_parquet
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    # Set uri of output dataset if destination_gcs_uri is provided
+    if destination_gcs_uri:
+        dataset.uri = destination_gcs_uri
+
+    logger.info(f"Checking if destination exists: {dataset.path}.")
+    if Path(dataset.path).exists() and skip_if_exists:
+        logger.warning("Destination already exists, skipping table read.")
+        return
+
+    full_table_id = f"{source_project_id}.{dataset_id}.{table_name}"
+    schema = None
+    if schema_table is not None:
+        schema = SchemaRegistry.from_params().arrow_schema(schema_table, columns)
+    logger.info(f"Read table {full_table_id} to {dataset.uri}.")
+    read_table_to_parquet(
+        StorageReader(bq_client_project_id),
+        full_table_id,
+        dataset.path,
+        columns=columns,
+        row_restriction=row_restriction,
+        max_streams=max_streams,
+        schema=schema,
+    )
+
+    return (dataset.uri, [f"{dataset.uri}/stream_*.parquet"])
@@ -1,6 +1,6 @@
 from typing import NamedTuple, Optional
 
-from kfp.dsl import Dataset, Output, component
+from kfp.dsl import Artifact, Dataset, Metrics, Output, component
 
 from src.components.dependencies import PIPELINE_IMAGE_NAME
 
@@ -12,11 +12,14 @@ def bq_table_to_dataset(
     dataset_id: str,
     table_name: str,
     dataset: Output[Dataset],
+    job_statistics: Output[Artifact],
+    job_metrics: Output[Metrics],
     destination_gcs_uri: Optional[str] = None,
     dataset_location: str = "europe-west2",
     extract_job_config: Optional[dict] = None,
     skip_if_exists: bool = True,
     file_pattern: Optional[str] = None,
+    partition: Optional[str] = None,
 ) -> NamedTuple("Outputs", [("dataset_gcs_prefix", str), ("dataset_gcs_uri", list)]):
     """Extract BQ table in GCS.
 
@@ -28,6 +31,11 @@ def bq_table_to_dataset(
             where the BQ table will be extracted.
         dataset (Output[Dataset]): Output dataset artifact generated by the operation,
             this parameter will be passed automatically by the orchestrator.
+        job_statistics (Output[Artifact]): Output JSON file with the statistics of
+            the extract job, this parameter will be passed automatically by the
+            orchestrator.
+        job_metrics (Output[Metrics]): Output elapsed time of the extract job, this
+            parameter will be passed automatically by the orchestrator.
         dataset_location (str): BQ dataset location. Defaults to "europe-west2".
         extract_job_config (Optional[dict], optional): Dict containing optional
             parameters required by the bq extract operation. Defaults to None.
@@ -39,6 +47,9 @@ def bq_table_to_dataset(
             output files (e.g. `.csv`). Defaults to None.
         destination_gcs_uri (Optional[str], optional): GCS URI to use for
             saving query results. Defaults to None.
+        partition (Optional[str], optional): ID of the partition to extract
+            (e.g. `1` for the integer range partition starting at 1). If None,
+            extract the whole table. Defaults to None.
 
     Returns:
         NamedTuple (str, list): Output dataset directory and its GCS uri
@@ -53,6 +64,7 @@ def bq_table_to_dataset(
     from google.cloud.exceptions import GoogleCloudError
     from loguru import logger
 
+    from src.utils.job_statistics import JobStatistics
     from src.utils.logging import setup_logger
 
     setup_logger()
@@ -67,6 +79,8 @@ def bq_table_to_dataset(
         return
 
     full_table_id = f"{source_project_id}.{dataset_id}.{table_name}"
+    if partition is not None:
+        full_table_id = f"{full_table_id}${partition}"
     table = bigquery.table.Table(table_ref=full_table_id)
 
     if extract_job_config is None:
@@ -98,4 +112,9 @@ def bq_table_to_dataset(
         logger.error(extract_job.errors)
         raise e
 
+    statistics = JobStatistics()
+    statistics.record("extract", extract_job)
+    statistics.log_metrics(job_metrics)
+    statistics.to_json(job_statistics.path)
+
     return (dataset_directory, [dataset_uri])
@@ -1,4 +1,9 @@
 from src.components.model.compare import compare_models
 from src.components.model.compare_champion_challenger import compare_champion_challenger
+from src.components.model.continue_training import continue_training_model
 from src.components.model.evaluate import evaluate_model
+from src.components.model.select_candidate import select_candidate_model
+from src.components.model.select_features import select_features
 from src.components.model.train_evaluate import train_evaluate_model
+from src.components.model.train_evaluate_models import train_evaluate_models
+from src.components.model.tune import tune_model
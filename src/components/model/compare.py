@@ -1,6 +1,6 @@
 from typing import NamedTuple
 
-from kfp.dsl import Dataset, Input, Model, Output, component
+from kfp.dsl import Dataset, Input, Metrics, Model, Output, component
 
 from src.components.dependencies import PIPELINE_IMAGE_NAME
 
@@ -12,8 +12,10 @@ def compare_models(
     models: Input[list[Model]],
     model_resource_names: list,
     best_model: Output[Model],
+    profiling_metrics: Output[Metrics],
     metric_to_optimise: str,
     higher_is_better: bool = True,
+    enable_profiling: bool = False,
 ) -> NamedTuple("Outputs", [("metrics", list), ("best_model_version", str)]):
     """Compare a collection of candidate models and return the best model.
 
@@ -25,9 +27,15 @@ def compare_models(
         best_model(Output[Model]): Best model as a KFP Model object, this parameter
             will be passed automatically by the orchestrator. The .path
             attribute is the location of the joblib file in GCS.
+        profiling_metrics (Output[Metrics]): Output wall time, CPU time and peak
+            memory usage of each phase of the component. Only populated if
+            `enable_profiling` is True. This parameter will be passed
+            automatically by the orchestrator.
         metric_to_optimise (str): Metric to use to determine which model is better.
         higher_is_better (bool, optional): Whether higher values of
             `metric_to_optimise` mean that a model is better. Defaults to True.
+        enable_profiling (bool, optional): Whether to record the resources used
+            by each phase of the component. Defaults to False.
 
     Returns:
         list: Values of `metric_to_optimise` for all the candidate models.
@@ -35,24 +43,26 @@ def compare_models(
     """
     import joblib
     import numpy as np
-    import pandas as pd
     from loguru import logger
 
+    from src.base.data import load_dataset
     from src.base.model import evaluate_model
     from src.utils.logging import setup_logger
+    from src.utils.profiling import Profiler
 
     setup_logger()
+    profiler = Profiler(enabled=enable_profiling)
 
-    candidates = [joblib.load(m.path) for m in models]
-    # logger.debug(f"Number of candidates: {len(candidates)}.")
-    # logger.debug(f"Candidates: {candidates}.")
+    with profiler.phase("load"):
+        candidates = [joblib.load(m.path) for m in models]
+        # logger.debug(f"Number of candidates: {len(candidates)}.")
+        # logger.debug(f"Candidates: {candidates}.")
 
-    df_test = pd.read_parquet(test_data.path)
-    df_test = df_test.drop(columns=["transaction_id"])
-    y_test = df_test.pop(target_column)
-    logger.info(f"Loaded test data, shape {df_test.shape}.")
+        test = load_dataset(test_data.path, target_column)
+        logger.info(f"Loaded test data, shape {test.shape}.")
 
-    res_m, _, _ = zip(*(evaluate_model(c, df_test, y_test) for c in candidates))
+    with profiler.phase("evaluate"):
+        res_m, _, _ = zip(*(evaluate_model(c, test.frame, test.y) for c in candidates))
     metrics = [m[metric_to_optimise] for m in res_m]
     logger.info("Evaluation completed.")
 
@@ -73,4 +83,7 @@ def compare_models(
         f"best model version: {best_model_version}."
     )
 
+    if enable_profiling is True:
+        profiler.log_metrics(profiling_metrics)
+
     return metrics, best_model_version
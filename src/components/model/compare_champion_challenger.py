@@ -39,9 +39,9 @@ def compare_champion_challenger(
         float: Value of the metric to optimise for the champion model
     """
     import joblib
-    import pandas as pd
     from loguru import logger
 
+    from src.base.data import load_dataset
     from src.base.model import evaluate_model
     from src.utils.logging import setup_logger
 
@@ -52,13 +52,11 @@ def compare_champion_challenger(
     challenger = joblib.load(challenger_model.path)
     logger.info("Loaded challenger model.")
 
-    df_test = pd.read_parquet(test_data.path)
-    df_test = df_test.drop(columns=["transaction_id"])
-    y_test = df_test.pop(target_column)
-    logger.info(f"Loaded test data, shape {df_test.shape}.")
+    test = load_dataset(test_data.path, target_column)
+    logger.info(f"Loaded test data, shape {test.shape}.")
 
-    champion_metrics, _, _ = evaluate_model(champion, df_test, y_test)
-    challenger_metrics, _, _ = evaluate_model(challenger, df_test, y_test)
+    champion_metrics, _, _ = evaluate_model(champion, test.frame, test.y)
+    challenger_metrics, _, _ = evaluate_model(challenger, test.frame, test.y)
     logger.info("Evaluation completed.")
 
     champion_metric = champion_metrics[metric_to_optimise]
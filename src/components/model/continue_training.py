@@ -0,0 +1,119 @@
+from kfp.dsl import Dataset, Input, Metrics, Model, Output, component
+
+from src.components.dependencies import PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME)
+def continue_training_model(
+    trained_model: Input[Model],
+    training_data: Input[Dataset],
+    validation_data: Input[Dataset],
+    test_data: Input[Dataset],
+    target_column: str,
+    train_metrics: Output[Metrics],
+    valid_metrics: Output[Metrics],
+    test_metrics: Output[Metrics],
+    model: Output[Model],
+    model_name: str = "warm_start",
+    n_estimators: int = 100,
+    n_epochs: int = 1,
+    fit_args: dict = {},
+    model_gcs_folder_path: str = None,
+) -> None:
+    """Continue the training of an existing model (e.g. the champion) on new data.
+
+    Args:
+        trained_model (Input[Model]): Trained model to update as a KFP Model object,
+            for example the output of `export_model`.
+        training_data (Input[Dataset]): New training data, containing only the
+            transactions that were not used to train `trained_model`, as a KFP
+            Dataset object.
+        validation_data (Input[Dataset]): Validation data (used to prevent overfitting)
+            as a KFP Dataset object.
+        test_data (Input[Dataset]): Evaluation data as a KFP Dataset object.
+        target_column (str): Column containing the target column for classification.
+        train_metrics (Output[Metrics]): Output metrics for the updated model
+            on the new training data. This parameter will be passed automatically
+            by the orchestrator.
+        valid_metrics (Output[Metrics]): Output metrics for the updated model
+            on the validation data. This parameter will be passed automatically
+            by the orchestrator.
+        test_metrics (Output[Metrics]): Output metrics for the updated model
+            on the test data. This parameter will be passed automatically
+            by the orchestrator.
+        model (Output[Model]): Output model as a KFP Model object, this parameter
+            will be passed automatically by the orchestrator. The .path
+            attribute is the location of the joblib file in GCS.
+        model_name (str, optional): Name of the folder where the updated model is
+            saved. Defaults to "warm_start".
+        n_estimators (int, optional): Number of boosting rounds added to LightGBM
+            and XGBoost models. Defaults to 100.
+        n_epochs (int, optional): Number of passes over the new data for SGD
+            models. Defaults to 1.
+        fit_args (dict, optional): Arguments used when fitting the model.
+            Default to an empty dict.
+        model_gcs_folder_path (str, optional): GCS path where to save the updated
+            model. If not provided, use the default path of the component.
+            Defaults to None.
+    """
+    from pathlib import Path
+
+    import joblib
+    from loguru import logger
+
+    from src.base.data import load_dataset
+    from src.base.model import continue_training, evaluate_model
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    classifier = joblib.load(trained_model.path)
+
+    train = load_dataset(training_data.path, target_column)
+    logger.info(f"Loaded new training data, shape {train.shape}.")
+
+    valid = load_dataset(
+        validation_data.path, target_column, feature_columns=train.feature_names
+    )
+    logger.info(f"Loaded evaluation data, shape {valid.shape}.")
+
+    test = load_dataset(
+        test_data.path, target_column, feature_columns=train.feature_names
+    )
+    logger.info(f"Loaded test data, shape {test.shape}.")
+
+    classifier, training_metrics = continue_training(
+        classifier,
+        X_new=train.frame,
+        y_new=train.y,
+        X_valid=valid.frame,
+        y_valid=valid.y,
+        n_estimators=n_estimators,
+        n_epochs=n_epochs,
+        fit_args=fit_args,
+    )
+    logger.info("Training completed.")
+    for k, v in training_metrics.items():
+        if k != "precision_recall_curve":
+            train_metrics.log_metric(k, v)
+
+    validation_metrics, _, _ = evaluate_model(classifier, valid.frame, valid.y)
+    for k, v in validation_metrics.items():
+        if k != "precision_recall_curve":
+            valid_metrics.log_metric(k, v)
+
+    testing_metrics, _, _ = evaluate_model(classifier, test.frame, test.y)
+    for k, v in testing_metrics.items():
+        if k != "precision_recall_curve":
+            test_metrics.log_metric(k, v)
+
+    logger.info("Evaluation completed.")
+
+    if model_gcs_folder_path is not None:
+        model.path = model_gcs_folder_path.replace("gs://", "/gcs/")
+
+    model.path = f"{model.path}/{model_name}/model.joblib"
+    Path(model.path).parent.mkdir(parents=True, exist_ok=True)
+
+    joblib.dump(classifier, model.path)
+    logger.info(f"Saved model to {model.path}.")
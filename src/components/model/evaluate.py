@@ -29,9 +29,9 @@ def evaluate_model(
             model. This parameter will be passed automatically by the orchestrator.
     """
     import joblib
-    import pandas as pd
     from loguru import logger
 
+    from src.base.data import load_dataset
     from src.base.model import evaluate_model
     from src.utils.logging import setup_logger
 
@@ -39,12 +39,10 @@ def evaluate_model(
 
     classifier = joblib.load(model.path)
 
-    df_test = pd.read_parquet(test_data.path)
-    df_test = df_test.drop(columns=["transaction_id"])
-    y_test = df_test.pop(target_column)
-    logger.info(f"Loaded test data, shape {df_test.shape}.")
+    test = load_dataset(test_data.path, target_column)
+    logger.info(f"Loaded test data, shape {test.shape}.")
 
-    testing_metrics, _, _ = evaluate_model(classifier, df_test, y_test)
+    testing_metrics, _, _ = evaluate_model(classifier, test.frame, test.y)
     logger.info("Evaluation completed.")
     for k, v in testing_metrics.items():
         if k != "precision_recall_curve":
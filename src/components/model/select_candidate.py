@@ -0,0 +1,40 @@
+from kfp.dsl import Artifact, Input, Model, Output, component
+
+from src.components.dependencies import PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME)
+def select_candidate_model(
+    models: Input[Artifact],
+    model_name: str,
+    model: Output[Model],
+) -> None:
+    """Get one of the models trained by `train_evaluate_models` as a KFP Model.
+
+    Args:
+        models (Input[Artifact]): Folder containing the models trained by
+            `train_evaluate_models`.
+        model_name (str): Name of the model to select.
+        model (Output[Model]): Selected model as a KFP Model object, this parameter
+            will be passed automatically by the orchestrator. The .path
+            attribute is the location of the joblib file in GCS.
+    """
+    import json
+    from pathlib import Path
+
+    from loguru import logger
+
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    model_dir = Path(models.path) / model_name
+    if not (model_dir / "model.joblib").exists():
+        msg = f"Model {model_name} not found in {models.path}."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    model.uri = f"{models.uri}/{model_name}/model.joblib"
+    with open(model_dir / "metrics.json") as f:
+        model.metadata = json.load(f)
+    logger.info(f"Selected model {model_name} at {model.uri}.")
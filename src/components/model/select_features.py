@@ -0,0 +1,122 @@
+from kfp.dsl import Artifact, Dataset, Input, Metrics, Output, component
+
+from src.components.dependencies import PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME)
+def select_features(
+    training_data: Input[Dataset],
+    validation_data: Input[Dataset],
+    target_column: str,
+    selected_features: Output[Artifact],
+    report: Output[Artifact],
+    selection_metrics: Output[Metrics],
+    model_name: str = "lightgbm",
+    models_params: dict = {},
+    step: float = 0.1,
+    min_features_to_select: int = 5,
+    cv: int = 5,
+    n_jobs: int = -1,
+    tolerance: float = None,
+    max_training_rows: int = 200000,
+) -> list:
+    """Prune the features of a model with SHAP recursive feature elimination.
+
+    Args:
+        training_data (Input[Dataset]): Training data as a KFP Dataset object.
+        validation_data (Input[Dataset]): Validation data as a KFP Dataset object.
+        target_column (str): Column containing the target column for classification.
+        selected_features (Output[Artifact]): Output JSON file with the selected
+            features. This parameter will be passed automatically by the
+            orchestrator.
+        report (Output[Artifact]): Output CSV file with the average precision and
+            the scoring latency at each step of the elimination. This parameter
+            will be passed automatically by the orchestrator.
+        selection_metrics (Output[Metrics]): Output metrics of the selected feature
+            set. This parameter will be passed automatically by the orchestrator.
+        model_name (str, optional): Name of the classifier used to rank the
+            features. Must be one of 'random_forest', 'lightgbm', 'xgboost'.
+            Defaults to 'lightgbm'.
+        models_params (dict, optional): Hyperparameters of the models. Default to
+            an empty dict.
+        step (float, optional): Number (if >= 1) or fraction (if < 1) of features
+            removed at each step. Defaults to 0.1.
+        min_features_to_select (int, optional): Minimum number of features to keep.
+            Defaults to 5.
+        cv (int, optional): Number of cross-validation folds. Defaults to 5.
+        n_jobs (int, optional): Number of folds evaluated in parallel. If -1, use
+            all the available cores. Defaults to -1.
+        tolerance (float, optional): Maximum decrease of cross-validated average
+            precision with respect to the best feature set. If None, use the
+            standard deviation across the folds of the best feature set.
+            Defaults to None.
+        max_training_rows (int, optional): Maximum number of training rows used
+            for the elimination, sampled at random. Defaults to 200000.
+
+    Returns:
+        list: Selected features.
+    """
+    import json
+    from pathlib import Path
+
+    import numpy as np
+    from loguru import logger
+
+    from src.base.data import load_dataset
+    from src.base.feature_selection import shap_feature_elimination
+    from src.base.model import build_classifier
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    train = load_dataset(training_data.path, target_column)
+    logger.info(f"Loaded training data, shape {train.shape}.")
+
+    valid = load_dataset(
+        validation_data.path, target_column, feature_columns=train.feature_names
+    )
+    logger.info(f"Loaded evaluation data, shape {valid.shape}.")
+
+    X_train, y_train = train.frame, train.y
+    if len(train) > max_training_rows:
+        rng = np.random.default_rng(42)
+        idx = np.sort(rng.choice(len(train), size=max_training_rows, replace=False))
+        X_train, y_train = X_train.iloc[idx], y_train[idx]
+        logger.info(f"Sampled {max_training_rows} training rows.")
+
+    classifier, _ = build_classifier(model_name, models_params.get(model_name, {}))
+    features, elimination_report = shap_feature_elimination(
+        classifier,
+        X_train,
+        y_train,
+        valid.frame,
+        valid.y,
+        step=int(step) if step >= 1 else step,
+        min_features_to_select=min_features_to_select,
+        cv=cv,
+        n_jobs=n_jobs,
+        tolerance=tolerance,
+    )
+
+    chosen = elimination_report[elimination_report["selected"]].iloc[0]
+    selection_metrics.log_metric("num_features", len(features))
+    for k in (
+        "val_metric_mean",
+        "valid_average_precision",
+        "batch_latency_ms_per_1000_rows",
+        "single_row_latency_ms",
+    ):
+        selection_metrics.log_metric(k, float(chosen[k]))
+
+    selected_features.path = f"{selected_features.path}.json"
+    Path(selected_features.path).parent.mkdir(parents=True, exist_ok=True)
+    with open(selected_features.path, "w") as f:
+        json.dump(features, f, indent=2)
+    logger.info(f"Saved selected features to {selected_features.path}.")
+
+    report.path = f"{report.path}.csv"
+    Path(report.path).parent.mkdir(parents=True, exist_ok=True)
+    elimination_report.to_csv(report.path, index=False)
+    logger.info(f"Saved feature elimination report to {report.path}.")
+
+    return features
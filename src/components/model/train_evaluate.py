@@ -16,10 +16,14 @@ def train_evaluate_model(
     valid_pr_curve: Output[Artifact],
     test_pr_curve: Output[Artifact],
     model: Output[Model],
+    profiling_metrics: Output[Metrics],
     models_params: dict = {},
     fit_args: dict = {},
     data_processing_args: dict = {},
     model_gcs_folder_path: str = None,
+    data_version: str = None,
+    binned_cache_path: str = None,
+    enable_profiling: bool = False,
 ) -> None:
     """Train a classification model on the training data.
 
@@ -52,7 +56,12 @@ def train_evaluate_model(
             be passed automatically by the orchestrator.
         model (Output[Model]): Output model as a KFP Model object, this parameter
             will be passed automatically by the orchestrator. The .path
-            attribute is the location of the joblib file in GCS.
+            attribute is the location of the joblib file in GCS. The
+            pickle-free artifact used for serving is saved in the same folder.
+        profiling_metrics (Output[Metrics]): Output wall time, CPU time and peak
+            memory usage of each phase of the component. Only populated if
+            `enable_profiling` is True. This parameter will be passed
+            automatically by the orchestrator.
         models_params (dict, optional): Hyperparameters of the model. Default to
             an empty dict.
         fit_args (dict, optional): Arguments used when fitting the model.
@@ -63,87 +72,108 @@ def train_evaluate_model(
         model_gcs_folder_path (str, optional): GCS path where to save the trained model
             and metrics artifacts. If not provided, use the default path of the
             component. Defaults to None.
+        data_version (str, optional): Version of the input data, used to key the
+            cached binned datasets. Defaults to None.
+        binned_cache_path (str, optional): Local or GCS folder where the binned
+            datasets of the LightGBM and XGBoost models are cached between runs.
+            The cache is only used if `data_version` is also provided. Defaults
+            to None.
+        enable_profiling (bool, optional): Whether to record the resources used
+            by each phase of the component. Defaults to False.
     """
     from pathlib import Path
 
     import joblib
-    import pandas as pd
-    from lightgbm import LGBMClassifier
     from loguru import logger
-    from sklearn.ensemble import RandomForestClassifier
-    from sklearn.linear_model import LogisticRegression, SGDClassifier
-    from xgboost import XGBClassifier
 
-    from src.base.model import evaluate_model, train_model
+    from src.base.artifacts import save_model_artifact
+    from src.base.boosting import (
+        LIGHTGBM_DATASET_PARAMS,
+        CachedBoosterClassifier,
+        binned_dataset_key,
+    )
+    from src.base.data import load_dataset
+    from src.base.model import build_classifier, evaluate_model, train_model
     from src.base.visualisation import plot_precision_recall_curve
     from src.utils.logging import setup_logger
+    from src.utils.profiling import Profiler
 
     setup_logger()
+    profiler = Profiler(enabled=enable_profiling)
 
-    df_train = pd.read_parquet(training_data.path)
-    df_train = df_train.drop(columns=["transaction_id"])
-    y_train = df_train.pop(target_column)
-    logger.info(f"Loaded training data, shape {df_train.shape}.")
+    with profiler.phase("load"):
+        train = load_dataset(training_data.path, target_column)
+        logger.info(f"Loaded training data, shape {train.shape}.")
 
-    df_valid = pd.read_parquet(validation_data.path)
-    df_valid = df_valid.drop(columns=["transaction_id"])
-    y_valid = df_valid.pop(target_column)
-    logger.info(f"Loaded evaluation data, shape {df_valid.shape}.")
+        valid = load_dataset(
+            validation_data.path, target_column, feature_columns=train.feature_names
+        )
+        logger.info(f"Loaded evaluation data, shape {valid.shape}.")
 
-    df_test = pd.read_parquet(test_data.path)
-    df_test = df_test.drop(columns=["transaction_id"])
-    y_test = df_test.pop(target_column)
-    logger.info(f"Loaded test data, shape {df_test.shape}.")
+        test = load_dataset(
+            test_data.path, target_column, feature_columns=train.feature_names
+        )
+        logger.info(f"Loaded test data, shape {test.shape}.")
 
-    use_eval_set = False
     model_params = models_params.get(model_name, {})
-    if model_name == "logistic_regression":
-        classifier = LogisticRegression(random_state=42, **model_params)
-    elif model_name == "sgd_classifier":
-        classifier = SGDClassifier(random_state=42, **model_params)
-    elif model_name == "random_forest":
-        classifier = RandomForestClassifier(random_state=42, **model_params)
-    elif model_name == "lightgbm":
-        classifier = LGBMClassifier(random_state=42, **model_params)
-        use_eval_set = True
-    elif model_name == "xgboost":
-        classifier = XGBClassifier(
-            use_label_encoder=False, random_state=42, **model_params
+    classifier, use_eval_set = build_classifier(model_name, model_params)
+
+    if (
+        model_name in ("lightgbm", "xgboost")
+        and binned_cache_path is not None
+        and data_version is not None
+    ):
+        cache_key = binned_dataset_key(
+            data_version=data_version,
+            feature_names=train.feature_names,
+            n_rows=len(train),
+            params=dict(
+                model_name=model_name,
+                data_processing_args=data_processing_args,
+                **{
+                    k: model_params[k]
+                    for k in LIGHTGBM_DATASET_PARAMS
+                    if k in model_params
+                },
+            ),
         )
-        use_eval_set = True
-    else:
-        msg = (
-            "`model_name` must be one of 'logistic_regression', 'sgd_classifier', "
-            "'random_forest', 'lightgbm', 'xgboost'."
+        classifier = CachedBoosterClassifier(
+            booster=model_name,
+            params=dict(random_state=42, **model_params),
+            cache_dir=binned_cache_path.replace("gs://", "/gcs/"),
+            cache_key=cache_key,
         )
-        logger.error(msg)
-        raise ValueError(msg)
+        logger.info(f"Using binned datasets cache {binned_cache_path}/{cache_key}.")
 
     logger.info(f"Training model {model_name}.")
-    classifier, training_metrics = train_model(
-        classifier,
-        X_train=df_train,
-        y_train=y_train,
-        X_valid=df_valid,
-        y_valid=y_valid,
-        use_eval_set=use_eval_set,
-        fit_args=fit_args.get(model_name, {}),
-        **data_processing_args,
-    )
+    with profiler.phase("train"):
+        classifier, training_metrics = train_model(
+            classifier,
+            X_train=train.frame,
+            y_train=train.y,
+            X_valid=valid.frame,
+            y_valid=valid.y,
+            use_eval_set=use_eval_set,
+            fit_args=fit_args.get(model_name, {}),
+            profiler=profiler,
+            **data_processing_args,
+        )
+
     logger.info("Training completed.")
     for k, v in training_metrics.items():
         if k != "precision_recall_curve":
             train_metrics.log_metric(k, v)
 
-    validation_metrics, _, _ = evaluate_model(classifier, df_valid, y_valid)
-    for k, v in validation_metrics.items():
-        if k != "precision_recall_curve":
-            valid_metrics.log_metric(k, v)
+    with profiler.phase("evaluate"):
+        validation_metrics, _, _ = evaluate_model(classifier, valid.frame, valid.y)
+        for k, v in validation_metrics.items():
+            if k != "precision_recall_curve":
+                valid_metrics.log_metric(k, v)
 
-    testing_metrics, _, _ = evaluate_model(classifier, df_test, y_test)
-    for k, v in testing_metrics.items():
-        if k != "precision_recall_curve":
-            test_metrics.log_metric(k, v)
+        testing_metrics, _, _ = evaluate_model(classifier, test.frame, test.y)
+        for k, v in testing_metrics.items():
+            if k != "precision_recall_curve":
+                test_metrics.log_metric(k, v)
 
     logger.info("Evaluation completed.")
 
@@ -157,8 +187,13 @@ def train_evaluate_model(
     model_dir = Path(model.path).parent.absolute()
     model_dir.mkdir(parents=True, exist_ok=True)
 
-    joblib.dump(classifier, model.path)
-    logger.info(f"Saved model to {model.path}.")
+    with profiler.phase("dump"):
+        joblib.dump(classifier, model.path)
+        logger.info(f"Saved model to {model.path}.")
+        try:
+            save_model_artifact(classifier, model_dir, train.feature_names)
+        except ValueError:
+            logger.warning("Model artifact not saved, only the joblib file is used.")
 
     valid_pr_curve.path = (
         f"{valid_pr_curve.path}/precision_recall_curve_validation_{model_name}.png"
@@ -166,13 +201,12 @@ def train_evaluate_model(
     valid_pr_curve_dir = Path(valid_pr_curve.path).parent.absolute()
     valid_pr_curve_dir.mkdir(parents=True, exist_ok=True)
 
-    _ = plot_precision_recall_curve(
-        model=classifier,
-        model_name=model_name,
-        X=df_valid,
-        y=y_valid,
-        save_path=valid_pr_curve.path,
-    )
+    with profiler.phase("plot"):
+        _ = plot_precision_recall_curve(
+            model_name=model_name,
+            curve=validation_metrics["precision_recall_curve"],
+            save_path=valid_pr_curve.path,
+        )
     logger.info(f"Saved validation PR curve to {valid_pr_curve.path}.")
 
     test_pr_curve.path = (
@@ -181,11 +215,13 @@ def train_evaluate_model(
     test_pr_curve_dir = Path(test_pr_curve.path).parent.absolute()
     test_pr_curve_dir.mkdir(parents=True, exist_ok=True)
 
-    _ = plot_precision_recall_curve(
-        model=classifier,
-        model_name=model_name,
-        X=df_test,
-        y=y_test,
-        save_path=test_pr_curve.path,
-    )
+    with profiler.phase("plot"):
+        _ = plot_precision_recall_curve(
+            model_name=model_name,
+            curve=testing_metrics["precision_recall_curve"],
+            save_path=test_pr_curve.path,
+        )
     logger.info(f"Saved test PR curve to {test_pr_curve.path}.")
+
+    if enable_profiling is True:
+        profiler.log_metrics(profiling_metrics)
@@ -0,0 +1,101 @@
+from kfp.dsl import Artifact, Dataset, Input, Metrics, Output, component
+
+from src.components.dependencies import MATPLOTLIB, PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME, packages_to_install=[MATPLOTLIB])
+def train_evaluate_models(
+    training_data: Input[Dataset],
+    validation_data: Input[Dataset],
+    test_data: Input[Dataset],
+    target_column: str,
+    model_names: list,
+    metrics: Output[Metrics],
+    models: Output[Artifact],
+    models_params: dict = {},
+    fit_args: dict = {},
+    data_processing_args: dict = {},
+    model_gcs_folder_path: str = None,
+    n_jobs: int = -1,
+) -> None:
+    """Train several classification models on the same training data.
+
+    The data is loaded and scaled once, and the models are trained in parallel
+    sharing the same copy of the data. Use `select_candidate_model` to get each
+    trained model as a KFP Model object.
+
+    Args:
+        training_data (Input[Dataset]): Training data as a KFP Dataset object.
+        validation_data (Input[Dataset]): Validation data (used to prevent overfitting)
+            as a KFP Dataset object.
+        test_data (Input[Dataset]): Evaluation data as a KFP Dataset object.
+        target_column (str): Column containing the target column for classification.
+        model_names (list): Names of the classifiers that will be trained. Each one
+            must be one of 'logistic_regression', 'sgd_classifier',
+            'random_forest', 'lightgbm', 'xgboost'.
+        metrics (Output[Metrics]): Output metrics for the trained models on the
+            training, validation and test data. This parameter will be passed
+            automatically by the orchestrator and it can be referred to by
+            clicking on the component's execution in the pipeline.
+        models (Output[Artifact]): Output folder containing one subfolder for each
+            trained model, with the model joblib file, its metrics and its
+            precision-recall curves. This parameter will be passed automatically
+            by the orchestrator.
+        models_params (dict, optional): Hyperparameters of the models. Default to
+            an empty dict.
+        fit_args (dict, optional): Arguments used when fitting the models.
+            Default to an empty dict.
+        data_processing_args (dict, optional): Arguments used when running extra
+            processing on the data (such as scaling or oversampling). Default
+            to an empty dict.
+        model_gcs_folder_path (str, optional): GCS path where to save the trained
+            models and metrics artifacts. If not provided, use the default path of
+            the component. Defaults to None.
+        n_jobs (int, optional): Number of models trained in parallel. If -1, train
+            all the models in parallel. Defaults to -1.
+    """
+    from pathlib import Path
+
+    from loguru import logger
+
+    from src.base.data import load_dataset
+    from src.base.training import train_candidates
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    train = load_dataset(training_data.path, target_column)
+    logger.info(f"Loaded training data, shape {train.shape}.")
+
+    valid = load_dataset(
+        validation_data.path, target_column, feature_columns=train.feature_names
+    )
+    logger.info(f"Loaded evaluation data, shape {valid.shape}.")
+
+    test = load_dataset(
+        test_data.path, target_column, feature_columns=train.feature_names
+    )
+    logger.info(f"Loaded test data, shape {test.shape}.")
+
+    if model_gcs_folder_path is not None:
+        models.path = model_gcs_folder_path.replace("gs://", "/gcs/")
+    Path(models.path).mkdir(parents=True, exist_ok=True)
+
+    results = train_candidates(
+        train,
+        valid,
+        test,
+        model_names=model_names,
+        output_dir=models.path,
+        models_params=models_params,
+        fit_args=fit_args,
+        data_processing_args=data_processing_args,
+        n_jobs=n_jobs,
+    )
+    logger.info("Training and evaluation completed.")
+
+    for model_name, model_metrics in results.items():
+        for split, split_metrics in model_metrics.items():
+            for k, v in split_metrics.items():
+                metrics.log_metric(f"{model_name}_{split}_{k}", v)
+    logger.info(f"Saved models to {models.path}.")
@@ -0,0 +1,111 @@
+from kfp.dsl import Artifact, Dataset, Input, Metrics, Output, component
+
+from src.components.dependencies import PIPELINE_IMAGE_NAME
+
+
+@component(base_image=PIPELINE_IMAGE_NAME)
+def tune_model(
+    training_data: Input[Dataset],
+    validation_data: Input[Dataset],
+    target_column: str,
+    model_name: str,
+    search_space: dict,
+    tuning_metrics: Output[Metrics],
+    best_params: Output[Artifact],
+    study: Output[Artifact],
+    models_params: dict = {},
+    data_processing_args: dict = {},
+    n_trials: int = 50,
+    n_jobs: int = -1,
+    timeout: float = None,
+) -> dict:
+    """Tune the hyperparameters of a model with Optuna.
+
+    Args:
+        training_data (Input[Dataset]): Training data as a KFP Dataset object.
+        validation_data (Input[Dataset]): Validation data (used to score the trials)
+            as a KFP Dataset object.
+        target_column (str): Column containing the target column for classification.
+        model_name (str): Name of the classifier that will be tuned. Must be one of
+            'logistic_regression', 'sgd_classifier', 'random_forest', 'lightgbm',
+            'xgboost'.
+        search_space (dict): Search space of the hyperparameters of the model, in
+            the format of the `tuning.search_space` entries in `params.yaml`.
+        tuning_metrics (Output[Metrics]): Output metrics of the study. This
+            parameter will be passed automatically by the orchestrator.
+        best_params (Output[Artifact]): Output JSON file with the best
+            hyperparameters. This parameter will be passed automatically by the
+            orchestrator.
+        study (Output[Artifact]): Output SQLite file containing the Optuna study.
+            This parameter will be passed automatically by the orchestrator.
+        models_params (dict, optional): Fixed hyperparameters of the models, in
+            the same format as `models_params` in `params.yaml`. Default to an
+            empty dict.
+        data_processing_args (dict, optional): Arguments used when running extra
+            processing on the data (such as scaling or oversampling). Default
+            to an empty dict.
+        n_trials (int, optional): Total number of trials. Defaults to 50.
+        n_jobs (int, optional): Number of trials run in parallel. If -1, use all
+            the available cores. Defaults to -1.
+        timeout (float, optional): Maximum duration of the tuning in seconds. If
+            None, there is no time limit. Defaults to None.
+
+    Returns:
+        dict: Best hyperparameters of the model, in the same format as
+            `models_params` in `params.yaml`.
+    """
+    import json
+    import shutil
+    import tempfile
+    from pathlib import Path
+
+    from loguru import logger
+
+    from src.base.data import load_dataset
+    from src.base.tuning import tune_hyperparameters
+    from src.utils.logging import setup_logger
+
+    setup_logger()
+
+    train = load_dataset(training_data.path, target_column)
+    logger.info(f"Loaded training data, shape {train.shape}.")
+
+    valid = load_dataset(
+        validation_data.path, target_column, feature_columns=train.feature_names
+    )
+    logger.info(f"Loaded evaluation data, shape {valid.shape}.")
+
+    # Keep the study on local disk while the trials run, SQLite is not safe to
+    # use on the GCS mounted file system
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage_path = Path(tmp_dir) / f"{model_name}.db"
+        params, optuna_study = tune_hyperparameters(
+            train,
+            valid,
+            model_name=model_name,
+            search_space=search_space,
+            storage_path=storage_path,
+            model_params=models_params.get(model_name, {}),
+            data_processing_args=data_processing_args,
+            n_trials=n_trials,
+            n_jobs=n_jobs,
+            timeout=timeout,
+        )
+
+        study.path = f"{study.path}.db"
+        Path(study.path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(storage_path, study.path)
+        logger.info(f"Saved study to {study.path}.")
+
+    tuning_metrics.log_metric("best_average_precision", optuna_study.best_value)
+    for state in ("COMPLETE", "PRUNED", "FAIL"):
+        n = sum(t.state.name == state for t in optuna_study.trials)
+        tuning_metrics.log_metric(f"n_trials_{state.lower()}", n)
+
+    best_params.path = f"{best_params.path}.json"
+    Path(best_params.path).parent.mkdir(parents=True, exist_ok=True)
+    with open(best_params.path, "w") as f:
+        json.dump(params, f, indent=2)
+    logger.info(f"Saved best hyperparameters to {best_params.path}.")
+
+    return params
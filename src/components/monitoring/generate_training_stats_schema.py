@@ -33,7 +33,7 @@ def generate_training_stats_schema(
     from loguru import logger
 
     df_train = pd.read_parquet(training_data.path)
-    df_train = df_train.drop(columns=["transaction_id"])
+    df_train = df_train.drop(columns=["transaction_id", "split"], errors="ignore")
     logger.info(f"Loaded training data, shape {df_train.shape}.")
 
     stats_train = tfdv.generate_statistics_from_dataframe(df_train)
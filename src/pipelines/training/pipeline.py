@@ -19,14 +19,21 @@ from src.components.aiplatform import (
     update_version_alias,
     upload_model,
 )
-from src.components.bigquery import bq_table_to_dataset, execute_query
+from src.components.bigquery import (
+    bq_stream_to_dataset,
+    bq_table_to_dataset,
+    execute_query,
+    execute_query_graph,
+)
 from src.components.data import get_data_version
 from src.components.dependencies import PIPELINE_IMAGE_NAME
 from src.components.helpers import get_current_time
 from src.components.model import (
     compare_champion_challenger,
     compare_models,
+    select_candidate_model,
     train_evaluate_model,
+    train_evaluate_models,
 )
 
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -50,6 +57,13 @@ train_job = create_custom_training_job_from_component(
     replica_count=1,
 )
 
+train_models_job = create_custom_training_job_from_component(
+    component_spec=train_evaluate_models,
+    machine_type="n1-standard-32",
+    service_account=SERVICE_ACCOUNT,
+    replica_count=1,
+)
+
 
 @dsl.pipeline(name=PIPELINE_NAME, description="Credit card frauds training Pipeline")
 def training_pipeline(
@@ -59,6 +73,8 @@ def training_pipeline(
     dataset_location: str,
     data_version: str,
     create_replace_tables: bool,
+    incremental_refresh: bool,
+    previous_data_version: str,
     skip_bq_extract_if_exists: bool,
     email_notification_recipients: list,
 ):
@@ -78,6 +94,15 @@ def training_pipeline(
         data_version (str): Specific timestamp in `%Y%m%dT%H%M%S format.
         create_replace_tables (bool): Whether to replace the staging tables if they
             already exist.
+        incremental_refresh (bool): Whether to only preprocess the transactions newer
+            than the ones already in the preprocessed table and merge them into the
+            preprocessed and split tables, instead of rebuilding them. Caching must be
+            disabled for the refresh to run again on the same data version.
+        previous_data_version (str): Data version whose preprocessed and split tables
+            are copied and used as checkpoint by the incremental refresh of a data
+            version that does not have them yet. If empty, or if the previous tables
+            do not exist, the tables of the data version are refreshed in place, or
+            built from all the transactions.
         skip_bq_extract_if_exists (bool): Whether to skip the BQ extract step to GCS if
             the output target already exists.
         email_notification_recipients (list): List of email addresses that will be
@@ -122,11 +147,11 @@ def training_pipeline(
         cards_table = f"{dataset_name}.cards"
         holidays_table = f"{dataset_name}.holidays"
         preprocessed_table = f"{dataset_name}.preprocessed"
-        train_set_table = f"{dataset_name}.training"
-        valid_set_table = f"{dataset_name}.validation"
-        test_set_table = f"{dataset_name}.testing"
+        split_table = f"{dataset_name}.split"
+        previous_dataset_name = f"{project_id}.{dataset_id}_{previous_data_version}"
 
         models_gcs_folder_path = f"{VERTEX_PIPELINE_FILES_GCS_PATH}/models"
+        binned_cache_gcs_path = f"{VERTEX_PIPELINE_FILES_GCS_PATH}/binned_datasets"
 
         preprocessing_query = generate_query(
             queries_folder / "q_preprocessing.sql",
@@ -135,18 +160,23 @@ def training_pipeline(
             cards_table=cards_table,
             holidays_table=holidays_table,
             preprocessed_table=preprocessed_table,
+            previous_preprocessed_table=f"{previous_dataset_name}.preprocessed",
             fraud_delay_seconds=(config_params["fraud_delay_days"] * 24 * 60 * 60),
             features=features,
             create_replace_tables=create_replace_tables,
+            incremental_refresh=incremental_refresh,
         )
 
         query_job_config = json.dumps(dict(use_query_cache=True))
 
         preprocess_data = (
-            execute_query(
+            execute_query_graph(
                 query=preprocessing_query,
                 bq_client_project_id=project_id,
+                staging_dataset=dataset_name,
                 query_job_config=query_job_config,
+                dry_run=True,
+                max_bytes_processed=config_params["max_query_bytes_processed"],
             )
             .set_display_name("Preprocess input data")
             .set_caching_options(True)
@@ -157,10 +187,10 @@ def training_pipeline(
             source_table=preprocessed_table,
             valid_size=0.15,
             test_size=0.15,
-            training_table=train_set_table,
-            validation_table=valid_set_table,
-            testing_table=test_set_table,
+            split_table=split_table,
+            previous_split_table=f"{previous_dataset_name}.split",
             create_replace_tables=create_replace_tables,
+            incremental_refresh=incremental_refresh,
         )
 
         train_valid_test = (
@@ -168,55 +198,59 @@ def training_pipeline(
                 query=train_valid_test_query,
                 bq_client_project_id=project_id,
                 query_job_config=query_job_config,
+                dry_run=True,
+                max_bytes_processed=config_params["max_query_bytes_processed"],
             )
             .after(preprocess_data)
             .set_display_name("Train / validation / test split")
             .set_caching_options(True)
         )
 
-        extract_training_data = (
-            bq_table_to_dataset(
+        def extract_split(split: int):
+            """Extract the rows of a split of the split table as a Parquet dataset."""
+            if config_params["read_with_storage_api"] is True:
+                return bq_stream_to_dataset(
+                    bq_client_project_id=project_id,
+                    source_project_id=project_id,
+                    dataset_id=f"{dataset_id}_{data_version.output}",
+                    table_name=split_table.rsplit(".", 1)[1],
+                    columns=[
+                        "transaction_id",
+                        *config_params["features"],
+                        config_params["target_column"],
+                    ],
+                    row_restriction=f"split = {split}",
+                    schema_table="split",
+                    skip_if_exists=skip_bq_extract_if_exists,
+                )
+            return bq_table_to_dataset(
                 bq_client_project_id=project_id,
                 source_project_id=project_id,
                 dataset_id=f"{dataset_id}_{data_version.output}",
-                table_name=train_set_table.rsplit(".", 1)[1],
+                table_name=split_table.rsplit(".", 1)[1],
+                partition=str(split),
                 dataset_location=dataset_location,
                 file_pattern="file_*",
                 extract_job_config=dict(destination_format="PARQUET"),
                 skip_if_exists=skip_bq_extract_if_exists,
             )
+
+        extract_training_data = (
+            extract_split(0)
             .after(train_valid_test)
             .set_display_name("Extract training data")
             .set_caching_options(True)
         )
 
         extract_validation_data = (
-            bq_table_to_dataset(
-                bq_client_project_id=project_id,
-                source_project_id=project_id,
-                dataset_id=f"{dataset_id}_{data_version.output}",
-                table_name=valid_set_table.rsplit(".", 1)[1],
-                dataset_location=dataset_location,
-                file_pattern="file_*",
-                extract_job_config=dict(destination_format="PARQUET"),
-                skip_if_exists=skip_bq_extract_if_exists,
-            )
+            extract_split(1)
             .after(train_valid_test)
             .set_display_name("Extract validation data")
             .set_caching_options(True)
         )
 
         extract_test_data = (
-            bq_table_to_dataset(
-                bq_client_project_id=project_id,
-                source_project_id=project_id,
-                dataset_id=f"{dataset_id}_{data_version.output}",
-                table_name=test_set_table.rsplit(".", 1)[1],
-                dataset_location=dataset_location,
-                file_pattern="file_*",
-                extract_job_config=dict(destination_format="PARQUET"),
-                skip_if_exists=skip_bq_extract_if_exists,
-            )
+            extract_split(2)
             .after(train_valid_test)
             .set_display_name("Extract test data")
             .set_caching_options(True)
@@ -245,14 +279,15 @@ def training_pipeline(
             )
         )
 
-        with dsl.ParallelFor(items=models, name="Train and evaluate models") as item:
-            train = (
-                train_job(
+        if config_params["train_models_in_single_job"] is True:
+            # Load the data once and train all the models in the same job
+            train_models = (
+                train_models_job(
                     training_data=extract_training_data.outputs["dataset"],
                     validation_data=extract_validation_data.outputs["dataset"],
                     test_data=extract_test_data.outputs["dataset"],
                     target_column=config_params["target_column"],
-                    model_name=item,
+                    model_names=models,
                     models_params=config_params["models_params"],
                     fit_args=config_params["fit_args"],
                     data_processing_args=config_params["data_processing_args"],
@@ -262,10 +297,44 @@ def training_pipeline(
                     location=project_location,
                 )
                 .after(extract_training_data, extract_validation_data)
-                .set_display_name("Train and evaluate model")
+                .set_display_name("Train and evaluate models")
                 .set_caching_options(True)
             )
 
+        with dsl.ParallelFor(items=models, name="Train and evaluate models") as item:
+            if config_params["train_models_in_single_job"] is True:
+                train = (
+                    select_candidate_model(
+                        models=train_models.outputs["models"],
+                        model_name=item,
+                    )
+                    .set_display_name("Select trained model")
+                    .set_caching_options(True)
+                )
+            else:
+                train = (
+                    train_job(
+                        training_data=extract_training_data.outputs["dataset"],
+                        validation_data=extract_validation_data.outputs["dataset"],
+                        test_data=extract_test_data.outputs["dataset"],
+                        target_column=config_params["target_column"],
+                        model_name=item,
+                        models_params=config_params["models_params"],
+                        fit_args=config_params["fit_args"],
+                        data_processing_args=config_params["data_processing_args"],
+                        model_gcs_folder_path=models_gcs_folder_path,
+                        data_version=data_version.output,
+                        binned_cache_path=binned_cache_gcs_path,
+                        enable_profiling=config_params["enable_profiling"],
+                        # Training wrapper specific arguments
+                        project=project_id,
+                        location=project_location,
+                    )
+                    .after(extract_training_data, extract_validation_data)
+                    .set_display_name("Train and evaluate model")
+                    .set_caching_options(True)
+                )
+
             upload = (
                 upload_model(
                     model_id="credit-card-frauds",
@@ -292,6 +361,7 @@ def training_pipeline(
                 target_column=config_params["target_column"],
                 metric_to_optimise="average_precision",
                 higher_is_better=True,
+                enable_profiling=config_params["enable_profiling"],
                 models=dsl.Collected(train.outputs["model"]),
                 model_resource_names=dsl.Collected(
                     upload.outputs["model_resource_name"]
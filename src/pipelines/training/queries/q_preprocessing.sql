@@ -1,11 +1,73 @@
+/* Incremental refresh: only the transactions newer than the latest one already in the
+preprocessed table (the high-water mark) are preprocessed and merged into it. The rolling
+windows only need the transactions of the last 2 years before the high-water mark, the
+ones before that (the lookback start) are only summarised per user and per MCC for the
+windows with no lower bound. Transactions not newer than the high-water mark are ignored.
+
+Each data version has its own preprocessed table. On the first refresh of a new data
+version, the preprocessed table of the previous data version (if any) is copied and used
+as checkpoint, so that only the transactions added since the previous version are
+preprocessed. Without a previous data version, the tables of the data version are
+refreshed in place. */
+DECLARE incremental BOOL DEFAULT {{ incremental_refresh | default(false) }};
+DECLARE high_water_mark INT64 DEFAULT NULL;
+DECLARE lookback_start INT64 DEFAULT NULL;
+DECLARE id_offset INT64 DEFAULT 0;
+
+{% if previous_preprocessed_table is defined %}
+/* Kept apart from the statements setting the variables, which are run again by each job
+when the script is run as a statement graph */
+IF incremental THEN
+    BEGIN
+        CREATE TABLE IF NOT EXISTS `{{ preprocessed_table }}`
+        COPY `{{ previous_preprocessed_table }}`;
+    EXCEPTION WHEN ERROR THEN
+        /* There is no previous data version, the preprocessed table is refreshed in
+        place or built from all the transactions */
+    END;
+END IF;
+
+{% endif %}
+IF incremental THEN
+    BEGIN
+        SET (high_water_mark, id_offset) = (
+            SELECT AS STRUCT MAX(p.datetime_unix_seconds), MAX(p.transaction_id)
+            FROM `{{ preprocessed_table }}` p
+        );
+    EXCEPTION WHEN ERROR THEN
+        /* The preprocessed table does not exist yet */
+        SET (high_water_mark, id_offset) = (NULL, 0);
+    END;
+    SET lookback_start = high_water_mark - 63072000 - 86400;
+END IF;
+
 CREATE TEMP TABLE merged
 CLUSTER BY mcc, datetime_unix_seconds
 AS (
-    WITH transactions AS (
-        /* Features related to transactions */
+    WITH source AS (
         SELECT
-            ROW_NUMBER() OVER() AS transaction_id,
-            DATETIME(t.year, t.month, t.day, CAST(SUBSTR(t.time, 1, 2) AS INT), CAST(SUBSTR(t.time, 4, 2) AS INT), 0) AS datetime,
+            s.*,
+            COALESCE(UNIX_SECONDS(CAST(s.datetime AS TIMESTAMP)) > high_water_mark, TRUE) AS is_new,
+
+        FROM (
+            SELECT
+                t.*,
+                DATETIME(t.year, t.month, t.day, CAST(SUBSTR(t.time, 1, 2) AS INT), CAST(SUBSTR(t.time, 4, 2) AS INT), 0) AS datetime,
+
+            FROM `{{ transactions_table }}` t
+        ) s
+    )
+
+    , transactions AS (
+        /* Features related to transactions. The new transactions are numbered after the
+        ones already preprocessed, the older ones only need a unique id in this script */
+        SELECT
+            IF(
+                t.is_new,
+                id_offset + ROW_NUMBER() OVER(PARTITION BY t.is_new),
+                -ROW_NUMBER() OVER(PARTITION BY t.is_new)
+            ) AS transaction_id,
+            t.datetime,
             t.year,
             SIN((CAST(SUBSTR(t.time, 1, 2) AS INT) / 24) * 2 * ACOS(-1)) AS hour_sin,
             COS((CAST(SUBSTR(t.time, 1, 2) AS INT) / 24) * 2 * ACOS(-1)) AS hour_cos,
@@ -22,7 +84,7 @@ AS (
             t.mcc,
             CAST(t.Is_Fraud_ AS INT) AS is_fraud
 
-        FROM `{{ transactions_table }}` t
+        FROM source t
     )
 
     , users AS (
@@ -110,79 +172,270 @@ AS (
 )
 ;
 
+CREATE TEMP TABLE mcc_history AS (
+    /* Totals of the transactions before the lookback start, empty unless refreshing incrementally */
+    SELECT
+        m.mcc,
+        SUM(m.is_fraud) AS is_fraud,
+        COUNT(m.is_fraud) AS is_fraud_count,
+
+    FROM merged m
+
+    WHERE m.datetime_unix_seconds < lookback_start
+
+    GROUP BY m.mcc
+)
+;
+
 CREATE TEMP TABLE mcc_aux AS (
     /* Rolling features related to MCC */
     SELECT
         m.transaction_id,
-        COALESCE(SUM(m.is_fraud) OVER(mcc_window) / COUNT(m.is_fraud) OVER(mcc_window), 0) AS mcc_mean_encoding
+        COALESCE(
+            SAFE_DIVIDE(
+                COALESCE(SUM(m.is_fraud) OVER(mcc_window), 0) + COALESCE(h.is_fraud, 0),
+                COUNT(m.is_fraud) OVER(mcc_window) + COALESCE(h.is_fraud_count, 0)
+            ),
+            0
+        ) AS mcc_mean_encoding
 
     FROM merged m
+
+    LEFT JOIN mcc_history h
+        ON m.mcc = h.mcc
+
+    WHERE lookback_start IS NULL OR m.datetime_unix_seconds >= lookback_start
     WINDOW mcc_window AS (PARTITION BY m.mcc ORDER BY m.datetime_unix_seconds RANGE BETWEEN UNBOUNDED PRECEDING AND {{ fraud_delay_seconds }} PRECEDING)
 )
 ;
 
+CREATE TEMP TABLE user_history AS (
+    /* Totals of the transactions before the lookback start, empty unless refreshing incrementally */
+    SELECT
+        m.user,
+        SUM(m.amount) AS amount,
+        COUNT(m.transaction_id) AS transaction_count,
+        MIN(m.datetime) AS first_datetime,
+
+    FROM merged m
+
+    WHERE m.datetime_unix_seconds < lookback_start
+
+    GROUP BY m.user
+)
+;
+
 CREATE TEMP TABLE user_aux
 CLUSTER BY user, datetime_unix_seconds
 /* Rolling features related to users */
 AS (
     SELECT
-        m.*,
-        COALESCE(AVG(m.amount) OVER(user_window), 0) AS mean_amount,
-        COUNT(m.transaction_id) OVER(user_window) AS transaction_count,
-        DATE_DIFF(m.datetime, MIN(m.datetime) OVER(PARTITION BY m.user), DAY) AS days_since_first_transaction,
+        m.transaction_id,
+        m.user,
+        m.datetime_unix_seconds,
+        CAST(FLOOR(m.datetime_unix_seconds / 86400) AS INT64) AS unix_day,
+        MOD(m.datetime_unix_seconds, 86400) AS second_of_day,
+        m.amount,
+        COALESCE(
+            SAFE_DIVIDE(
+                COALESCE(SUM(m.amount) OVER user_window, 0) + COALESCE(h.amount, 0),
+                COUNT(m.transaction_id) OVER user_window + COALESCE(h.transaction_count, 0)
+            ),
+            0
+        ) AS mean_amount,
+        COUNT(m.transaction_id) OVER user_window + COALESCE(h.transaction_count, 0) AS transaction_count,
+        DATE_DIFF(m.datetime, COALESCE(h.first_datetime, MIN(m.datetime) OVER(PARTITION BY m.user)), DAY) AS days_since_first_transaction,
 
     FROM merged m
+
+    LEFT JOIN user_history h
+        ON m.user = h.user
+
+    WHERE lookback_start IS NULL OR m.datetime_unix_seconds >= lookback_start
     WINDOW user_window AS (PARTITION BY m.user ORDER BY m.datetime ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING)
 )
 ;
 
 CREATE TEMP TABLE rolling_aux_amount_frequency AS (
-    /* Rolling features related to transaction amount and frquency */
-    WITH tmp AS (
+    /* Rolling features related to transaction amount and frquency. A window of N days before a
+    transaction is split in the N whole days before the day of the transaction, summed over the
+    number and amount of the transactions of each user per day, and an intraday correction: the
+    transactions earlier on the same day are added, and the ones on the first of the N days
+    earlier than the time of day of the transaction are subtracted */
+    WITH daily AS (
+        SELECT
+            r.user,
+            r.unix_day,
+            COUNT(r.transaction_id) AS n_transactions,
+            SUM(r.amount) AS amount,
+
+        FROM user_aux r
+
+        GROUP BY r.user, r.unix_day
+    )
+
+    , daily_windows AS (
+        SELECT
+            d.user,
+            d.unix_day,
+            SUM(d.n_transactions) OVER daily_window_1_days AS n_transactions_1_days,
+            SUM(d.amount) OVER daily_window_1_days AS amount_1_days,
+            SUM(d.n_transactions) OVER daily_window_2_days AS n_transactions_2_days,
+            SUM(d.amount) OVER daily_window_2_days AS amount_2_days,
+            SUM(d.n_transactions) OVER daily_window_7_days AS n_transactions_7_days,
+            SUM(d.amount) OVER daily_window_7_days AS amount_7_days,
+            SUM(d.n_transactions) OVER daily_window_30_days AS n_transactions_30_days,
+            SUM(d.amount) OVER daily_window_30_days AS amount_30_days,
+            SUM(d.n_transactions) OVER daily_window_year AS n_transactions_year,
+            SUM(d.amount) OVER daily_window_year AS amount_year,
+
+        FROM daily d
+        WINDOW
+            daily_window_1_days AS (PARTITION BY d.user ORDER BY d.unix_day RANGE BETWEEN 1 PRECEDING AND 1 PRECEDING),
+            daily_window_2_days AS (PARTITION BY d.user ORDER BY d.unix_day RANGE BETWEEN 2 PRECEDING AND 1 PRECEDING),
+            daily_window_7_days AS (PARTITION BY d.user ORDER BY d.unix_day RANGE BETWEEN 7 PRECEDING AND 1 PRECEDING),
+            daily_window_30_days AS (PARTITION BY d.user ORDER BY d.unix_day RANGE BETWEEN 30 PRECEDING AND 1 PRECEDING),
+            daily_window_year AS (PARTITION BY d.user ORDER BY d.unix_day RANGE BETWEEN 365 PRECEDING AND 1 PRECEDING)
+    )
+
+    , windows AS (
+        SELECT 1 AS window_days
+        UNION ALL SELECT 2
+        UNION ALL SELECT 7
+        UNION ALL SELECT 30
+        UNION ALL SELECT 365
+    )
+
+    , intraday_events AS (
+        /* The transactions, and a probe at the time of day of each transaction on the first day
+        of each of its windows */
+        SELECT
+            r.transaction_id,
+            r.user,
+            r.unix_day,
+            r.second_of_day,
+            0 AS window_days,
+            1 AS n_transactions,
+            r.amount,
+
+        FROM user_aux r
+
+        UNION ALL
+
+        SELECT
+            r.transaction_id,
+            r.user,
+            r.unix_day - w.window_days AS unix_day,
+            r.second_of_day,
+            w.window_days,
+            0 AS n_transactions,
+            0 * r.amount AS amount,
+
+        FROM user_aux r
+
+        CROSS JOIN windows w
+    )
+
+    , intraday AS (
         SELECT
-            r.*,
-            COALESCE(AVG(r.amount) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 86400 PRECEDING AND 1 PRECEDING), 0) AS mean_amount_last_1_days,
-            COALESCE(AVG(r.amount) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 172800 PRECEDING AND 1 PRECEDING), 0) AS mean_amount_last_2_days,
-            COALESCE(AVG(r.amount) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 604800 PRECEDING AND 1 PRECEDING), 0) AS mean_amount_last_7_days,
-            COALESCE(AVG(r.amount) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND 1 PRECEDING), 0) AS mean_amount_last_30_days,
-            COALESCE(AVG(r.amount) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND 1 PRECEDING), 0) AS mean_amount_last_year,
+            e.transaction_id,
+            e.window_days,
+            COALESCE(SUM(e.n_transactions) OVER intraday_window, 0) AS n_transactions,
+            COALESCE(SUM(e.amount) OVER intraday_window, 0) AS amount,
+
+        FROM intraday_events e
+        WINDOW intraday_window AS (PARTITION BY e.user, e.unix_day ORDER BY e.second_of_day RANGE BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING)
+    )
+
+    , intraday_corrections AS (
+        SELECT
+            i.transaction_id,
+            SUM(CASE i.window_days WHEN 0 THEN i.n_transactions WHEN 1 THEN -i.n_transactions ELSE 0 END) AS n_transactions_1_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.amount WHEN 1 THEN -i.amount ELSE 0 END) AS amount_1_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.n_transactions WHEN 2 THEN -i.n_transactions ELSE 0 END) AS n_transactions_2_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.amount WHEN 2 THEN -i.amount ELSE 0 END) AS amount_2_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.n_transactions WHEN 7 THEN -i.n_transactions ELSE 0 END) AS n_transactions_7_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.amount WHEN 7 THEN -i.amount ELSE 0 END) AS amount_7_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.n_transactions WHEN 30 THEN -i.n_transactions ELSE 0 END) AS n_transactions_30_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.amount WHEN 30 THEN -i.amount ELSE 0 END) AS amount_30_days,
+            SUM(CASE i.window_days WHEN 0 THEN i.n_transactions WHEN 365 THEN -i.n_transactions ELSE 0 END) AS n_transactions_year,
+            SUM(CASE i.window_days WHEN 0 THEN i.amount WHEN 365 THEN -i.amount ELSE 0 END) AS amount_year,
+
+        FROM intraday i
+
+        GROUP BY i.transaction_id
+    )
+
+    , window_totals AS (
+        SELECT
+            r.transaction_id,
+            r.mean_amount,
+            r.transaction_count,
+            r.days_since_first_transaction,
+            COALESCE(dw.n_transactions_1_days, 0) + c.n_transactions_1_days AS n_transactions_1_days,
+            COALESCE(dw.amount_1_days, 0) + c.amount_1_days AS amount_1_days,
+            COALESCE(dw.n_transactions_2_days, 0) + c.n_transactions_2_days AS n_transactions_2_days,
+            COALESCE(dw.amount_2_days, 0) + c.amount_2_days AS amount_2_days,
+            COALESCE(dw.n_transactions_7_days, 0) + c.n_transactions_7_days AS n_transactions_7_days,
+            COALESCE(dw.amount_7_days, 0) + c.amount_7_days AS amount_7_days,
+            COALESCE(dw.n_transactions_30_days, 0) + c.n_transactions_30_days AS n_transactions_30_days,
+            COALESCE(dw.amount_30_days, 0) + c.amount_30_days AS amount_30_days,
+            COALESCE(dw.n_transactions_year, 0) + c.n_transactions_year AS n_transactions_year,
+            COALESCE(dw.amount_year, 0) + c.amount_year AS amount_year,
+
+        FROM user_aux r
+
+        INNER JOIN daily_windows dw
+            ON r.user = dw.user
+            AND r.unix_day = dw.unix_day
+
+        INNER JOIN intraday_corrections c
+            ON r.transaction_id = c.transaction_id
+    )
+
+    , tmp AS (
+        SELECT
+            w.transaction_id,
+            w.mean_amount,
+            w.transaction_count,
+            w.days_since_first_transaction,
+            COALESCE(SAFE_DIVIDE(w.amount_1_days, w.n_transactions_1_days), 0) AS mean_amount_last_1_days,
+            COALESCE(SAFE_DIVIDE(w.amount_2_days, w.n_transactions_2_days), 0) AS mean_amount_last_2_days,
+            COALESCE(SAFE_DIVIDE(w.amount_7_days, w.n_transactions_7_days), 0) AS mean_amount_last_7_days,
+            COALESCE(SAFE_DIVIDE(w.amount_30_days, w.n_transactions_30_days), 0) AS mean_amount_last_30_days,
+            COALESCE(SAFE_DIVIDE(w.amount_year, w.n_transactions_year), 0) AS mean_amount_last_year,
             IF(
-                r.days_since_first_transaction > 0,
-                (r.transaction_count - 1) / r.days_since_first_transaction,
+                w.days_since_first_transaction > 0,
+                (w.transaction_count - 1) / w.days_since_first_transaction,
                 0
             ) AS transaction_frequency_all,
             IF(
-                r.days_since_first_transaction > 0,
-                COUNT(r.transaction_id) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 86400 PRECEDING AND 1 PRECEDING)
-                    / LEAST(1, r.days_since_first_transaction),
+                w.days_since_first_transaction > 0,
+                w.n_transactions_1_days / LEAST(1, w.days_since_first_transaction),
                 0
             ) AS transaction_frequency_last_1_days,
             IF(
-                r.days_since_first_transaction > 0,
-                COUNT(r.transaction_id) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 172800 PRECEDING AND 1 PRECEDING)
-                    / LEAST(2, r.days_since_first_transaction),
+                w.days_since_first_transaction > 0,
+                w.n_transactions_2_days / LEAST(2, w.days_since_first_transaction),
                 0
             ) AS transaction_frequency_last_2_days,
             IF(
-                r.days_since_first_transaction > 0,
-                COUNT(r.transaction_id) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 604800 PRECEDING AND 1 PRECEDING)
-                    / LEAST(7, r.days_since_first_transaction),
+                w.days_since_first_transaction > 0,
+                w.n_transactions_7_days / LEAST(7, w.days_since_first_transaction),
                 0
             ) AS transaction_frequency_last_7_days,
             IF(
-                r.days_since_first_transaction > 0,
-                COUNT(r.transaction_id) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND 1 PRECEDING)
-                    / LEAST(30, r.days_since_first_transaction),
+                w.days_since_first_transaction > 0,
+                w.n_transactions_30_days / LEAST(30, w.days_since_first_transaction),
                 0
             ) AS transaction_frequency_last_30_days,
             IF(
-                r.days_since_first_transaction > 0,
-                COUNT(r.transaction_id) OVER(PARTITION BY r.user ORDER BY r.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND 1 PRECEDING)
-                    / LEAST(365, r.days_since_first_transaction),
+                w.days_since_first_transaction > 0,
+                w.n_transactions_year / LEAST(365, w.days_since_first_transaction),
                 0
             ) AS transaction_frequency_last_year
 
-        FROM user_aux r
+        FROM window_totals w
     )
     SELECT
         t.transaction_id,
@@ -222,158 +475,75 @@ CREATE TEMP TABLE rolling_aux_amount_frequency AS (
 ;
 
 CREATE TEMP TABLE rolling_aux_frauds
-/* Rolling features related to amount of frauds */
+/* Rolling features related to amount of frauds. The frauds are counted per second first,
+so that the windows run over the distinct timestamps rather than over every transaction */
 AS (
-    WITH tmp1 AS (
+    WITH frauds_per_second AS (
         SELECT
-            m.transaction_id,
-            m.year,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_2_years,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_365_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_60_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_30_days,
+            m.datetime_unix_seconds,
+            SUM(m.is_fraud) AS is_fraud,
+            COUNT(m.is_fraud) AS is_fraud_count,
+            SUM(m.fraud_swipe) AS fraud_swipe,
+            COUNT(m.fraud_swipe) AS fraud_swipe_count,
+            SUM(m.fraud_chip) AS fraud_chip,
+            COUNT(m.fraud_chip) AS fraud_chip_count,
+            SUM(m.fraud_online) AS fraud_online,
+            COUNT(m.fraud_online) AS fraud_online_count,
+            SUM(m.fraud_card_present) AS fraud_card_present,
+            COUNT(m.fraud_card_present) AS fraud_card_present_count,
 
         FROM merged m
 
-        WHERE m.year <= 2000
-    )
-
-    , tmp2 AS (
-        SELECT
-            m.transaction_id,
-            m.year,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_2_years,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_365_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_60_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_30_days,
+        WHERE lookback_start IS NULL OR m.datetime_unix_seconds >= lookback_start
 
-        FROM merged m
-
-        WHERE m.year BETWEEN 1998 AND 2010
+        GROUP BY m.datetime_unix_seconds
     )
 
-    , tmp3 AS (
+    , rolling_frauds_per_second AS (
         SELECT
-            m.transaction_id,
-            m.year,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_2_years,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_365_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_60_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_30_days,
-
-        FROM merged m
-
-        WHERE m.year BETWEEN 2008 AND 2015
+            s.datetime_unix_seconds,
+            COALESCE(SAFE_DIVIDE(SUM(s.is_fraud) OVER window_2_years, SUM(s.is_fraud_count) OVER window_2_years), 0) AS fraud_rolling_mean_2_years,
+            COALESCE(SAFE_DIVIDE(SUM(s.is_fraud) OVER window_365_days, SUM(s.is_fraud_count) OVER window_365_days), 0) AS fraud_rolling_mean_365_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.is_fraud) OVER window_60_days, SUM(s.is_fraud_count) OVER window_60_days), 0) AS fraud_rolling_mean_60_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.is_fraud) OVER window_30_days, SUM(s.is_fraud_count) OVER window_30_days), 0) AS fraud_rolling_mean_30_days,
+
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_swipe) OVER window_2_years, SUM(s.fraud_swipe_count) OVER window_2_years), 0) AS fraud_swipe_rolling_mean_2_years,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_swipe) OVER window_365_days, SUM(s.fraud_swipe_count) OVER window_365_days), 0) AS fraud_swipe_rolling_mean_365_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_swipe) OVER window_60_days, SUM(s.fraud_swipe_count) OVER window_60_days), 0) AS fraud_swipe_rolling_mean_60_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_swipe) OVER window_30_days, SUM(s.fraud_swipe_count) OVER window_30_days), 0) AS fraud_swipe_rolling_mean_30_days,
+
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_chip) OVER window_2_years, SUM(s.fraud_chip_count) OVER window_2_years), 0) AS fraud_chip_rolling_mean_2_years,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_chip) OVER window_365_days, SUM(s.fraud_chip_count) OVER window_365_days), 0) AS fraud_chip_rolling_mean_365_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_chip) OVER window_60_days, SUM(s.fraud_chip_count) OVER window_60_days), 0) AS fraud_chip_rolling_mean_60_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_chip) OVER window_30_days, SUM(s.fraud_chip_count) OVER window_30_days), 0) AS fraud_chip_rolling_mean_30_days,
+
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_online) OVER window_2_years, SUM(s.fraud_online_count) OVER window_2_years), 0) AS fraud_online_rolling_mean_2_years,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_online) OVER window_365_days, SUM(s.fraud_online_count) OVER window_365_days), 0) AS fraud_online_rolling_mean_365_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_online) OVER window_60_days, SUM(s.fraud_online_count) OVER window_60_days), 0) AS fraud_online_rolling_mean_60_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_online) OVER window_30_days, SUM(s.fraud_online_count) OVER window_30_days), 0) AS fraud_online_rolling_mean_30_days,
+
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_card_present) OVER window_2_years, SUM(s.fraud_card_present_count) OVER window_2_years), 0) AS fraud_card_present_rolling_mean_2_years,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_card_present) OVER window_365_days, SUM(s.fraud_card_present_count) OVER window_365_days), 0) AS fraud_card_present_rolling_mean_365_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_card_present) OVER window_60_days, SUM(s.fraud_card_present_count) OVER window_60_days), 0) AS fraud_card_present_rolling_mean_60_days,
+            COALESCE(SAFE_DIVIDE(SUM(s.fraud_card_present) OVER window_30_days, SUM(s.fraud_card_present_count) OVER window_30_days), 0) AS fraud_card_present_rolling_mean_30_days,
+
+        FROM frauds_per_second s
+        WINDOW
+            window_2_years AS (ORDER BY s.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING),
+            window_365_days AS (ORDER BY s.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING),
+            window_60_days AS (ORDER BY s.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING),
+            window_30_days AS (ORDER BY s.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING)
     )
 
-    , tmp4 AS (
+    , all_years AS (
         SELECT
             m.transaction_id,
-            m.year,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_2_years,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_365_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_60_days,
-            COALESCE(AVG(m.is_fraud) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_swipe) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_swipe_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_chip) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_chip_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_online) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_online_rolling_mean_30_days,
-
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 63072000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_2_years,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 31536000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_365_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 5184000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_60_days,
-            COALESCE(AVG(m.fraud_card_present) OVER (ORDER BY m.datetime_unix_seconds RANGE BETWEEN 2592000 PRECEDING AND {{ fraud_delay_seconds }} PRECEDING), 0) AS fraud_card_present_rolling_mean_30_days,
+            r.* EXCEPT(datetime_unix_seconds),
 
         FROM merged m
 
-        WHERE m.year >= 2013
-    )
-
-    , all_years AS (
-        SELECT * EXCEPT(year) FROM tmp1
-
-        UNION ALL
-
-        SELECT * EXCEPT(year) FROM tmp2 WHERE year BETWEEN 2001 AND 2010
-
-        UNION ALL
-
-        SELECT * EXCEPT(year) FROM tmp3 WHERE year BETWEEN 2011 AND 2015
-
-        UNION ALL
-
-        SELECT * EXCEPT(year) FROM tmp4 WHERE year >= 2016
+        INNER JOIN rolling_frauds_per_second r
+            ON m.datetime_unix_seconds = r.datetime_unix_seconds
     )
 
     SELECT
@@ -427,14 +597,7 @@ AS (
 )
 ;
 
-{% if create_replace_table is sameas true %}
-CREATE OR REPLACE TABLE
-{% else %}
-CREATE TABLE IF NOT EXISTS
-{% endif %}
-`{{ preprocessed_table }}`
-CLUSTER BY datetime_unix_seconds
-AS (
+CREATE TEMP TABLE preprocessed_rows AS (
     SELECT
         m.transaction_id,
         m.datetime_unix_seconds,
@@ -451,5 +614,31 @@ AS (
 
     INNER JOIN rolling_aux_frauds rf
         ON m.transaction_id = rf.transaction_id
+
+    WHERE high_water_mark IS NULL OR m.datetime_unix_seconds > high_water_mark
 )
 ;
+
+IF high_water_mark IS NOT NULL THEN
+    MERGE `{{ preprocessed_table }}` p
+    USING preprocessed_rows n
+        ON p.datetime_unix_seconds > high_water_mark
+        AND p.transaction_id = n.transaction_id
+    WHEN NOT MATCHED THEN
+        INSERT ROW
+    ;
+ELSE
+    /* Monthly partitions from 1990 to 2030 */
+    {% if create_replace_table is sameas true %}
+    CREATE OR REPLACE TABLE
+    {% else %}
+    CREATE TABLE IF NOT EXISTS
+    {% endif %}
+    `{{ preprocessed_table }}`
+    PARTITION BY RANGE_BUCKET(datetime_unix_seconds, GENERATE_ARRAY(631152000, 1893456000, 2592000))
+    CLUSTER BY datetime_unix_seconds
+    AS (
+        SELECT * FROM preprocessed_rows
+    )
+    ;
+END IF;
@@ -1,58 +1,82 @@
-/* Use older data for training. Use APPROX_QUANTILES otherwise BQ runs out of memory.*/
-DECLARE train_limit INT64 DEFAULT (
-    SELECT APPROX_QUANTILES(datetime_unix_seconds, 100)[OFFSET(CAST(100 * (1 - {{ valid_size }} - {{ test_size }}) AS INT))] train_limit
-    FROM `{{ source_table }}`
-)
-;
-
-{% if create_replace_table is sameas true %}
-CREATE OR REPLACE TABLE
-{% else %}
-CREATE TABLE IF NOT EXISTS
-{% endif %}
-`{{ training_table }}` AS (
-    SELECT t.* EXCEPT(datetime_unix_seconds)
-
-    FROM `{{ source_table }}` t
+/* Split the source table in a single pass. Each transaction is labelled with its split
+(0 training, 1 validation, 2 testing) in a table partitioned by split, so that each split
+can be extracted from its own partition (e.g. `split_table$1` for validation).
 
-    WHERE t.datetime_unix_seconds < train_limit
-)
-;
+Incremental refresh: only the transactions of the source table newer than the latest one
+already split (the high-water mark) are labelled and merged into the table, the training
+set keeps its time limit. On the first refresh of a new data version, the split table of
+the previous data version (if any) is copied and used as checkpoint. */
+DECLARE incremental BOOL DEFAULT {{ incremental_refresh | default(false) }};
+DECLARE high_water_mark INT64 DEFAULT NULL;
+DECLARE train_limit INT64 DEFAULT NULL;
 
-/* Randomly split newer data into test and validation sets. */
-CREATE TEMP TABLE validation_testing AS (
-    SELECT t.* EXCEPT(datetime_unix_seconds)
-
-    FROM `{{ source_table }}` t
+{% if previous_split_table is defined %}
+IF incremental THEN
+    BEGIN
+        CREATE TABLE IF NOT EXISTS `{{ split_table }}`
+        COPY `{{ previous_split_table }}`;
+    EXCEPTION WHEN ERROR THEN
+        /* There is no previous data version, the split table is refreshed in place or
+        built from all the transactions */
+    END;
+END IF;
 
-    WHERE t.datetime_unix_seconds >= train_limit
-)
-;
-
-{% if create_replace_table is sameas true %}
-CREATE OR REPLACE TABLE
-{% else %}
-CREATE TABLE IF NOT EXISTS
 {% endif %}
-`{{ validation_table }}` AS (
-    SELECT t.*
+IF incremental THEN
+    BEGIN
+        SET high_water_mark = (
+            SELECT MAX(s.datetime_unix_seconds)
+            FROM `{{ source_table }}` s
+            WHERE s.transaction_id <= (SELECT MAX(t.transaction_id) FROM `{{ split_table }}` t)
+        );
+    EXCEPTION WHEN ERROR THEN
+        /* The split table does not exist yet */
+        SET high_water_mark = NULL;
+    END;
+END IF;
 
-    FROM validation_testing t
+IF high_water_mark IS NULL THEN
+    /* Use older data for training. Use APPROX_QUANTILES otherwise BQ runs out of memory.*/
+    SET train_limit = (
+        SELECT APPROX_QUANTILES(datetime_unix_seconds, 100)[OFFSET(CAST(100 * (1 - {{ valid_size }} - {{ test_size }}) AS INT))] train_limit
+        FROM `{{ source_table }}`
+    );
+END IF;
 
-    WHERE ABS(MOD(t.transaction_id, 100)) < CAST({{ valid_size }} / ({{ valid_size }} + {{ test_size }}) * 100 AS INT)
-)
-;
+CREATE TEMP TABLE labelled AS (
+    /* Randomly split newer data into test and validation sets. */
+    SELECT
+        CASE
+            WHEN t.datetime_unix_seconds < train_limit THEN 0
+            WHEN ABS(MOD(t.transaction_id, 100)) < CAST({{ valid_size }} / ({{ valid_size }} + {{ test_size }}) * 100 AS INT) THEN 1
+            ELSE 2
+        END AS split,
+        t.* EXCEPT(datetime_unix_seconds)
 
-{% if create_replace_table is sameas true %}
-CREATE OR REPLACE TABLE
-{% else %}
-CREATE TABLE IF NOT EXISTS
-{% endif %}
-`{{ testing_table }}` AS (
-    SELECT t.*
-
-    FROM validation_testing t
+    FROM `{{ source_table }}` t
 
-    WHERE ABS(MOD(t.transaction_id, 100)) >= CAST({{ valid_size }} / ({{ valid_size }} + {{ test_size }}) * 100 AS INT)
+    WHERE high_water_mark IS NULL OR t.datetime_unix_seconds > high_water_mark
 )
 ;
+
+IF high_water_mark IS NOT NULL THEN
+    MERGE `{{ split_table }}` d
+    USING labelled n
+        ON d.transaction_id = n.transaction_id
+    WHEN NOT MATCHED THEN
+        INSERT ROW
+    ;
+ELSE
+    {% if create_replace_table is sameas true %}
+    CREATE OR REPLACE TABLE
+    {% else %}
+    CREATE TABLE IF NOT EXISTS
+    {% endif %}
+    `{{ split_table }}`
+    PARTITION BY RANGE_BUCKET(split, GENERATE_ARRAY(0, 3, 1))
+    CLUSTER BY transaction_id
+    AS (
+        SELECT * FROM labelled
+    )
+    ;
+END IF;
@@ -5,31 +5,58 @@ import joblib
 import pandas as pd
 import uvicorn
 from fastapi import FastAPI, Response, status
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 from loguru import logger
 
+from src.base.artifacts import MANIFEST_FILE, artifact_files, load_model_artifact
 from src.serving_api.models import Data, Prediction
 
 global_items = {}
 model_file = "model.joblib"
+local_model_dir = "/tmp/model"
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    path = os.environ.get("AIP_STORAGE_URI", "/tmp/model")
-    path = os.path.join(path, model_file)
-    logger.info(f"Loading model file from {path}.")
+def download_file(storage_client: storage.Client, path: str, file_name: str) -> str:
+    dest_file_name = os.path.join(local_model_dir, file_name)
+    try:
+        with open(dest_file_name, "wb") as f:
+            storage_client.download_blob_to_file(os.path.join(path, file_name), f)
+    except Exception as e:
+        # Do not leave an empty or partial file, e.g. a manifest loaded later on
+        os.remove(dest_file_name)
+        raise e
+    logger.info(f"Downloaded {file_name} from GCS to {dest_file_name}.")
+    return dest_file_name
+
+
+def load_model(path: str):
+    logger.info(f"Loading model from {path}.")
 
     if path.startswith("gs://"):
-        dest_file_name = f"/tmp/{model_file}"
+        os.makedirs(local_model_dir, exist_ok=True)
         storage_client = storage.Client()
-        with open(dest_file_name, "wb") as f:
-            storage_client.download_blob_to_file(path, f)
-        logger.info(f"Downloaded model file from GCS to {dest_file_name}.")
-    else:
-        dest_file_name = path
+        try:
+            download_file(storage_client, path, MANIFEST_FILE)
+            for file_name in artifact_files(local_model_dir)[1:]:
+                download_file(storage_client, path, file_name)
+        except NotFound:
+            logger.warning(f"Model artifact not found, falling back to {model_file}.")
+            if os.path.exists(os.path.join(local_model_dir, MANIFEST_FILE)):
+                os.remove(os.path.join(local_model_dir, MANIFEST_FILE))
+            return joblib.load(download_file(storage_client, path, model_file))
+        return load_model_artifact(local_model_dir)
+
+    if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return load_model_artifact(path)
+    logger.warning(f"Model artifact not found, falling back to {model_file}.")
+    return joblib.load(os.path.join(path, model_file))
+
 
-    global_items["model"] = joblib.load(dest_file_name)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    path = os.environ.get("AIP_STORAGE_URI", local_model_dir)
+    global_items["model"] = load_model(path)
     logger.info("Successfully loaded model.")
     yield
 
@@ -0,0 +1,152 @@
+import json
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from loguru import logger
+
+# Statistics of BigQuery query and extract jobs, missing ones are recorded as None
+JOB_STATISTICS = (
+    "total_bytes_processed",
+    "total_bytes_billed",
+    "slot_millis",
+    "cache_hit",
+    "num_dml_affected_rows",
+    "destination_uri_file_counts",
+)
+# Statistics of the stages of the query plan of a job
+STAGE_STATISTICS = ("slot_ms", "records_read", "records_written")
+
+
+def _elapsed_ms(start: Any, end: Any) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds() * 1000
+
+
+class JobStatistics:
+    """Record the statistics of named BigQuery jobs.
+
+    The statistics of each job (bytes processed and billed, slot milliseconds,
+    cache hit, elapsed time and the timings of the stages of its query plan) are
+    read from the job once it has completed, so that the performance of the
+    queries can be tracked over time as KFP metrics or a JSON artifact.
+
+    Example:
+        >>> from types import SimpleNamespace
+        >>> statistics = JobStatistics()
+        >>> query_job = SimpleNamespace(total_bytes_processed=1024, cache_hit=True)
+        >>> _ = statistics.record("query", query_job)
+        >>> statistics.metrics()
+        {'query_total_bytes_processed': 1024.0, 'query_cache_hit': 1.0}
+    """
+
+    def __init__(self) -> None:
+        """Create an empty record of job statistics."""
+        self.records: dict[str, dict] = {}
+
+    def record(self, name: str, job: Any) -> dict:
+        """Record the statistics of a completed job.
+
+        Args:
+            name (str): Name of the job, e.g. "preprocessing".
+            job (Any): BigQuery query or extract job, or any object with the same
+                attributes. Attributes missing from the job are recorded as None.
+
+        Returns:
+            dict: Statistics of the job.
+        """
+        statistics = {"job_id": getattr(job, "job_id", None)}
+        for attribute in JOB_STATISTICS:
+            statistics[attribute] = getattr(job, attribute, None)
+        statistics["elapsed_ms"] = _elapsed_ms(
+            getattr(job, "started", None), getattr(job, "ended", None)
+        )
+        statistics["stages"] = [
+            {
+                "name": stage.name,
+                **{s: getattr(stage, s, None) for s in STAGE_STATISTICS},
+                "elapsed_ms": _elapsed_ms(stage.start, stage.end),
+            }
+            for stage in getattr(job, "query_plan", None) or []
+        ]
+        self.records[name] = statistics
+        logger.info(
+            f"Job {name} processed {statistics['total_bytes_processed']} bytes, "
+            f"billed {statistics['total_bytes_billed']} bytes and used "
+            f"{statistics['slot_millis']} slot milliseconds."
+        )
+        return statistics
+
+    def dry_run(
+        self,
+        name: str,
+        client: Any,
+        query: str,
+        job_config: Any,
+        max_bytes_processed: Optional[int] = None,
+    ) -> int:
+        """Dry-run a query, and fail if it would process too many bytes.
+
+        Args:
+            name (str): Name of the query, the estimate is recorded as
+                `{name}_dry_run`.
+            client (Any): BigQuery client, or any object with the same `query`
+                method.
+            query (str): SQL query or script to dry-run.
+            job_config (Any): Configuration of the query job, with `dry_run` set
+                to True.
+            max_bytes_processed (Optional[int]): Maximum number of bytes the query
+                is allowed to process. If None, there is no limit. Defaults to
+                None.
+
+        Returns:
+            int: Estimated number of bytes processed by the query.
+
+        Raises:
+            ValueError: If the estimate is greater than `max_bytes_processed`.
+        """
+        query_job = client.query(query, job_config=job_config)
+        estimate = query_job.total_bytes_processed
+        self.records[f"{name}_dry_run"] = {"estimated_bytes_processed": estimate}
+        logger.info(f"Query {name} will process {estimate} bytes.")
+        if max_bytes_processed is not None and estimate > max_bytes_processed:
+            msg = (
+                f"Query {name} would process {estimate} bytes, more than the "
+                f"maximum of {max_bytes_processed} bytes."
+            )
+            logger.error(msg)
+            raise ValueError(msg)
+        return estimate
+
+    def metrics(self) -> dict:
+        """Numeric statistics of each job, keyed by `{job name}_{statistic}`.
+
+        Returns:
+            dict: Numeric statistics, with the cache hits converted to 0 / 1.
+        """
+        metrics = {}
+        for name, statistics in self.records.items():
+            for k, v in statistics.items():
+                if isinstance(v, (bool, int, float)):
+                    metrics[f"{name}_{k}"] = float(v)
+        return metrics
+
+    def log_metrics(self, metrics) -> None:
+        """Log the numeric statistics to a KFP Metrics artifact.
+
+        Args:
+            metrics (Output[Metrics]): Metrics artifact of the component.
+        """
+        for k, v in self.metrics().items():
+            metrics.log_metric(k, v)
+
+    def to_json(self, path: Union[str, Path]) -> None:
+        """Save the statistics of each job to a JSON file.
+
+        Args:
+            path (Union[str, Path]): Path of the output file.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.records, f, indent=2, default=str)
+        logger.info(f"Saved job statistics to {path}.")
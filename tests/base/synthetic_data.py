@@ -0,0 +1,42 @@
+from typing import Optional
+
+import numpy as np
+
+from src.base.data import TabularData
+
+
+def make_data(
+    n_rows: int,
+    seed: int,
+    n_features: int = 4,
+    informative: Optional[list[int]] = None,
+    scales: Optional[list[float]] = None,
+    fraud_rate: float = 0.1,
+) -> TabularData:
+    """Synthetic data of the models tests, the frauds having shifted features.
+
+    Args:
+        n_rows (int): Number of rows.
+        seed (int): Seed of the random generator.
+        n_features (int): Optional, default 4. Number of features, named `f0`,
+            `f1`, ...
+        informative (Optional[list[int]]): Optional, default None. Indices of the
+            features shifted by 1 for the frauds. If None, all the features are.
+        scales (Optional[list[float]]): Optional, default None. Scale of each
+            feature, applied before the shift. If None, all the scales are 1.
+        fraud_rate (float): Optional, default 0.1. Expected proportion of frauds.
+
+    Returns:
+        TabularData: The float32 features and the int8 target.
+    """
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n_rows) < fraud_rate).astype(np.int8)
+    X = rng.normal(size=(n_rows, n_features)) * np.asarray(scales or 1)
+    columns = slice(None) if informative is None else informative
+    X[:, columns] += y[:, None]
+    return TabularData(
+        X=X.astype(np.float32),
+        y=y,
+        ids=np.arange(n_rows),
+        feature_names=[f"f{i}" for i in range(n_features)],
+    )
@@ -0,0 +1,139 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xmlrunner
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from src.base.artifacts import artifact_files, load_model_artifact, save_model_artifact
+from src.base.boosting import CachedBoosterClassifier
+from src.base.model import SamplingCorrectedClassifier, build_classifier, build_scaler
+
+
+class TestModelArtifact(unittest.TestCase):
+
+    rng = np.random.default_rng(0)
+    y = (rng.random(1000) < 0.2).astype(np.int8)
+    X = (rng.normal(size=(1000, 5)) + y[:, None]).astype(np.float32)
+    X_missing = X.copy()
+    X_missing[::13, 2] = np.nan
+    feature_names = [f"feature_{i}" for i in range(5)]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_same_predictions(self, model, X):
+        save_model_artifact(model, self.tmp_dir.name, self.feature_names)
+        artifact = load_model_artifact(self.tmp_dir.name)
+        np.testing.assert_allclose(
+            artifact.predict_proba(X), model.predict_proba(X), atol=1e-6
+        )
+        np.testing.assert_array_equal(artifact.predict(X), model.predict(X))
+
+    def test_model_families(self):
+        for model_name in (
+            "logistic_regression",
+            "sgd_classifier",
+            "random_forest",
+            "lightgbm",
+            "xgboost",
+        ):
+            for data_standardization in ("standard", "min_max", "none"):
+                with self.subTest(model=model_name, scaler=data_standardization):
+                    params = (
+                        {"loss": "log_loss"} if model_name == "sgd_classifier" else {}
+                    )
+                    if model_name in ("random_forest", "lightgbm", "xgboost"):
+                        params["n_estimators"] = 10
+                    classifier, _ = build_classifier(model_name, params)
+                    scaler = build_scaler(data_standardization)
+                    model = classifier
+                    if scaler is not None:
+                        model = Pipeline(
+                            [("scaler", scaler), ("classifier", classifier)]
+                        )
+                    # Only the boosting models support missing values
+                    X = (
+                        self.X_missing
+                        if model_name in ("lightgbm", "xgboost")
+                        else self.X
+                    )
+                    model.fit(X, self.y)
+                    self.assert_same_predictions(model, X)
+
+    def test_wrapped_models(self):
+        booster = CachedBoosterClassifier(
+            "lightgbm", {"n_estimators": 10}, cache_dir=self.tmp_dir.name
+        )
+        self.assert_same_predictions(
+            booster.fit(self.X_missing, self.y), self.X_missing
+        )
+        # Only the trees up to the best round are exported
+        booster = CachedBoosterClassifier(
+            "xgboost",
+            {"n_estimators": 200, "learning_rate": 0.5, "early_stopping_rounds": 3},
+            cache_dir=self.tmp_dir.name,
+        )
+        rng = np.random.default_rng(1)
+        X_noise = rng.normal(size=(300, 5)).astype(np.float32)
+        y_noise = (rng.random(300) < 0.2).astype(np.int8)
+        booster.fit(self.X, self.y, eval_set=[(X_noise, y_noise)])
+        self.assertLess(booster.booster_.best_iteration + 1, 200)
+        self.assert_same_predictions(booster, self.X)
+
+        classifier, _ = build_classifier("logistic_regression")
+        corrected = SamplingCorrectedClassifier(classifier, 0.1).fit(self.X, self.y)
+        self.assert_same_predictions(corrected, self.X)
+
+    def test_memory_mapped_load(self):
+        classifier, _ = build_classifier("random_forest", {"n_estimators": 5})
+        save_model_artifact(
+            classifier.fit(self.X, self.y), self.tmp_dir.name, self.feature_names
+        )
+
+        artifact = load_model_artifact(self.tmp_dir.name)
+        self.assertIsInstance(artifact.arrays["model"]["threshold"], np.memmap)
+        self.assertEqual(artifact_files(self.tmp_dir.name)[0], "manifest.json")
+
+        # Columns of a DataFrame are selected by name
+        df = pd.DataFrame(self.X, columns=self.feature_names)
+        np.testing.assert_allclose(
+            artifact.predict_proba(df[self.feature_names[::-1]]),
+            classifier.predict_proba(self.X),
+        )
+
+    def test_unsupported_model(self):
+        classifier = SGDClassifier(loss="hinge").fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            save_model_artifact(classifier, self.tmp_dir.name, self.feature_names)
+
+    def test_reused_folder(self):
+        folder = Path(self.tmp_dir.name)
+        classifier, _ = build_classifier("random_forest", {"n_estimators": 3})
+        save_model_artifact(classifier.fit(self.X, self.y), folder, self.feature_names)
+        classifier, _ = build_classifier("logistic_regression")
+        model = Pipeline(
+            [("scaler", build_scaler("standard")), ("classifier", classifier)]
+        ).fit(self.X, self.y)
+        self.assert_same_predictions(model, self.X)
+        self.assertEqual(
+            sorted(p.name for p in folder.iterdir()), sorted(artifact_files(folder))
+        )
+
+        # The previous artifact is not left behind when the export fails
+        model = Pipeline(
+            [("scaler", build_scaler("min_max")), ("classifier", SGDClassifier())]
+        ).fit(self.X, self.y)
+        with self.assertRaises(ValueError):
+            save_model_artifact(model, folder, self.feature_names)
+        self.assertEqual(list(folder.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
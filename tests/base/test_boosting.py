@@ -0,0 +1,193 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import xmlrunner
+from xgboost import XGBClassifier
+
+from src.base.boosting import (
+    CachedBoosterClassifier,
+    binned_dataset_key,
+    data_digest,
+    lightgbm_train_params,
+    xgboost_train_params,
+)
+from src.base.model import build_classifier, train_model
+
+
+class TestCachedBoosterClassifier(unittest.TestCase):
+
+    rng = np.random.default_rng(0)
+    y = (rng.random(500) < 0.2).astype(np.int8)
+    X = rng.normal(size=(500, 4)) + y[:, None]
+    X_valid = rng.normal(size=(200, 4))
+    y_valid = (rng.random(200) < 0.2).astype(np.int8)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_binned_dataset_key(self):
+        version = "20230101T000000"
+        key = binned_dataset_key(version, ["a", "b"], 10, {"max_bin": 63})
+
+        self.assertEqual(
+            key, binned_dataset_key(version, ["a", "b"], 10, {"max_bin": 63})
+        )
+        self.assertNotEqual(key, binned_dataset_key("20230102T000000", ["a", "b"], 10))
+        self.assertNotEqual(
+            key, binned_dataset_key(version, ["b", "a"], 10, {"max_bin": 63})
+        )
+        self.assertNotEqual(
+            key, binned_dataset_key(version, ["a", "b"], 10, {"max_bin": 31})
+        )
+
+    def test_cache_is_reused(self):
+        for booster, suffix in (("lightgbm", "lgb.bin"), ("xgboost", "dmatrix")):
+            params = dict(n_estimators=10, random_state=42)
+            clf1 = CachedBoosterClassifier(booster, params, self.tmp_dir.name, booster)
+            clf1.fit(self.X, self.y, eval_set=[(self.X_valid, self.y_valid)])
+
+            cached = sorted(
+                p.name for p in Path(self.tmp_dir.name).glob(f"{booster}_*")
+            )
+            valid_key = f"{booster}_valid_{data_digest(self.X_valid, self.y_valid)}"
+            self.assertEqual(
+                cached, [f"{booster}_train.{suffix}", f"{valid_key}.{suffix}"]
+            )
+
+            # The second model is trained on the cached datasets, not on the arrays
+            clf2 = CachedBoosterClassifier(booster, params, self.tmp_dir.name, booster)
+            clf2.fit(
+                np.zeros_like(self.X), self.y, eval_set=[(self.X_valid, self.y_valid)]
+            )
+            np.testing.assert_allclose(
+                clf1.predict_proba(self.X), clf2.predict_proba(self.X), rtol=1e-6
+            )
+
+    def test_new_eval_set(self):
+        # New validation rows, e.g. from an incremental split refresh, with the
+        # same training set
+        X_new = np.vstack([self.X_valid, self.X[:50]])
+        y_new = np.concatenate([self.y_valid, self.y[:50]])
+        for booster in ("lightgbm", "xgboost"):
+            with self.subTest(booster=booster):
+                params = dict(n_estimators=50, early_stopping_rounds=3)
+                for X_valid, y_valid in ((self.X_valid, self.y_valid), (X_new, y_new)):
+                    cached = CachedBoosterClassifier(
+                        booster, params, self.tmp_dir.name, booster
+                    ).fit(self.X, self.y, eval_set=[(X_valid, y_valid)])
+                expected = CachedBoosterClassifier(
+                    booster, params, Path(self.tmp_dir.name) / "new", booster
+                ).fit(self.X, self.y, eval_set=[(X_new, y_new)])
+
+                np.testing.assert_allclose(
+                    cached.predict_proba(self.X), expected.predict_proba(self.X)
+                )
+                self.assertEqual(
+                    len(list(Path(self.tmp_dir.name).glob(f"{booster}_valid_*"))), 2
+                )
+
+    def test_train_params(self):
+        params, num_boost_round = lightgbm_train_params(
+            {"n_estimators": 7, "subsample": 0.8, "bagging_fraction": 0.5}
+        )
+        self.assertEqual(num_boost_round, 7)
+        self.assertEqual(params["objective"], "binary")
+        self.assertEqual(params["bagging_fraction"], 0.5)
+        self.assertEqual(params["min_data_in_leaf"], 20)
+        self.assertNotIn("subsample", params)
+        self.assertNotIn("importance_type", params)
+        with self.assertRaises(ValueError):
+            lightgbm_train_params({"class_weight": "balanced"})
+
+        params, num_boost_round, train_args = xgboost_train_params(
+            {"use_label_encoder": False, "early_stopping_rounds": 5}
+        )
+        self.assertEqual(num_boost_round, XGBClassifier().get_params()["n_estimators"])
+        self.assertEqual(params["objective"], "binary:logistic")
+        self.assertEqual(
+            params["tree_method"], XGBClassifier().get_params()["tree_method"]
+        )
+        self.assertEqual(train_args, {"early_stopping_rounds": 5})
+
+    def test_parity_with_sklearn(self):
+        common = dict(
+            n_estimators=20,
+            learning_rate=0.2,
+            subsample=0.8,
+            colsample_bytree=0.7,
+            reg_lambda=2.0,
+            n_jobs=1,
+        )
+        params = {
+            "lightgbm": dict(
+                common,
+                min_child_samples=10,
+                subsample_freq=1,
+                is_unbalance=True,
+                verbosity=-1,
+            ),
+            "xgboost": dict(common, max_depth=4, min_child_weight=2.0),
+        }
+        for booster, booster_params in params.items():
+            with self.subTest(booster=booster):
+                classifier, _ = build_classifier(booster, booster_params)
+                classifier.fit(self.X, self.y)
+                # Same parameters as in the train_evaluate_model component
+                cached = CachedBoosterClassifier(
+                    booster,
+                    dict(random_state=42, **booster_params),
+                    self.tmp_dir.name,
+                    booster,
+                ).fit(self.X, self.y)
+
+                np.testing.assert_allclose(
+                    cached.predict_proba(self.X_valid),
+                    classifier.predict_proba(self.X_valid),
+                    rtol=1e-5,
+                )
+
+    def test_parity_with_early_stopping(self):
+        params = dict(n_estimators=200, learning_rate=0.3, early_stopping_rounds=5)
+        classifier, _ = build_classifier("xgboost", params)
+        classifier.fit(
+            self.X, self.y, eval_set=[(self.X_valid, self.y_valid)], verbose=False
+        )
+        cached = CachedBoosterClassifier(
+            "xgboost", dict(random_state=42, **params), self.tmp_dir.name
+        ).fit(self.X, self.y, eval_set=[(self.X_valid, self.y_valid)])
+
+        self.assertLess(cached.booster_.best_iteration + 1, 200)
+        np.testing.assert_allclose(
+            cached.predict_proba(self.X_valid),
+            classifier.predict_proba(self.X_valid),
+            rtol=1e-5,
+        )
+
+    def test_train_model_with_cache(self):
+        clf = CachedBoosterClassifier(
+            "lightgbm", {"n_estimators": 10}, self.tmp_dir.name
+        )
+        model, metrics = train_model(
+            clf, self.X, self.y, self.X_valid, self.y_valid, data_sampling="none"
+        )
+
+        self.assertIn("average_precision", metrics)
+        self.assertEqual(model.predict_proba(self.X_valid).shape, (200, 2))
+
+    def test_invalid_booster(self):
+        with self.assertRaises(ValueError):
+            CachedBoosterClassifier("catboost", cache_dir=self.tmp_dir.name).fit(
+                self.X, self.y
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )
@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xmlrunner
+
+from src.base.data import TabularData, load_dataset
+
+
+class TestLoadDataset(unittest.TestCase):
+
+    df = pd.DataFrame({
+        "transaction_id": np.arange(10, dtype=np.int64),
+        "amount": np.linspace(0, 100, 10),
+        "online_transaction": np.array([0, 1] * 5, dtype=np.int64),
+        "mean_amount": np.arange(10, dtype=np.float64) / 3,
+        "is_fraud": np.array([0, 0, 0, 1, 0, 0, 0, 0, 1, 0], dtype=np.int64),
+    })
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "dataset"
+        self.path.mkdir()
+        self.df.iloc[:6].to_parquet(self.path / "file_0.parquet")
+        self.df.iloc[6:].to_parquet(self.path / "file_1.parquet")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_load_dataset_compact_arrays(self):
+        data = load_dataset(self.path, target_column="is_fraud")
+
+        self.assertEqual(data.shape, (10, 3))
+        self.assertEqual(data.feature_names, ["amount", "online_transaction", "mean_amount"])
+        self.assertEqual(data.X.dtype, np.float32)
+        self.assertEqual(data.y.dtype, np.int8)
+        self.assertTrue(data.X.flags["C_CONTIGUOUS"])
+        np.testing.assert_array_equal(np.sort(data.ids), self.df["transaction_id"])
+
+        order = np.argsort(data.ids)
+        np.testing.assert_array_equal(data.y[order], self.df["is_fraud"])
+        np.testing.assert_allclose(data.X[order, 2], self.df["mean_amount"], rtol=1e-6)
+
+    def test_load_dataset_selected_features(self):
+        data = load_dataset(
+            self.path, target_column="is_fraud", feature_columns=["mean_amount", "amount"]
+        )
+
+        self.assertEqual(data.feature_names, ["mean_amount", "amount"])
+        self.assertEqual(data.shape, (10, 2))
+
+    def test_load_dataset_ignores_split_label(self):
+        path = Path(self.tmp_dir.name) / "split"
+        path.mkdir()
+        self.df.assign(split=1).to_parquet(path / "file_0.parquet")
+        data = load_dataset(path, target_column="is_fraud")
+
+        self.assertEqual(data.feature_names, ["amount", "online_transaction", "mean_amount"])
+
+    def test_frame_shares_memory(self):
+        data = load_dataset(self.path, target_column="is_fraud")
+        frame = data.frame
+
+        self.assertEqual(list(frame.columns), data.feature_names)
+        self.assertTrue(np.shares_memory(frame.to_numpy(), data.X))
+
+    def test_save_load_npy_memory_mapped(self):
+        data = load_dataset(self.path, target_column="is_fraud")
+        data.save_npy(Path(self.tmp_dir.name) / "npy")
+        loaded = TabularData.load_npy(Path(self.tmp_dir.name) / "npy")
+
+        self.assertIsInstance(loaded.X, np.memmap)
+        self.assertEqual(loaded.feature_names, data.feature_names)
+        np.testing.assert_array_equal(loaded.X, data.X)
+        np.testing.assert_array_equal(loaded.y, data.y)
+
+    def test_inconsistent_arrays(self):
+        with self.assertRaises(ValueError):
+            TabularData(
+                X=np.zeros((3, 2)), y=np.zeros(4), ids=np.zeros(3), feature_names=["a", "b"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )
@@ -0,0 +1,56 @@
+import unittest
+
+import xmlrunner
+from lightgbm import LGBMClassifier
+
+from src.base.feature_selection import measure_scoring_latency, shap_feature_elimination
+from tests.base.synthetic_data import make_data
+
+
+class TestShapFeatureElimination(unittest.TestCase):
+
+    # Only the features f0 and f3 are informative
+    train = make_data(600, 0, n_features=8, informative=[0, 3], fraud_rate=0.3)
+    valid = make_data(300, 1, n_features=8, informative=[0, 3], fraud_rate=0.3)
+    X_train, y_train = train.frame, train.y
+    X_valid, y_valid = valid.frame, valid.y
+
+    def test_feature_elimination_report(self):
+        features, report = shap_feature_elimination(
+            LGBMClassifier(n_estimators=20, verbosity=-1),
+            self.X_train,
+            self.y_train,
+            self.X_valid,
+            self.y_valid,
+            step=2,
+            min_features_to_select=2,
+            cv=3,
+            n_jobs=1,
+        )
+
+        self.assertEqual(report["num_features"].tolist(), [8, 6, 4, 2])
+        for col in (
+            "val_metric_mean",
+            "valid_average_precision",
+            "batch_latency_ms_per_1000_rows",
+            "single_row_latency_ms",
+        ):
+            self.assertTrue(report[col].notna().all())
+        self.assertEqual(report["selected"].sum(), 1)
+        self.assertIn("f0", features)
+        self.assertIn("f3", features)
+        self.assertEqual(features, [c for c in self.X_train.columns if c in features])
+
+    def test_measure_scoring_latency(self):
+        model = LGBMClassifier(n_estimators=5, verbosity=-1).fit(self.X_train, self.y_train)
+        latency = measure_scoring_latency(model, self.X_valid, n_repeats=2, n_single_rows=3)
+
+        self.assertGreater(latency["batch_latency_ms_per_1000_rows"], 0)
+        self.assertGreater(latency["single_row_latency_ms"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )
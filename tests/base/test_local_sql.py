@@ -0,0 +1,259 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xmlrunner
+
+from src.base.local_sql import LocalClient, bigquery_to_duckdb, make_raw_tables
+from src.base.sql import StatementGraph
+from src.base.utilities import generate_query, read_yaml
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+QUERIES_FOLDER = (
+    Path(__file__).parents[2] / "src" / "pipelines" / "training" / "queries"
+)
+PARAMS_PATH = (
+    Path(__file__).parents[2] / "src" / "pipelines" / "configuration" / "params.yaml"
+)
+TABLES = ("transactions", "users", "cards", "holidays")
+
+
+class TestBigQueryToDuckDB(unittest.TestCase):
+    def test_translations(self):
+        statement = bigquery_to_duckdb(
+            "SELECT COALESCE(SAFE_DIVIDE(SUM(a) OVER(w), COUNT(a) OVER(w)), 0) AS x, "
+            'IF(b = "Chip Transaction", 1, 0) AS y, t.* EXCEPT(c), '
+            "DATE_DIFF(d, MIN(d) OVER(PARTITION BY e), DAY) AS z "
+            "FROM `p.d.t` t"
+        )
+
+        self.assertNotIn("SAFE_DIVIDE", statement)
+        self.assertIn("OVER w", statement)
+        self.assertIn("'Chip Transaction'", statement)
+        self.assertIn(".* EXCLUDE(c)", statement)
+        self.assertIn("date_diff('day', MIN(d) OVER(PARTITION BY e), d)", statement)
+        self.assertIn('FROM "p.d.t" t', statement)
+
+    def test_storage_clauses_and_merge(self):
+        statement = bigquery_to_duckdb(
+            "CREATE TABLE `p.d.t`\n"
+            "PARTITION BY RANGE_BUCKET(x, GENERATE_ARRAY(0, 10, 1))\n"
+            "CLUSTER BY x\n"
+            "AS (SELECT 1 AS x)"
+        )
+        self.assertNotIn("PARTITION", statement)
+        self.assertNotIn("CLUSTER", statement)
+        self.assertEqual(
+            bigquery_to_duckdb("CREATE TABLE `p.e.t`\nCOPY `p.d.t`"),
+            'CREATE TABLE "p.e.t" AS SELECT * FROM "p.d.t"',
+        )
+
+        statement = bigquery_to_duckdb(
+            "MERGE `p.d.t` d USING (SELECT * FROM s) n ON d.x = n.x "
+            "WHEN NOT MATCHED THEN INSERT ROW"
+        )
+        self.assertTrue(statement.startswith('INSERT INTO "p.d.t"'))
+        self.assertIn("WHERE NOT EXISTS", statement)
+
+
+@unittest.skipIf(duckdb is None, "duckdb is not installed")
+class TestLocalClient(unittest.TestCase):
+    def test_procedural_script(self):
+        script = """
+            DECLARE x INT64 DEFAULT (SELECT 2);
+            DECLARE y INT64 DEFAULT NULL;
+            BEGIN
+                SET y = (SELECT MAX(v) FROM `p.d.missing`);
+            EXCEPTION WHEN ERROR THEN
+                SET y = 10;
+            END;
+            IF y IS NULL THEN
+                SELECT 0 AS z;
+            ELSEIF x > 1 THEN
+                SELECT APPROX_QUANTILES(v, 10)[OFFSET(5)] x FROM range(x * y) t(v);
+            ELSE
+                SELECT 1 AS z;
+            END IF;
+        """
+        result = LocalClient().query(script).result()
+
+        self.assertEqual(list(result.columns), ["x"])
+        self.assertIn(result.iloc[0, 0], (9, 10))
+
+    def test_temp_tables_are_local_to_jobs(self):
+        client = LocalClient()
+        client.query("CREATE TEMP TABLE t AS (SELECT 1 AS x)").result()
+
+        with self.assertRaises(duckdb.Error):
+            client.query("SELECT * FROM t").result()
+
+
+@unittest.skipIf(duckdb is None, "duckdb is not installed")
+class TestLocalTemplates(unittest.TestCase):
+
+    tables = make_raw_tables(5000, n_users=20, seed=0)
+    features = read_yaml(PARAMS_PATH)["features"]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp_dir.name)
+        for name, table in self.tables.items():
+            table.to_parquet(self.folder / f"{name}.parquet")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def client(self) -> LocalClient:
+        return LocalClient({f"p.d.{t}": self.folder / f"{t}.parquet" for t in TABLES})
+
+    def preprocessing_query(self, dataset: str = "p.d", **kwargs) -> str:
+        return generate_query(
+            QUERIES_FOLDER / "q_preprocessing.sql",
+            transactions_table=f"{dataset}.transactions",
+            users_table=f"{dataset}.users",
+            cards_table=f"{dataset}.cards",
+            holidays_table=f"{dataset}.holidays",
+            preprocessed_table=f"{dataset}.preprocessed",
+            fraud_delay_seconds=7 * 86400,
+            features="`" + "`,\n`".join(self.features) + "`",
+            **kwargs,
+        )
+
+    def split_query(self, dataset: str = "p.d", **kwargs) -> str:
+        return generate_query(
+            QUERIES_FOLDER / "q_train_valid_test_split.sql",
+            source_table=f"{dataset}.preprocessed",
+            valid_size=0.15,
+            test_size=0.15,
+            split_table=f"{dataset}.split",
+            **kwargs,
+        )
+
+    def preprocessed(self, client: LocalClient, dataset: str = "p.d") -> pd.DataFrame:
+        return (
+            client.to_dataframe(f"{dataset}.preprocessed")
+            .set_index("datetime_unix_seconds")
+            .sort_index()
+        )
+
+    def test_preprocessing(self):
+        client = self.client()
+        client.query(self.preprocessing_query()).result()
+        preprocessed = self.preprocessed(client)
+
+        self.assertEqual(len(preprocessed), len(self.tables["transactions"]))
+        self.assertEqual(
+            list(preprocessed.columns), ["transaction_id", *self.features, "is_fraud"]
+        )
+        self.assertFalse(preprocessed[self.features].isna().any().any())
+        self.assertTrue(preprocessed["transaction_id"].is_unique)
+
+        client.query(self.split_query()).result()
+        split = client.to_dataframe("p.d.split")
+        self.assertEqual(len(split), len(preprocessed))
+        self.assertEqual(set(split["split"]), {0, 1, 2})
+        self.assertNotIn("datetime_unix_seconds", split.columns)
+
+    def test_incremental_and_concurrent_preprocessing(self):
+        expected = self.client()
+        expected.query(self.preprocessing_query()).result()
+        expected = self.preprocessed(expected)
+
+        # Refresh with the last 20% of the transactions
+        self.tables["transactions"].iloc[:4000].to_parquet(self.folder / "old.parquet")
+        client = self.client()
+        client.register_parquet("p.d.transactions", self.folder / "old.parquet")
+        client.query(self.preprocessing_query()).result()
+        client.register_parquet(
+            "p.d.transactions", self.folder / "transactions.parquet"
+        )
+        client.query(self.preprocessing_query(incremental_refresh=True)).result()
+        refreshed = self.preprocessed(client)
+
+        self.assertTrue(refreshed["transaction_id"].is_unique)
+        np.testing.assert_array_equal(refreshed.index, expected.index)
+        pd.testing.assert_frame_equal(
+            refreshed[self.features], expected[self.features], rtol=1e-9
+        )
+
+        client = self.client()
+        StatementGraph(self.preprocessing_query()).run(client, "p.d._staging_")
+        pd.testing.assert_frame_equal(self.preprocessed(client), expected)
+        self.assertEqual(
+            len(client.connection.execute("SHOW ALL TABLES").df()), len(TABLES) + 1
+        )
+
+        # Concurrent refresh in place, as run by the pipeline
+        client = self.client()
+        client.register_parquet("p.d.transactions", self.folder / "old.parquet")
+        client.query(self.preprocessing_query()).result()
+        client.register_parquet(
+            "p.d.transactions", self.folder / "transactions.parquet"
+        )
+        query = self.preprocessing_query(
+            incremental_refresh=True,
+            previous_preprocessed_table="p.missing.preprocessed",
+        )
+        StatementGraph(query).run(client, "p.d._staging_")
+        pd.testing.assert_frame_equal(
+            self.preprocessed(client)[self.features],
+            expected[self.features],
+            rtol=1e-9,
+        )
+
+    def test_incremental_refresh_of_new_data_version(self):
+        expected = self.client()
+        expected.query(self.preprocessing_query()).result()
+        expected = self.preprocessed(expected)
+
+        # The previous data version has the first 80% of the transactions
+        self.tables["transactions"].iloc[:4000].to_parquet(self.folder / "old.parquet")
+        client = self.client()
+        client.register_parquet("p.d.transactions", self.folder / "old.parquet")
+        client.query(self.preprocessing_query()).result()
+        client.query(self.split_query()).result()
+        previous_split = client.to_dataframe("p.d.split").set_index("transaction_id")
+
+        for previous_dataset in ("p.d", "p.missing"):
+            dataset = f"p.e_{previous_dataset[2:]}"
+            for t in TABLES:
+                client.register_parquet(f"{dataset}.{t}", self.folder / f"{t}.parquet")
+            query = self.preprocessing_query(
+                dataset,
+                incremental_refresh=True,
+                previous_preprocessed_table=f"{previous_dataset}.preprocessed",
+            )
+            StatementGraph(query).run(client, f"{dataset}._staging_")
+            client.query(
+                self.split_query(
+                    dataset,
+                    incremental_refresh=True,
+                    previous_split_table=f"{previous_dataset}.split",
+                )
+            ).result()
+
+            refreshed = self.preprocessed(client, dataset)
+            self.assertTrue(refreshed["transaction_id"].is_unique)
+            np.testing.assert_array_equal(refreshed.index, expected.index)
+            pd.testing.assert_frame_equal(
+                refreshed[self.features], expected[self.features], rtol=1e-9
+            )
+            split = client.to_dataframe(f"{dataset}.split").set_index("transaction_id")
+            self.assertEqual(len(split), len(refreshed))
+
+        # The previous data version is used as checkpoint and left untouched
+        self.assertEqual(len(self.preprocessed(client)), 4000)
+        split = client.to_dataframe("p.e_d.split").set_index("transaction_id")
+        pd.testing.assert_series_equal(
+            split.loc[previous_split.index, "split"], previous_split["split"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
@@ -1,9 +1,22 @@
+import tempfile
 import unittest
+from pathlib import Path
 
 import numpy as np
 import xmlrunner
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 
-from src.base.model import calculate_precision_top_k
+from src.base.boosting import CachedBoosterClassifier, binned_dataset_key
+from src.base.model import (
+    SamplingCorrectedClassifier,
+    build_classifier,
+    calculate_precision_top_k,
+    continue_training,
+    downsample_majority_class,
+    generate_rose_batches,
+    train_model,
+)
 
 
 class TestPrecisionTopK(unittest.TestCase):
@@ -35,6 +48,234 @@ class TestPrecisionTopK(unittest.TestCase):
         self.assertAlmostEqual(precision2, 0.25)
 
 
+class TestBuildClassifier(unittest.TestCase):
+
+    def test_build_classifier(self):
+        classifier, use_eval_set = build_classifier("sgd_classifier", {"loss": "modified_huber"})
+
+        self.assertIsInstance(classifier, SGDClassifier)
+        self.assertEqual(classifier.loss, "modified_huber")
+        self.assertFalse(use_eval_set)
+        self.assertTrue(build_classifier("lightgbm")[1])
+
+    def test_build_classifier_invalid_name(self):
+        with self.assertRaises(ValueError):
+            build_classifier("catboost")
+
+
+class TestDownsampleMajority(unittest.TestCase):
+
+    rng = np.random.default_rng(0)
+    y = (rng.random(2000) < 0.05).astype(np.int8)
+    strata = np.repeat(np.arange(4), 500)
+    X = rng.normal(size=(2000, 3)) + y[:, None]
+
+    def test_downsample_keeps_minority_class(self):
+        indices, weights = downsample_majority_class(self.y, majority_fraction=0.2)
+
+        n_neg = np.sum(self.y == 0)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertEqual(np.sum(self.y[indices] == 1), np.sum(self.y == 1))
+        self.assertEqual(np.sum(self.y[indices] == 0), round(0.2 * n_neg))
+        np.testing.assert_array_equal(weights[self.y[indices] == 1], 1)
+        self.assertAlmostEqual(np.sum(weights[self.y[indices] == 0]), n_neg)
+
+    def test_downsample_strata(self):
+        indices, weights = downsample_majority_class(
+            self.y, majority_fraction=0.1, strata=self.strata
+        )
+
+        for s in range(4):
+            neg = (self.strata == s) & (self.y == 0)
+            kept = (self.strata[indices] == s) & (self.y[indices] == 0)
+            self.assertEqual(kept.sum(), round(0.1 * neg.sum()))
+            self.assertAlmostEqual(weights[kept].sum(), neg.sum())
+
+    def test_downsample_invalid_fraction(self):
+        with self.assertRaises(ValueError):
+            downsample_majority_class(self.y, majority_fraction=0)
+
+    def test_sampling_corrected_probabilities(self):
+        clf = SamplingCorrectedClassifier(LogisticRegression(), majority_fraction=0.25)
+        clf.fit(self.X, self.y)
+
+        p = clf.estimator.predict_proba(self.X)[:, 1]
+        expected = 0.25 * p / (0.25 * p + 1 - p)
+        np.testing.assert_allclose(clf.predict_proba(self.X)[:, 1], expected)
+        np.testing.assert_allclose(clf.predict_proba(self.X).sum(axis=1), 1)
+
+    def test_train_model_downsample_majority(self):
+        for use_weights in (True, False):
+            model, metrics = train_model(
+                LogisticRegression(),
+                self.X,
+                self.y,
+                data_sampling="downsample_majority",
+                downsampling_majority_fraction=0.3,
+                downsampling_use_weights=use_weights,
+            )
+            self.assertIn("average_precision", metrics)
+            self.assertEqual(
+                isinstance(model[-1], SamplingCorrectedClassifier), not use_weights
+            )
+            self.assertEqual(model.predict_proba(self.X).shape, (2000, 2))
+
+
+class TestVirtualUpsampling(unittest.TestCase):
+
+    rng = np.random.default_rng(1)
+    y = (rng.random(1000) < 0.05).astype(np.int8)
+    X = rng.normal(size=(1000, 4)) + y[:, None]
+
+    def test_rose_batches_cover_data(self):
+        batches = list(
+            generate_rose_batches(
+                self.X, self.y, upsampled_minority_proportion=0.3, batch_size=300
+            )
+        )
+        y_all = np.concatenate([b[1] for b in batches])
+        n_neg = np.sum(self.y == 0)
+
+        self.assertEqual(len(batches), 4)
+        self.assertEqual(np.sum(y_all == 0), n_neg)
+        self.assertEqual(np.sum(y_all == 1), int(n_neg * 0.3 / 0.7))
+        for X_batch, y_batch in batches:
+            self.assertEqual(X_batch.shape, (y_batch.size, 4))
+
+    def test_train_model_upsampling_with_weights(self):
+        model_w, _ = train_model(
+            LogisticRegression(),
+            self.X,
+            self.y,
+            data_standardization="none",
+            data_sampling="upsampling_with_weights",
+            upsampling_coefficient=2,
+        )
+        model_d, _ = train_model(
+            LogisticRegression(),
+            self.X,
+            self.y,
+            data_standardization="none",
+            data_sampling="upsampling_with_duplicates",
+            upsampling_coefficient=2,
+        )
+        np.testing.assert_allclose(
+            model_w.predict_proba(self.X), model_d.predict_proba(self.X), atol=1e-3
+        )
+
+    def test_train_model_rose_batches(self):
+        model, metrics = train_model(
+            SGDClassifier(loss="log_loss", random_state=0),
+            self.X,
+            self.y,
+            data_sampling="rose_batches",
+            rose_upsampled_minority_proportion=0.3,
+            rose_batch_size=200,
+            rose_epochs=2,
+        )
+        self.assertGreater(metrics["average_precision"], 0.3)
+
+    def test_train_model_rose_batches_requires_partial_fit(self):
+        with self.assertRaises(ValueError):
+            train_model(RandomForestClassifier(), self.X, self.y, data_sampling="rose_batches")
+
+
+class TestContinueTraining(unittest.TestCase):
+
+    rng = np.random.default_rng(2)
+    y = (rng.random(1000) < 0.1).astype(np.int8)
+    X = rng.normal(size=(1000, 4)) + y[:, None]
+
+    def test_continue_training_sgd_keeps_scaler(self):
+        model, _ = train_model(
+            SGDClassifier(loss="log_loss", random_state=0),
+            self.X[:800],
+            self.y[:800],
+            data_sampling="none",
+        )
+        coef = model[-1].coef_.copy()
+        mean = model[0].mean_.copy()
+
+        updated, metrics = continue_training(model, self.X[800:], self.y[800:], n_epochs=2)
+
+        self.assertIn("average_precision", metrics)
+        np.testing.assert_array_equal(updated[0].mean_, mean)
+        self.assertFalse(np.allclose(updated[-1].coef_, coef))
+
+    def test_continue_training_boosters_add_rounds(self):
+        for model_name in ("lightgbm", "xgboost"):
+            params = {"n_estimators": 5, "verbosity": 0}
+            model, _ = train_model(
+                build_classifier(model_name, params)[0],
+                self.X[:800],
+                self.y[:800],
+                data_sampling="none",
+            )
+
+            updated, _ = continue_training(
+                model, self.X[800:], self.y[800:], self.X[:200], self.y[:200], n_estimators=3
+            )
+
+            if model_name == "lightgbm":
+                n_trees = updated[-1].booster_.num_trees()
+            else:
+                n_trees = updated[-1].get_booster().num_boosted_rounds()
+            self.assertEqual(n_trees, 8)
+
+    def test_continue_training_cached_boosters(self):
+        feature_names = ["a", "b", "c", "d"]
+        for model_name in ("lightgbm", "xgboost"):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                # Champion trained as in the train_evaluate_model component, with
+                # the binned datasets cache keyed by the data version
+                cache_key = binned_dataset_key(
+                    data_version="20230101T000000",
+                    feature_names=feature_names,
+                    n_rows=800,
+                    params=dict(model_name=model_name),
+                )
+                classifier = CachedBoosterClassifier(
+                    booster=model_name,
+                    params={"n_estimators": 5, "random_state": 42},
+                    cache_dir=cache_dir,
+                    cache_key=cache_key,
+                )
+                model, _ = train_model(
+                    classifier,
+                    self.X[:800],
+                    self.y[:800],
+                    self.X[:200],
+                    self.y[:200],
+                    data_sampling="none",
+                )
+                cached = set(Path(cache_dir).iterdir())
+
+                updated, metrics = continue_training(
+                    model,
+                    self.X[800:],
+                    self.y[800:],
+                    self.X[:200],
+                    self.y[:200],
+                    n_estimators=3,
+                )
+
+                self.assertIn("average_precision", metrics)
+                self.assertIsInstance(updated[-1], CachedBoosterClassifier)
+                self.assertNotEqual(updated[-1].cache_key, cache_key)
+                if model_name == "lightgbm":
+                    n_trees = updated[-1].booster_.num_trees()
+                else:
+                    n_trees = updated[-1].booster_.num_boosted_rounds()
+                self.assertEqual(n_trees, 8)
+                # The cached datasets of the champion are left untouched
+                self.assertTrue(cached <= set(Path(cache_dir).iterdir()))
+
+    def test_continue_training_unsupported_model(self):
+        model, _ = train_model(LogisticRegression(), self.X, self.y, data_sampling="none")
+        with self.assertRaises(ValueError):
+            continue_training(model, self.X, self.y)
+
+
 if __name__ == "__main__":
     unittest.main(
         testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
@@ -0,0 +1,376 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xmlrunner
+
+from src.base.preprocessing import (
+    FRAUD_INDICATORS,
+    ROLLING_WINDOWS,
+    USER_WINDOWS,
+    FeatureCheckpoint,
+    decayed_feature_engineering,
+    decayed_feature_names,
+    materialize_features,
+    materialize_features_incrementally,
+    read_transaction_chunks,
+    rolling_feature_engineering,
+    rolling_feature_names,
+    stream_rolling_feature_engineering,
+    user_feature_engineering,
+    user_feature_names,
+    verify_incremental_features,
+)
+
+
+def make_transactions(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 3 * 365 * 86400, n_rows)
+    # Many transactions share the same timestamp
+    seconds[::7] = seconds[1::7][: len(seconds[::7])]
+    is_fraud = (rng.random(n_rows) < 0.05).astype(np.int64)
+    kind = rng.integers(0, 3, n_rows)
+    df = pd.DataFrame(
+        {
+            "transaction_id": np.arange(n_rows),
+            "datetime_offset": pd.Timestamp("2010-01-01")
+            + pd.to_timedelta(seconds, unit="s"),
+            "is_fraud": is_fraud,
+            "fraud_swipe": is_fraud * (kind == 0),
+            "fraud_chip": is_fraud * (kind == 1),
+            "fraud_online": is_fraud * (kind == 2),
+            "fraud_card_present": is_fraud * (kind != 2),
+        }
+    )
+    for days in ("1_days", "2_days", "7_days", "30_days", "year"):
+        df[f"mean_amount_last_{days}"] = rng.random(n_rows) * (rng.random(n_rows) > 0.2)
+        df[f"transaction_frequency_last_{days}"] = rng.integers(0, 3, n_rows)
+    return df
+
+
+def reference_rolling_features(data: pd.DataFrame) -> pd.DataFrame:
+    means, ratios = rolling_feature_names()
+    data = data.sort_values("datetime_offset").set_index("datetime_offset")
+    for prefix, column in FRAUD_INDICATORS.items():
+        for window, days in ROLLING_WINDOWS.items():
+            data[f"{prefix}_rolling_mean_{window}"] = (
+                data[column].rolling(pd.Timedelta(days=days), closed="left").mean()
+            )
+    data = data.reset_index(drop=False)
+    for name, numerator, denominator in ratios:
+        data[name] = data[numerator] / data[denominator]
+    return data
+
+
+def sql_user_features(data: pd.DataFrame) -> pd.DataFrame:
+    # Row by row translation of the window functions of q_preprocessing.sql
+    rows = []
+    for i, row in data.iterrows():
+        user = data[data["user"] == data.loc[i, "user"]]
+        t = row["datetime_unix_seconds"]
+        # ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING, ties in input order
+        previous = user[
+            (user["datetime_unix_seconds"] < t)
+            | ((user["datetime_unix_seconds"] == t) & (user.index < i))
+        ]
+        days = t // 86400 - user["datetime_unix_seconds"].min() // 86400
+        features = {
+            "mean_amount": previous["amount"].mean() if len(previous) else 0,
+            "transaction_count": len(previous),
+            "days_since_first_transaction": days,
+            "transaction_frequency_all": (len(previous) - 1) / days if days > 0 else 0,
+        }
+        for window, window_days in USER_WINDOWS.items():
+            # RANGE BETWEEN <window> PRECEDING AND 1 PRECEDING
+            in_window = user[
+                (user["datetime_unix_seconds"] >= t - window_days * 86400)
+                & (user["datetime_unix_seconds"] <= t - 1)
+            ]
+            features[f"mean_amount_last_{window}"] = (
+                in_window["amount"].mean() if len(in_window) else 0
+            )
+            features[f"transaction_frequency_last_{window}"] = (
+                len(in_window) / min(window_days, days) if days > 0 else 0
+            )
+        for long in ("year", "30_days"):
+            for short in ("7_days", "2_days", "1_days"):
+                for name, prefix, suffix in (
+                    (
+                        f"mean_amount_last_{short}_relative_to_last_{long}",
+                        "mean_amount_last_",
+                        "",
+                    ),
+                    (
+                        f"{short}_transaction_frequency_relative_to_last_{long}",
+                        "transaction_frequency_last_",
+                        "",
+                    ),
+                ):
+                    denominator = features[f"{prefix}{long}{suffix}"]
+                    numerator = features[f"{prefix}{short}{suffix}"]
+                    features[name] = numerator / denominator if denominator != 0 else 0
+        rows.append(features)
+    return pd.DataFrame(rows, index=data.index)[user_feature_names()]
+
+
+class TestUserFeatureEngineering(unittest.TestCase):
+
+    rng = np.random.default_rng(1)
+    n_rows = 400
+    # Minutes over 3 years, dense at the start so that the short windows are filled
+    seconds = (rng.random(n_rows) ** 3 * 3 * 365 * 86400).astype(np.int64) // 60 * 60
+    data = pd.DataFrame(
+        {
+            "user": rng.integers(0, 8, n_rows),
+            "datetime_unix_seconds": 1_262_304_000 + seconds,
+            "amount": rng.normal(50, 30, n_rows).round(2),
+        }
+    )
+    # Some users make several transactions in the same minute
+    data.loc[::9, ["user", "datetime_unix_seconds"]] = data.loc[
+        1::9, ["user", "datetime_unix_seconds"]
+    ].to_numpy()[: len(data.loc[::9])]
+
+    def test_same_as_sql(self):
+        expected = sql_user_features(self.data)
+        for n_jobs in (1, 3):
+            with self.subTest(n_jobs=n_jobs):
+                features = user_feature_engineering(self.data, n_jobs=n_jobs)
+                pd.testing.assert_frame_equal(
+                    features.sort_index(), expected, check_dtype=False
+                )
+
+    def test_single_user(self):
+        data = self.data.assign(user=0).iloc[:50]
+        features = user_feature_engineering(data, n_jobs=2)
+
+        self.assertEqual(list(features.columns), user_feature_names())
+        self.assertEqual(list(features["transaction_count"]), list(range(50)))
+
+
+class TestRollingFeatureEngineering(unittest.TestCase):
+
+    data = make_transactions(5000)
+
+    def test_feature_names(self):
+        means, ratios = rolling_feature_names()
+
+        self.assertEqual(len(means), 20)
+        self.assertEqual(len(ratios), 48)
+        self.assertEqual(means[0], "fraud_rolling_mean_30_days")
+        self.assertIn(
+            (
+                "fraud_chip_rolling_60_days_relative_to_all_frauds",
+                "fraud_chip_rolling_mean_60_days",
+                "fraud_rolling_mean_60_days",
+            ),
+            ratios,
+        )
+
+    def test_identical_to_pandas(self):
+        data = self.data.copy()
+        data.loc[::11, "fraud_chip"] = np.nan
+
+        pd.testing.assert_frame_equal(
+            rolling_feature_engineering(data),
+            reference_rolling_features(data),
+            check_exact=True,
+        )
+
+    def test_float32_features(self):
+        features = rolling_feature_engineering(self.data, dtype=np.float32)
+        expected = reference_rolling_features(self.data)
+
+        self.assertEqual(features["fraud_rolling_mean_30_days"].dtype, np.float32)
+        pd.testing.assert_frame_equal(
+            features, expected, check_dtype=False, check_exact=False, rtol=1e-6
+        )
+
+
+class TestStreamRollingFeatureEngineering(unittest.TestCase):
+
+    data = make_transactions(5000).sort_values(["datetime_offset", "transaction_id"])
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = Path(self.tmp_dir.name) / "input"
+        self.input_dir.mkdir()
+        self.output_path = Path(self.tmp_dir.name) / "features.parquet"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assert_same_as_in_memory(self, features: pd.DataFrame, data: pd.DataFrame):
+        expected = rolling_feature_engineering(data)
+        pd.testing.assert_frame_equal(
+            features.sort_values(["datetime_offset", "transaction_id"]).reset_index(
+                drop=True
+            ),
+            expected.sort_values(["datetime_offset", "transaction_id"]).reset_index(
+                drop=True
+            ),
+            check_exact=True,
+        )
+
+    def test_parquet_chunks(self):
+        # The boundaries of the files and of the chunks split rows with the same time
+        for i, start in enumerate((0, 1700, 3400)):
+            part = self.data.iloc[start : start + 1700]
+            part.to_parquet(self.input_dir / f"part_{i}.parquet", index=False)
+
+        n_rows = stream_rolling_feature_engineering(
+            read_transaction_chunks(self.input_dir, chunk_size=700), self.output_path
+        )
+
+        self.assertEqual(n_rows, len(self.data))
+        self.assert_same_as_in_memory(pd.read_parquet(self.output_path), self.data)
+
+    def test_csv_chunks(self):
+        path = self.input_dir / "data.csv"
+        self.data.to_csv(path, index=False)
+
+        stream_rolling_feature_engineering(
+            read_transaction_chunks(path, chunk_size=1000), self.output_path
+        )
+
+        data = pd.read_csv(path, parse_dates=["datetime_offset"])
+        self.assert_same_as_in_memory(pd.read_parquet(self.output_path), data)
+
+    def test_unsorted_chunks(self):
+        chunks = [self.data.iloc[2500:], self.data.iloc[:2500]]
+        with self.assertRaises(ValueError):
+            stream_rolling_feature_engineering(chunks, self.output_path)
+
+
+class TestDecayedFeatureEngineering(unittest.TestCase):
+
+    data = TestUserFeatureEngineering.data.assign(
+        **make_transactions(406, seed=3)[list(FRAUD_INDICATORS.values())].iloc[:400]
+    )
+    data.loc[::13, "fraud_online"] = np.nan
+
+    def reference_features(self, half_life: float) -> pd.DataFrame:
+        rows = []
+        for i, row in self.data.iterrows():
+            t = row["datetime_unix_seconds"]
+            earlier = self.data[self.data["datetime_unix_seconds"] < t]
+            weights = 0.5 ** (
+                (t - earlier["datetime_unix_seconds"]) / (half_life * 86400)
+            )
+            user = earlier["user"] == row["user"]
+            features = {
+                "amount": (weights * earlier["amount"])[user].sum()
+                / max(weights[user].sum(), 1e-300),
+                "frequency": weights[user].sum() * np.log(2) / half_life,
+            }
+            for prefix, column in FRAUD_INDICATORS.items():
+                valid = earlier[column].notna()
+                features[prefix] = (weights * earlier[column])[valid].sum() / max(
+                    weights[valid].sum(), 1e-300
+                )
+            rows.append(features)
+        return pd.DataFrame(rows, index=self.data.index)
+
+    def test_same_as_weighted_sums(self):
+        # With a half-life of 1 day the 3 years are split in blocks
+        for half_life in (1, 30):
+            with self.subTest(half_life=half_life):
+                features = decayed_feature_engineering(self.data, [half_life])
+                expected = self.reference_features(half_life)
+
+                self.assertEqual(
+                    list(features.columns), decayed_feature_names([half_life])
+                )
+                np.testing.assert_allclose(
+                    features.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-12
+                )
+
+    def test_feature_names(self):
+        names = decayed_feature_names([7, 0.5])
+
+        self.assertEqual(len(names), 14)
+        self.assertEqual(names[0], "decayed_mean_amount_7_days")
+        self.assertIn("fraud_online_decayed_mean_0.5_days", names)
+
+
+class TestIncrementalFeatures(unittest.TestCase):
+
+    rng = np.random.default_rng(2)
+    # The user features of `make_transactions` are replaced with the computed ones
+    data = make_transactions(3000)
+    data["user"] = rng.integers(0, 20, len(data))
+    data["datetime_unix_seconds"] = (
+        data["datetime_offset"] - pd.Timestamp("1970-01-01")
+    ) // pd.Timedelta(seconds=1)
+    data["amount"] = rng.normal(50, 30, len(data)).round(2)
+    # Two years and a half of history, then the new transactions
+    split_time = int(pd.Timestamp("2012-07-01").timestamp())
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_checkpoint_roundtrip(self):
+        _, checkpoint = materialize_features(self.data)
+        checkpoint.save(self.tmp_dir.name)
+        loaded = FeatureCheckpoint.load(self.tmp_dir.name)
+
+        self.assertEqual(loaded.user_end_time, self.data["datetime_unix_seconds"].max())
+        self.assertEqual(loaded.fraud_end_time, self.data["datetime_offset"].max())
+        pd.testing.assert_frame_equal(loaded.fraud_history, checkpoint.fraud_history)
+        pd.testing.assert_frame_equal(loaded.user_history, checkpoint.user_history)
+        # Only one row per user is kept for the transactions older than a year
+        self.assertLess(len(loaded.user_history), len(self.data) // 2)
+        self.assertEqual(loaded.user_history["n_transactions"].sum(), len(self.data))
+
+    def test_same_as_full_recompute(self):
+        data = self.data.sort_values("datetime_unix_seconds", kind="stable")
+        is_new = data["datetime_unix_seconds"] > self.split_time
+        _, checkpoint = materialize_features(data[~is_new])
+        # Resume in two runs, going through the files of the checkpoint
+        features = []
+        for part in np.array_split(np.flatnonzero(is_new), 2):
+            checkpoint.save(self.tmp_dir.name)
+            checkpoint = FeatureCheckpoint.load(self.tmp_dir.name)
+            part_features, checkpoint = materialize_features_incrementally(
+                data.iloc[part], checkpoint
+            )
+            features.append(part_features)
+        features = pd.concat(features).sort_values("transaction_id")
+
+        expected, _ = materialize_features(data)
+        expected = expected[expected["transaction_id"].isin(features["transaction_id"])]
+        pd.testing.assert_frame_equal(
+            features.reset_index(drop=True),
+            expected.sort_values("transaction_id").reset_index(drop=True),
+            check_exact=False,
+            rtol=1e-9,
+        )
+
+    def test_old_transactions(self):
+        _, checkpoint = materialize_features(self.data)
+        features, _ = materialize_features_incrementally(
+            self.data.iloc[:10], checkpoint
+        )
+        self.assertEqual(len(features), 0)
+
+        data = self.data.iloc[:1].assign(
+            datetime_unix_seconds=checkpoint.user_end_time + 1
+        )
+        with self.assertRaises(ValueError):
+            materialize_features_incrementally(data, checkpoint)
+
+    def test_verify(self):
+        report = verify_incremental_features(self.data, self.split_time, n_users=10)
+
+        self.assertTrue(report["match"])
+        self.assertGreater(report["n_transactions"], 0)
+        self.assertLess(report["max_abs_difference"], 1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
@@ -0,0 +1,115 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import xmlrunner
+
+from src.base.schemas import SchemaRegistry
+
+TRANSACTIONS_HEADER = (
+    "User,Card,Year,Month,Day,Time,Amount,Use Chip,Merchant Name,Merchant City,"
+    "Merchant State,Zip,MCC,Errors?,Is Fraud?"
+)
+TRANSACTION = (
+    "0,0,2002,9,1,06:21,134.09,Swipe Transaction,3527213246127876953,La Verne,"
+    "CA,91750.0,5300,,{is_fraud}"
+)
+
+
+class TestSchemaRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = SchemaRegistry(
+            ["amount", "has_chip", "transaction_count"], target_column="is_fraud"
+        )
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_schemas(self):
+        self.assertEqual(
+            self.registry.arrow_schema("split"),
+            pa.schema(
+                [
+                    ("split", pa.int8()),
+                    ("transaction_id", pa.int64()),
+                    ("amount", pa.float32()),
+                    ("has_chip", pa.int8()),
+                    ("transaction_count", pa.int32()),
+                    ("is_fraud", pa.int8()),
+                ]
+            ),
+        )
+        schema = self.registry.bigquery_schema("transactions", ["is_fraud_", "Amount"])
+        self.assertEqual(
+            [(f.name, f.field_type) for f in schema],
+            [("Is_Fraud_", "BOOL"), ("Amount", "FLOAT64")],
+        )
+
+        with self.assertRaises(ValueError):
+            self.registry.arrow_schema("unknown")
+        with self.assertRaises(ValueError):
+            self.registry.arrow_schema("split", ["amount", "unknown"])
+
+    def test_from_params(self):
+        registry = SchemaRegistry.from_params()
+
+        names = registry.arrow_schema("preprocessed").names
+        self.assertEqual(names[0], "transaction_id")
+        self.assertEqual(names[-2:], ["is_fraud", "datetime_unix_seconds"])
+        self.assertEqual(
+            registry.arrow_schema("split").field("weekend").type, pa.int8()
+        )
+
+    def test_validate_parquet(self):
+        data = pd.DataFrame(
+            {
+                "split": [0, 1],
+                "TRANSACTION_ID": [1, 2],
+                "amount": [1.5, 2.0],
+                "has_chip": [1, 0],
+                "transaction_count": [3, 4],
+                "is_fraud": [0, 1],
+            }
+        )
+        data.to_parquet(self.folder / "split.parquet")
+        self.registry.validate(self.folder / "split.parquet", "split")
+        self.registry.validate(pa.Table.from_pandas(data), "split")
+
+        data["amount"] = data["amount"].astype(str)
+        with self.assertRaisesRegex(ValueError, "column amount has type .*string"):
+            self.registry.validate(pa.Table.from_pandas(data), "split")
+        with self.assertRaisesRegex(ValueError, "missing column has_chip"):
+            self.registry.validate(
+                pa.Table.from_pandas(data.drop(columns="has_chip")), "split"
+            )
+
+    def test_validate_csv(self):
+        path = self.folder / "transactions.csv"
+        path.write_text(
+            "\n".join(
+                [
+                    TRANSACTIONS_HEADER,
+                    TRANSACTION.format(is_fraud="No"),
+                    TRANSACTION.format(is_fraud="Yes"),
+                ]
+            )
+        )
+        self.registry.validate(path, "transactions", file_format="csv")
+
+        path.write_text(
+            "\n".join([TRANSACTIONS_HEADER, TRANSACTION.format(is_fraud="Maybe")])
+        )
+        with self.assertRaises(ValueError):
+            self.registry.validate(path, "transactions", file_format="csv")
+
+        path.write_text(TRANSACTIONS_HEADER.replace("Amount,", ""))
+        with self.assertRaisesRegex(ValueError, "does not match the columns"):
+            self.registry.validate(path, "transactions", file_format="csv")
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
@@ -0,0 +1,245 @@
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import xmlrunner
+
+from src.base.sql import StatementGraph, split_script
+from src.base.utilities import generate_query, read_yaml
+from src.utils.job_statistics import JobStatistics
+
+QUERIES_FOLDER = (
+    Path(__file__).parents[2] / "src" / "pipelines" / "training" / "queries"
+)
+PARAMS_PATH = (
+    Path(__file__).parents[2] / "src" / "pipelines" / "configuration" / "params.yaml"
+)
+
+
+class FakeJob:
+    def __init__(self, client, query):
+        self.client = client
+        self.query = query
+
+    def result(self):
+        with self.client.lock:
+            self.client.running += 1
+            self.client.max_running = max(self.client.max_running, self.client.running)
+        time.sleep(self.client.duration)
+        with self.client.lock:
+            self.client.running -= 1
+            self.client.completed.append(self.query)
+        if self.client.fail_on is not None and self.client.fail_on in self.query:
+            raise RuntimeError("Query failed.")
+
+
+class FakeClient:
+    """Local stand-in for the BigQuery client, recording the submitted queries."""
+
+    def __init__(self, duration=0.05, fail_on=None):
+        self.duration = duration
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.completed = []
+        self.deleted = []
+
+    def query(self, query, job_config=None):
+        return FakeJob(self, query)
+
+    def delete_table(self, table, not_found_ok=False):
+        self.deleted.append(table)
+
+
+class TestSplitScript(unittest.TestCase):
+    def test_split_script(self):
+        script = """
+            /* A comment; with a semicolon */
+            DECLARE x INT64 DEFAULT 1;
+            IF x > 0 THEN
+                BEGIN
+                    SET x = (SELECT CASE WHEN a = ';' THEN 1 ELSE 2 END FROM t);
+                EXCEPTION WHEN ERROR THEN
+                    SET x = 0;
+                END;
+            END IF;
+            CREATE TABLE IF NOT EXISTS `p.d.t` AS (SELECT IF(x > 0, 1, 0) AS y);
+            SELECT 1 -- trailing; comment
+        """
+        statements = split_script(script)
+
+        self.assertEqual(len(statements), 4)
+        self.assertTrue(statements[0].endswith("DECLARE x INT64 DEFAULT 1"))
+        self.assertTrue(statements[1].startswith("IF x > 0 THEN"))
+        self.assertTrue(statements[1].endswith("END IF"))
+        self.assertTrue(statements[2].startswith("CREATE TABLE IF NOT EXISTS"))
+        self.assertEqual(statements[3], "SELECT 1 -- trailing; comment")
+        # A block ending the script without a semicolon
+        self.assertEqual(
+            split_script("SELECT 1; BEGIN SELECT 2; END"),
+            ["SELECT 1", "BEGIN SELECT 2; END"],
+        )
+
+    def test_unbalanced_blocks(self):
+        with self.assertRaises(ValueError):
+            split_script("IF x THEN SELECT 1; END IF; END;")
+        with self.assertRaises(ValueError):
+            split_script("BEGIN SELECT 1;")
+
+
+class TestStatementGraph(unittest.TestCase):
+
+    query = generate_query(
+        QUERIES_FOLDER / "q_preprocessing.sql",
+        transactions_table="p.d.transactions",
+        users_table="p.d.users",
+        cards_table="p.d.cards",
+        holidays_table="p.d.holidays",
+        preprocessed_table="p.d.preprocessed",
+        fraud_delay_seconds=7 * 86400,
+        features="amount",
+    )
+    incremental_query = generate_query(
+        QUERIES_FOLDER / "q_preprocessing.sql",
+        transactions_table="p.d.transactions",
+        users_table="p.d.users",
+        cards_table="p.d.cards",
+        holidays_table="p.d.holidays",
+        preprocessed_table="p.d.preprocessed",
+        previous_preprocessed_table="p.c.preprocessed",
+        fraud_delay_seconds=7 * 86400,
+        features="`" + "`,\n`".join(read_yaml(PARAMS_PATH)["features"]) + "`",
+        create_replace_tables=False,
+        incremental_refresh=True,
+    )
+    table_prefix = "p.d._staging_"
+
+    def test_preprocessing_dependencies(self):
+        graph = StatementGraph(self.query)
+
+        self.assertTrue(
+            all(s.lstrip("/").split()[0] != "CREATE" for s in graph.prelude)
+        )
+        self.assertEqual(graph.dependencies["merged"], set())
+        for name in ("mcc_history", "user_history", "rolling_aux_frauds"):
+            self.assertEqual(graph.dependencies[name], {"merged"})
+        self.assertEqual(graph.dependencies["mcc_aux"], {"merged", "mcc_history"})
+        self.assertEqual(graph.dependencies["user_aux"], {"merged", "user_history"})
+        self.assertEqual(
+            graph.dependencies["rolling_aux_amount_frequency"], {"user_aux"}
+        )
+        self.assertEqual(
+            graph.dependencies["preprocessed_rows"],
+            {"merged", "mcc_aux", "rolling_aux_amount_frequency", "rolling_aux_frauds"},
+        )
+        # The final statement writes the preprocessed table
+        (final,) = set(graph.statements) - set(graph.temp_tables)
+        self.assertEqual(graph.dependencies[final], {"preprocessed_rows"})
+
+    def test_setup_statement(self):
+        graph = StatementGraph(self.incremental_query)
+        setup = graph.statements["statement_0"]
+
+        self.assertIn("COPY `p.c.preprocessed`", setup)
+        # The variables are set in the prelude, which has no side effects
+        self.assertIn("SET (high_water_mark, id_offset)", graph.prelude[-1])
+        self.assertNotIn("COPY", "".join(graph.prelude))
+        # The copy runs before the variables are set, and before all the statements
+        query = graph.job_query("statement_0", self.table_prefix)
+        self.assertNotIn("high_water_mark, id_offset", query)
+        self.assertEqual(graph.dependencies["statement_0"], set())
+        for name in set(graph.statements) - {"statement_0"}:
+            self.assertIn("statement_0", graph.dependencies[name])
+            query = graph.job_query(name, self.table_prefix)
+            self.assertEqual(split_script(query)[:-1], graph.prelude)
+
+    def test_incremental_dependencies(self):
+        graph = StatementGraph(self.incremental_query)
+        full_graph = StatementGraph(self.query)
+
+        statements = split_script(self.incremental_query)
+        # The declarations, then the copy, then the block setting the variables
+        self.assertEqual(graph.prelude, [*statements[:4], statements[5]])
+        self.assertEqual(graph.statements["statement_0"], statements[4])
+        # All the other statements run after the copy
+        self.assertEqual(graph.temp_tables, full_graph.temp_tables)
+        for name in graph.temp_tables:
+            self.assertEqual(
+                graph.dependencies[name],
+                {"statement_0", *full_graph.dependencies[name]},
+            )
+        (final,) = set(graph.statements) - {"statement_0", *graph.temp_tables}
+        self.assertEqual(
+            graph.dependencies[final], {"statement_0", "preprocessed_rows"}
+        )
+
+    def test_variables_set_outside_prelude(self):
+        # The variables set by a block writing a table would only exist in its job
+        with self.assertRaises(ValueError):
+            StatementGraph(
+                "DECLARE x INT64; "
+                "IF TRUE THEN SET x = 1; CREATE TABLE `p.d.t` AS SELECT 1; END IF; "
+                "SELECT x"
+            )
+        with self.assertRaises(ValueError):
+            StatementGraph(
+                "DECLARE x, y INT64; CREATE TEMP TABLE a AS SELECT 1 AS v; "
+                "BEGIN SET (y, x) = (SELECT AS STRUCT 1, 2); END; SELECT x FROM a"
+            )
+        # Columns updated by DML statements are not variables
+        graph = StatementGraph(
+            "DECLARE x INT64 DEFAULT 1; UPDATE `p.d.t` SET x = 2 WHERE TRUE"
+        )
+        self.assertEqual(list(graph.statements), ["statement_0"])
+
+    def test_job_query(self):
+        graph = StatementGraph(self.query)
+        query = graph.job_query("mcc_aux", self.table_prefix)
+
+        self.assertTrue(query.startswith(graph.prelude[0]))
+        self.assertIn("CREATE OR REPLACE TABLE `p.d._staging_mcc_aux`", query)
+        self.assertIn("FROM `p.d._staging_merged` m", query)
+        self.assertIn("JOIN `p.d._staging_mcc_history` h", query)
+        self.assertNotIn("TEMP TABLE", query)
+        self.assertEqual(split_script(query)[: len(graph.prelude)], graph.prelude)
+
+    def completed_statements(self, graph, client):
+        queries = {graph.job_query(n, self.table_prefix): n for n in graph.statements}
+        return [queries[q] for q in client.completed]
+
+    def test_run_concurrently(self):
+        graph = StatementGraph(self.query)
+        client = FakeClient()
+        statistics = JobStatistics()
+        graph.run(client, self.table_prefix, max_workers=4, statistics=statistics)
+        completed = self.completed_statements(graph, client)
+
+        self.assertEqual(sorted(completed), sorted(graph.statements))
+        self.assertGreaterEqual(client.max_running, 3)
+        # Each statement completes after the ones it depends on
+        for name, dependencies in graph.dependencies.items():
+            for dependency in dependencies:
+                self.assertLess(completed.index(dependency), completed.index(name))
+        self.assertEqual(
+            sorted(client.deleted),
+            sorted(f"{self.table_prefix}{t}" for t in graph.temp_tables),
+        )
+        self.assertEqual(sorted(statistics.records), sorted(graph.statements))
+
+    def test_run_failure(self):
+        graph = StatementGraph(self.query)
+        client = FakeClient(fail_on=f"TABLE `{self.table_prefix}user_aux`")
+
+        with self.assertRaises(RuntimeError):
+            graph.run(client, self.table_prefix, max_workers=2)
+        completed = self.completed_statements(graph, client)
+        self.assertIn("user_aux", completed)
+        self.assertNotIn("rolling_aux_amount_frequency", completed)
+        self.assertNotIn("preprocessed_rows", completed)
+        self.assertEqual(len(client.deleted), len(graph.temp_tables))
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
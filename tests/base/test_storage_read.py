@@ -0,0 +1,102 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xmlrunner
+
+from src.base.data import load_dataset
+from src.base.local_sql import LocalClient, LocalStorageReader
+from src.base.schemas import SchemaRegistry
+from src.base.storage_read import read_table_to_arrow, read_table_to_parquet
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+TABLE = "p.d.split"
+
+
+@unittest.skipIf(duckdb is None, "duckdb is not installed")
+class TestStorageRead(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp_dir.name)
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame(
+            {
+                "split": rng.integers(0, 3, 1000),
+                "transaction_id": np.arange(1000),
+                "amount": rng.gamma(2, 40, 1000),
+                "has_chip": rng.integers(0, 2, 1000),
+                "is_fraud": rng.integers(0, 2, 1000),
+            }
+        )
+        self.data.to_parquet(self.folder / "split.parquet")
+        self.reader = LocalStorageReader(
+            LocalClient({TABLE: self.folder / "split.parquet"}), batch_size=100
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_table_to_parquet(self):
+        n_rows = read_table_to_parquet(
+            self.reader,
+            TABLE,
+            self.folder / "validation",
+            columns=["transaction_id", "amount", "is_fraud"],
+            row_restriction="split = 1",
+            max_streams=3,
+        )
+        expected = self.data[self.data["split"] == 1]
+
+        self.assertEqual(n_rows, len(expected))
+        self.assertEqual(len(list((self.folder / "validation").iterdir())), 3)
+        dataset = load_dataset(self.folder / "validation", "is_fraud")
+        self.assertEqual(dataset.feature_names, ["amount"])
+        order = np.argsort(dataset.ids)
+        np.testing.assert_array_equal(dataset.ids[order], expected["transaction_id"])
+        np.testing.assert_allclose(dataset.X[order, 0], expected["amount"], rtol=1e-6)
+
+    def test_read_table_to_arrow(self):
+        data = read_table_to_arrow(
+            self.reader, TABLE, columns=["transaction_id", "has_chip", "is_fraud"]
+        )
+
+        self.assertEqual(data.column_names, ["transaction_id", "has_chip", "is_fraud"])
+        self.assertEqual(data.num_rows, len(self.data))
+        dataset = load_dataset(data, "is_fraud")
+        np.testing.assert_array_equal(dataset.ids, self.data["transaction_id"])
+        np.testing.assert_array_equal(dataset.X[:, 0], self.data["has_chip"])
+
+    def test_read_with_compact_schema(self):
+        schema = SchemaRegistry(["amount", "has_chip"]).arrow_schema("split")
+        read_table_to_parquet(
+            self.reader, TABLE, self.folder / "compact", schema=schema, max_streams=2
+        )
+        data = read_table_to_arrow(self.reader, TABLE, schema=schema)
+
+        for path in (self.folder / "compact").iterdir():
+            self.assertEqual(pq.read_schema(path), schema)
+        self.assertEqual(data.schema, schema)
+        np.testing.assert_array_equal(
+            data.column("has_chip").to_numpy(), self.data["has_chip"]
+        )
+
+    def test_read_empty_table(self):
+        n_rows = read_table_to_parquet(
+            self.reader, TABLE, self.folder / "empty", row_restriction="split > 2"
+        )
+
+        self.assertEqual(n_rows, 0)
+        dataset = load_dataset(self.folder / "empty", "is_fraud")
+        self.assertEqual(dataset.X.shape, (0, 2))
+        self.assertEqual(dataset.feature_names, ["amount", "has_chip"])
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import joblib
+import numpy as np
+import xmlrunner
+
+from src.base.model import build_classifier, train_model
+from src.base.training import train_candidates
+from tests.base.synthetic_data import make_data
+
+
+class TestTrainCandidates(unittest.TestCase):
+
+    # Features with different scales, to check the scaling
+    train = make_data(1000, 0, scales=[1, 10, 100, 1000])
+    valid = make_data(300, 1, scales=[1, 10, 100, 1000])
+    test = make_data(300, 2, scales=[1, 10, 100, 1000])
+    models_params = {"lightgbm": {"n_estimators": 10, "verbosity": -1}}
+    data_processing_args = {"data_sampling": "rose", "rose_upsampled_minority_proportion": 0.3}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_train_candidates_outputs(self):
+        results = train_candidates(
+            self.train,
+            self.valid,
+            self.test,
+            model_names=["logistic_regression", "lightgbm"],
+            output_dir=self.tmp_dir.name,
+            models_params=self.models_params,
+            data_processing_args=self.data_processing_args,
+            n_jobs=2,
+        )
+
+        self.assertEqual(set(results), {"logistic_regression", "lightgbm"})
+        for model_name, metrics in results.items():
+            self.assertEqual(set(metrics), {"train", "valid", "test"})
+            model_dir = Path(self.tmp_dir.name) / model_name
+            self.assertLessEqual(
+                {
+                    "manifest.json",
+                    "metrics.json",
+                    "model.joblib",
+                    f"precision_recall_curve_test_{model_name}.png",
+                    f"precision_recall_curve_validation_{model_name}.png",
+                },
+                {p.name for p in model_dir.iterdir()},
+            )
+            # The feature names are kept, to select the columns at serving time
+            model = joblib.load(model_dir / "model.joblib")
+            np.testing.assert_array_equal(
+                model[-1].feature_names_in_, self.train.feature_names
+            )
+
+    def test_train_candidates_same_as_single_model(self):
+        train_candidates(
+            self.train,
+            self.valid,
+            self.test,
+            model_names=["logistic_regression"],
+            output_dir=self.tmp_dir.name,
+            data_processing_args=self.data_processing_args,
+        )
+        model = joblib.load(Path(self.tmp_dir.name) / "logistic_regression" / "model.joblib")
+
+        expected, _ = train_model(
+            build_classifier("logistic_regression")[0],
+            X_train=self.train.frame,
+            y_train=self.train.y,
+            **self.data_processing_args,
+        )
+        # The candidates are fit on the scaled float32 DataFrames, which the ROSE
+        # upsampling keeps in float32, instead of the float64 samples it generates
+        # from the scaler outputs in `train_model`
+        np.testing.assert_allclose(
+            model.predict_proba(self.test.frame),
+            expected.predict_proba(self.test.frame),
+            rtol=1e-6,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )
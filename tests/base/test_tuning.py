@@ -0,0 +1,135 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import optuna
+import xmlrunner
+from optuna.trial import TrialState
+
+from src.base import tuning
+from src.base.model import train_model
+from src.base.tuning import suggest_params, tune_hyperparameters
+from tests.base.synthetic_data import make_data
+
+
+class TestTuneHyperparameters(unittest.TestCase):
+
+    train = make_data(1000, 0)
+    valid = make_data(300, 1)
+    search_space = {
+        "n_estimators": {"type": "int", "low": 10, "high": 30},
+        "learning_rate": {"type": "float", "low": 0.01, "high": 0.3, "log": True},
+        "num_leaves": {"type": "categorical", "choices": [7, 15]},
+    }
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage_path = Path(self.tmp_dir.name) / "study.db"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_tune_parallel(self):
+        params, study = tune_hyperparameters(
+            self.train,
+            self.valid,
+            model_name="lightgbm",
+            search_space=self.search_space,
+            storage_path=self.storage_path,
+            model_params={"verbosity": -1},
+            data_processing_args={"data_sampling": "none"},
+            n_trials=6,
+            n_jobs=2,
+        )
+
+        self.assertEqual(set(params), {"lightgbm"})
+        self.assertEqual(params["lightgbm"]["verbosity"], -1)
+        self.assertEqual(set(self.search_space) - set(params["lightgbm"]), set())
+        self.assertTrue(self.storage_path.exists())
+
+        finished = [t for t in study.trials if t.state.is_finished()]
+        self.assertGreaterEqual(len(finished), 6)
+        self.assertTrue(all(t.intermediate_values for t in finished))
+
+    def test_processes_capped_by_trials(self):
+        with mock.patch("src.base.tuning.os.cpu_count", return_value=64), mock.patch(
+            "src.base.tuning._optimize_worker", side_effect=tuning._optimize_worker
+        ) as worker:
+            tune_hyperparameters(
+                self.train,
+                self.valid,
+                model_name="lightgbm",
+                search_space=self.search_space,
+                storage_path=self.storage_path,
+                model_params={"verbosity": -1},
+                n_trials=1,
+                n_jobs=-1,
+            )
+
+        # A single process, with all the cores
+        worker.assert_called_once()
+        self.assertEqual(worker.call_args.args[8], 64)
+
+    def test_data_scaled_once(self):
+        calls = []
+
+        def record_train_model(*args, **kwargs):
+            calls.append((np.asarray(kwargs["X_train"]), kwargs))
+            return train_model(*args, **kwargs)
+
+        with mock.patch("src.base.tuning.train_model", side_effect=record_train_model):
+            tune_hyperparameters(
+                self.train,
+                self.valid,
+                model_name="lightgbm",
+                search_space=self.search_space,
+                storage_path=self.storage_path,
+                model_params={"verbosity": -1},
+                data_processing_args={"data_standardization": "min_max"},
+                n_trials=2,
+                n_jobs=1,
+            )
+
+        self.assertEqual(len(calls), 2)
+        for X_train, kwargs in calls:
+            self.assertEqual(kwargs["data_standardization"], "none")
+            np.testing.assert_allclose(X_train.min(axis=0), 0, atol=1e-6)
+            np.testing.assert_allclose(X_train.max(axis=0), 1, atol=1e-6)
+
+    def test_failed_trials_counted(self):
+        with mock.patch(
+            "src.base.tuning.train_model", side_effect=ValueError("Invalid params")
+        ):
+            with self.assertRaises(ValueError):
+                tune_hyperparameters(
+                    self.train,
+                    self.valid,
+                    model_name="lightgbm",
+                    search_space=self.search_space,
+                    storage_path=self.storage_path,
+                    n_trials=3,
+                    n_jobs=1,
+                    timeout=60,
+                )
+
+        study = optuna.load_study(
+            study_name="lightgbm_tuning", storage=f"sqlite:///{self.storage_path}"
+        )
+        self.assertEqual(len(study.trials), 3)
+        self.assertTrue(all(t.state == TrialState.FAIL for t in study.trials))
+
+    def test_suggest_params_invalid_type(self):
+        study = optuna.create_study()
+        with self.assertRaises(ValueError):
+            suggest_params(
+                study.ask(), {"C": {"type": "loguniform", "low": 1, "high": 2}}
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import xmlrunner
+from sklearn.metrics import average_precision_score, precision_recall_curve
+
+from src.base.visualisation import decimate_curve, plot_precision_recall_curve
+
+
+class TestPrecisionRecallCurve(unittest.TestCase):
+
+    rng = np.random.default_rng(0)
+    y = (rng.random(20000) < 0.05).astype(np.int8)
+    y_score = rng.random(20000) + y
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_decimate_curve(self):
+        precisions, recalls, _ = precision_recall_curve(self.y, self.y_score)
+        indices = decimate_curve(recalls, precisions, n_points=100)
+
+        self.assertLessEqual(len(indices), 100)
+        self.assertGreater(len(indices), 90)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], len(recalls) - 1)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        # Short curves are kept as they are
+        np.testing.assert_array_equal(
+            decimate_curve(recalls[:50], precisions[:50]), np.arange(50)
+        )
+        np.testing.assert_array_equal(
+            decimate_curve(recalls, precisions, n_points=2), [0, len(recalls) - 1]
+        )
+        with self.assertRaises(ValueError):
+            decimate_curve(recalls, precisions, n_points=1)
+
+    def test_plot_from_scores_and_curve(self):
+        curve = precision_recall_curve(self.y, self.y_score)
+        for name, kwargs in (
+            ("scores", {"y": self.y, "y_score": self.y_score}),
+            ("curve", {"curve": curve}),
+        ):
+            save_path = Path(self.tmp_dir.name) / f"{name}.png"
+            _ = plot_precision_recall_curve(
+                "model", save_path=save_path, n_points=100, **kwargs
+            )
+
+            self.assertTrue(save_path.exists())
+            with np.load(save_path.with_suffix(".npz")) as arrays:
+                self.assertLessEqual(len(arrays["recall"]), 100)
+                self.assertEqual(len(arrays["recall"]), len(arrays["thresholds"]))
+                self.assertAlmostEqual(
+                    float(arrays["average_precision"]),
+                    average_precision_score(self.y, self.y_score),
+                )
+
+    def test_missing_inputs(self):
+        with self.assertRaises(ValueError):
+            plot_precision_recall_curve("model", y=self.y)
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
@@ -0,0 +1,190 @@
+import re
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xmlrunner
+
+from src.base.local_sql import bigquery_to_duckdb
+from src.base.preprocessing import user_feature_engineering, user_feature_names
+from src.base.utilities import generate_query
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+QUERIES_FOLDER = (
+    Path(__file__).parents[3] / "src" / "pipelines" / "training" / "queries"
+)
+
+
+def temp_table_statements(query: str, names: tuple, variables: dict) -> list[str]:
+    statements = [s.strip() for s in query.split(";\n")]
+    # Script variables are replaced by their value
+    for variable, value in variables.items():
+        value = "NULL" if value is None else str(value)
+        statements = [re.sub(rf"\b{variable}\b", value, s) for s in statements]
+    return [
+        bigquery_to_duckdb(s)
+        for name in names
+        for s in statements
+        if s.startswith(f"CREATE TEMP TABLE {name}\n")
+        or s.startswith(f"CREATE TEMP TABLE {name} ")
+    ]
+
+
+def preprocessing_statements(*names: str, lookback_start: int = None) -> list[str]:
+    query = generate_query(
+        QUERIES_FOLDER / "q_preprocessing.sql",
+        transactions_table="transactions",
+        users_table="users",
+        cards_table="cards",
+        holidays_table="holidays",
+        preprocessed_table="preprocessed",
+        fraud_delay_seconds=7 * 86400,
+        features="amount",
+    )
+    return temp_table_statements(query, names, {"lookback_start": lookback_start})
+
+
+def split_statements(
+    *names: str, train_limit: int = None, high_water_mark: int = None
+) -> list[str]:
+    query = generate_query(
+        QUERIES_FOLDER / "q_train_valid_test_split.sql",
+        source_table="preprocessed",
+        valid_size=0.15,
+        test_size=0.15,
+        split_table="split",
+    )
+    return temp_table_statements(
+        query,
+        names,
+        {"train_limit": train_limit, "high_water_mark": high_water_mark},
+    )
+
+
+@unittest.skipIf(duckdb is None, "duckdb is not installed")
+class TestRollingAmountFrequency(unittest.TestCase):
+
+    rng = np.random.default_rng(0)
+    n_rows = 3000
+    # Minutes over 3 years, dense at the start so that the short windows are filled
+    minutes = np.unique(
+        (rng.random(n_rows) ** 3 * 3 * 365 * 1440).astype(np.int64)
+        + rng.integers(0, 10, n_rows) * 3 * 365 * 1440
+    )
+    data = pd.DataFrame(
+        {
+            "transaction_id": np.arange(len(minutes)),
+            "user": minutes // (3 * 365 * 1440),
+            "datetime_unix_seconds": 662_688_000 + minutes % (3 * 365 * 1440) * 60,
+            "amount": rng.normal(50, 30, len(minutes)).round(2),
+        }
+    )
+    data["datetime"] = pd.to_datetime(data["datetime_unix_seconds"], unit="s")
+
+    def rolling_features(self, lookback_start: int = None) -> pd.DataFrame:
+        connection = duckdb.connect()
+        connection.register("merged", self.data)
+        for statement in preprocessing_statements(
+            "user_history",
+            "user_aux",
+            "rolling_aux_amount_frequency",
+            lookback_start=lookback_start,
+        ):
+            connection.execute(statement)
+        return (
+            connection.execute("SELECT * FROM rolling_aux_amount_frequency")
+            .df()
+            .set_index("transaction_id")
+            .sort_index()
+        )
+
+    def test_same_as_rolling_windows(self):
+        features = self.rolling_features()
+
+        expected = user_feature_engineering(self.data).sort_index()
+        self.assertEqual(set(features.columns), set(user_feature_names()))
+        pd.testing.assert_frame_equal(
+            features[user_feature_names()],
+            expected,
+            check_dtype=False,
+            check_names=False,
+            rtol=1e-9,
+        )
+
+    def test_incremental_lookback(self):
+        # Only the transactions after the high-water mark are merged in the table
+        high_water_mark = 662_688_000 + 2 * 365 * 86400 + 30 * 86400
+        features = self.rolling_features(
+            lookback_start=high_water_mark - 63072000 - 86400
+        )
+        new = self.data["datetime_unix_seconds"] > high_water_mark
+
+        expected = user_feature_engineering(self.data)[new.values].sort_index()
+        self.assertGreater(len(expected), 0)
+        self.assertLess(len(features), len(self.data))
+        pd.testing.assert_frame_equal(
+            features.loc[expected.index, user_feature_names()],
+            expected,
+            check_dtype=False,
+            check_names=False,
+            rtol=1e-9,
+        )
+
+
+@unittest.skipIf(duckdb is None, "duckdb is not installed")
+class TestTrainValidTestSplit(unittest.TestCase):
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(
+        {
+            "transaction_id": np.arange(10000),
+            "datetime_unix_seconds": rng.integers(0, 10**8, 10000),
+            "amount": rng.normal(50, 30, 10000),
+            "is_fraud": (rng.random(10000) < 0.1).astype(np.int64),
+        }
+    )
+
+    def labelled(self, **variables) -> pd.DataFrame:
+        connection = duckdb.connect()
+        connection.register("preprocessed", self.data)
+        for statement in split_statements("labelled", **variables):
+            connection.execute(statement)
+        return connection.execute("SELECT * FROM labelled").df()
+
+    def test_split_labels(self):
+        train_limit = int(self.data["datetime_unix_seconds"].quantile(0.7))
+        labelled = self.labelled(train_limit=train_limit)
+
+        self.assertEqual(
+            list(labelled.columns), ["split", "transaction_id", "amount", "is_fraud"]
+        )
+        self.assertEqual(len(labelled), len(self.data))
+        is_training = self.data.set_index("transaction_id")["datetime_unix_seconds"].lt(
+            train_limit
+        )
+        labelled = labelled.set_index("transaction_id").sort_index()
+        np.testing.assert_array_equal(labelled["split"] == 0, is_training)
+        # Newer transactions are split evenly between validation and testing
+        self.assertEqual(
+            set(labelled.index[labelled["split"] == 1] % 100), set(range(50))
+        )
+        self.assertEqual(
+            set(labelled.index[labelled["split"] == 2] % 100), set(range(50, 100))
+        )
+
+    def test_incremental_split_labels(self):
+        high_water_mark = 9 * 10**7
+        labelled = self.labelled(high_water_mark=high_water_mark)
+
+        new = self.data["datetime_unix_seconds"] > high_water_mark
+        self.assertEqual(set(labelled["transaction_id"]), set(self.data.index[new]))
+        self.assertEqual(set(labelled["split"]), {1, 2})
+
+
+if __name__ == "__main__":
+    unittest.main(testRunner=xmlrunner.XMLTestRunner(output="test-reports"))
@@ -0,0 +1,138 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import xmlrunner
+
+from src.utils.job_statistics import JobStatistics
+
+START = datetime(2023, 6, 14, 14, 59, 52)
+
+
+class FakeMetrics:
+
+    def __init__(self):
+        self.metrics = {}
+
+    def log_metric(self, name, value):
+        self.metrics[name] = value
+
+
+def fake_query_job(total_bytes_processed=1000):
+    stage = SimpleNamespace(
+        name="S00: Input",
+        slot_ms=40,
+        records_read=100,
+        records_written=10,
+        start=START,
+        end=START + timedelta(milliseconds=250),
+    )
+    return SimpleNamespace(
+        job_id="job_1",
+        total_bytes_processed=total_bytes_processed,
+        total_bytes_billed=10485760,
+        slot_millis=120,
+        cache_hit=False,
+        num_dml_affected_rows=None,
+        started=START,
+        ended=START + timedelta(seconds=2),
+        query_plan=[stage],
+    )
+
+
+class FakeClient:
+    """Local stand-in for the BigQuery client, returning dry-run estimates."""
+
+    def __init__(self, total_bytes_processed):
+        self.total_bytes_processed = total_bytes_processed
+        self.queries = []
+
+    def query(self, query, job_config=None):
+        self.queries.append((query, job_config))
+        return fake_query_job(self.total_bytes_processed)
+
+
+class TestJobStatistics(unittest.TestCase):
+
+    def test_record(self):
+        statistics = JobStatistics()
+        record = statistics.record("query", fake_query_job())
+
+        self.assertEqual(record["total_bytes_billed"], 10485760)
+        self.assertEqual(record["elapsed_ms"], 2000)
+        self.assertEqual(
+            record["stages"],
+            [
+                {
+                    "name": "S00: Input",
+                    "slot_ms": 40,
+                    "records_read": 100,
+                    "records_written": 10,
+                    "elapsed_ms": 250,
+                }
+            ],
+        )
+
+    def test_extract_job(self):
+        extract_job = SimpleNamespace(
+            job_id="job_2",
+            destination_uri_file_counts=[3],
+            started=START,
+            ended=None,
+        )
+        record = JobStatistics().record("extract", extract_job)
+
+        self.assertEqual(record["destination_uri_file_counts"], [3])
+        self.assertIsNone(record["total_bytes_processed"])
+        self.assertIsNone(record["elapsed_ms"])
+        self.assertEqual(record["stages"], [])
+
+    def test_dry_run(self):
+        statistics = JobStatistics()
+        client = FakeClient(total_bytes_processed=5000)
+
+        estimate = statistics.dry_run("query", client, "SELECT 1", "config", 5000)
+        self.assertEqual(estimate, 5000)
+        self.assertEqual(client.queries, [("SELECT 1", "config")])
+        self.assertEqual(
+            statistics.records["query_dry_run"], {"estimated_bytes_processed": 5000}
+        )
+
+        with self.assertRaises(ValueError):
+            statistics.dry_run("query", client, "SELECT 1", "config", 4999)
+
+    def test_outputs(self):
+        statistics = JobStatistics()
+        statistics.dry_run("query", FakeClient(1000), "SELECT 1", "config")
+        statistics.record("query", fake_query_job())
+
+        metrics = FakeMetrics()
+        statistics.log_metrics(metrics)
+        self.assertEqual(
+            metrics.metrics,
+            {
+                "query_dry_run_estimated_bytes_processed": 1000.0,
+                "query_total_bytes_processed": 1000.0,
+                "query_total_bytes_billed": 10485760.0,
+                "query_slot_millis": 120.0,
+                "query_cache_hit": 0.0,
+                "query_elapsed_ms": 2000.0,
+            },
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            statistics.to_json(Path(tmp_dir) / "statistics.json")
+            with open(Path(tmp_dir) / "statistics.json") as f:
+                saved = json.load(f)
+        self.assertEqual(list(saved), ["query_dry_run", "query"])
+        self.assertEqual(saved["query"]["stages"][0]["slot_ms"], 40)
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )
@@ -0,0 +1,87 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import xmlrunner
+
+from src.base.model import train_model
+from src.utils.profiling import Profiler, get_profiler
+
+
+class FakeMetrics:
+
+    def __init__(self):
+        self.metrics = {}
+
+    def log_metric(self, name, value):
+        self.metrics[name] = value
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = get_profiler()
+        with profiler.phase("load"):
+            _ = list(range(10))
+
+        self.assertFalse(profiler.enabled)
+        self.assertEqual(profiler.records, [])
+        self.assertIs(profiler.phase("a"), profiler.phase("b"))
+
+    def test_nested_phases(self):
+        profiler = Profiler(enabled=True)
+        with profiler.phase("train"):
+            with profiler.phase("fit"):
+                _ = np.ones(1_000_000)
+            with profiler.phase("fit"):
+                pass
+
+        summary = profiler.summary()
+        self.assertEqual(list(summary), ["train.fit", "train"])
+        self.assertGreaterEqual(
+            summary["train"]["wall_time_s"], summary["train.fit"]["wall_time_s"]
+        )
+        self.assertGreaterEqual(summary["train.fit"]["traced_peak_mb"], 7.5)
+        self.assertGreaterEqual(summary["train"]["traced_peak_mb"], 7.5)
+
+    def test_outputs(self):
+        profiler = Profiler(enabled=True, trace_memory=False)
+        with profiler.phase("load"):
+            pass
+
+        metrics = FakeMetrics()
+        profiler.log_metrics(metrics)
+        self.assertEqual(
+            set(metrics.metrics),
+            {"load_wall_time_s", "load_cpu_time_s", "load_peak_rss_increase_mb"},
+        )
+        # The empty phase barely raises the peak RSS of the process, if at all
+        self.assertGreaterEqual(metrics.metrics["load_peak_rss_increase_mb"], 0)
+        self.assertLess(metrics.metrics["load_peak_rss_increase_mb"], 1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler.to_json(Path(tmp_dir) / "profile.json")
+            with open(Path(tmp_dir) / "profile.json") as f:
+                self.assertEqual(list(json.load(f)), ["load"])
+
+    def test_train_model_phases(self):
+        from sklearn.linear_model import LogisticRegression
+
+        rng = np.random.default_rng(0)
+        y = (rng.random(500) < 0.1).astype(int)
+        X = rng.normal(size=(500, 3)) + y[:, None]
+
+        profiler = Profiler(enabled=True)
+        train_model(LogisticRegression(), X, y, data_sampling="none", profiler=profiler)
+        self.assertEqual(
+            list(profiler.summary()), ["scale", "resample", "fit", "evaluate"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(
+        testRunner=xmlrunner.XMLTestRunner(output="unit-tests.xml"),
+        failfast=False,
+    )